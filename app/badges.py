@@ -0,0 +1,88 @@
+import threading
+import time
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.counters import CHANGED_USERS_KEY
+from app.extensions import db
+from app.models import User
+
+# ============================
+# Số tin nhắn / thông báo chưa đọc trên header (badge)
+# ============================
+# Đọc thẳng từ bộ đếm trên users (app.counters): current_user đã được nạp cho mỗi request
+# nên không tốn thêm query. Bộ đếm đổi thì sau commit đánh thức các request long-poll
+# của user đó; RECHECK_INTERVAL là nhịp đọc lại để bắt thay đổi từ process khác.
+
+RECHECK_INTERVAL = 15       # giây
+LONG_POLL_TIMEOUT = 25      # giây chờ mặc định của /badges?wait=
+MAX_LONG_POLL_TIMEOUT = 55
+
+
+class BadgeWaiters:
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._versions = {}     # user_id -> số lần bộ đếm đổi trong process này
+
+    def notify(self, user_ids):
+        with self._cond:
+            for user_id in user_ids:
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._cond.notify_all()
+
+    def wait_for_change(self, user, etag, timeout):
+        """
+        Chờ tới khi badge của user khác etag client đang có hoặc hết timeout.
+        Trong lúc chờ không giữ kết nối DB; mỗi lần thức dậy chỉ đọc lại một dòng users.
+        """
+        user_id = user.id
+        deadline = time.monotonic() + timeout
+        counts = None
+        while True:
+            with self._cond:
+                seen = self._versions.get(user_id, 0)
+            # Lần đầu dùng bộ đếm của current_user (đã nạp sẵn), các lần sau đọc lại từ DB
+            counts = get_badges(user) if counts is None else _read_counts(user_id)
+            remaining = deadline - time.monotonic()
+            if badge_etag(counts) != etag or remaining <= 0:
+                return counts
+            db.session.remove()
+            with self._cond:
+                self._cond.wait_for(lambda: self._versions.get(user_id, 0) != seen,
+                                    timeout=min(remaining, RECHECK_INTERVAL))
+
+
+def _read_counts(user_id):
+    row = db.session.execute(
+        select(User.unread_messages_count, User.unread_notifications_count).where(User.id == user_id)
+    ).first()
+    if row is None:
+        return {"messages": 0, "notifications": 0}
+    return {"messages": row[0] or 0, "notifications": row[1] or 0}
+
+
+def get_badges(user):
+    """{"messages": n, "notifications": m} từ bộ đếm của user (không query)."""
+    return {"messages": user.unread_messages_count or 0,
+            "notifications": user.unread_notifications_count or 0}
+
+
+def badge_etag(counts):
+    return f"{counts['messages']}.{counts['notifications']}"
+
+
+badge_waiters = BadgeWaiters()
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_waiters(session):
+    user_ids = session.info.pop(CHANGED_USERS_KEY, None)
+    if user_ids:
+        badge_waiters.notify(user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop(CHANGED_USERS_KEY, None)
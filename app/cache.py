@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Cache LRU giới hạn số phần tử, mỗi phần tử hết hạn sau ttl giây. Thread-safe.
+    Có bộ đếm hit/miss/eviction/invalidation để xuất ra /metrics.
+    """
+
+    def __init__(self, name, maxsize=512, ttl=60):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def configure(self, maxsize=None, ttl=None):
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if ttl is not None:
+                self.ttl = ttl
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            if self._data:
+                self._data.clear()
+            self.invalidations += 1
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def prometheus_lines(self, prefix="jobnest"):
+        stats = self.stats()
+        base = f"{prefix}_{self.name}_cache"
+        lines = []
+        for key in ("hits", "misses", "evictions", "expirations", "invalidations"):
+            lines.append(f"# TYPE {base}_{key}_total counter")
+            lines.append(f"{base}_{key}_total {stats[key]}")
+        for key in ("size", "maxsize"):
+            lines.append(f"# TYPE {base}_{key} gauge")
+            lines.append(f"{base}_{key} {stats[key]}")
+        return lines
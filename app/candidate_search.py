@@ -0,0 +1,276 @@
+import base64
+import binascii
+import json
+import math
+import re
+from collections import Counter, defaultdict, namedtuple
+
+import numpy as np
+
+from app.extensions import db
+from app.indexing import IncrementalIndex, chunked
+from app.models import Candidate
+from utils.helpers import fold_text
+
+# ============================
+# Tìm ứng viên cho nhà tuyển dụng: inverted index in-memory + BM25
+# ============================
+# Mỗi ứng viên là một "document" gồm các trường hồ sơ (đã bỏ dấu), mỗi trường có trọng số
+# (BM25F đơn giản: cộng TF có trọng số). Posting của từng term giữ trong dict để cập nhật
+# nhanh khi hồ sơ đổi; mảng numpy của posting được dựng lại lười khi truy vấn.
+# Bộ lọc (thành phố, kinh nghiệm, lương mong muốn) là mảng numpy theo slot.
+
+FIELDS = (
+    ("expected_position", 3),
+    ("current_position", 2),
+    ("skills", 3),
+    ("major", 2),
+    ("education", 1),
+    ("career_objective", 1),
+    ("languages", 1),
+    ("city", 1),
+)
+BM25_K1 = 1.2
+BM25_B = 0.75
+PAGE_SIZE = 20
+
+_WORD = re.compile(r"[\w+#]+")
+
+CandidatePage = namedtuple("CandidatePage", "items total next_cursor")
+
+
+def _tokens(text):
+    return _WORD.findall(fold_text(text) or "")
+
+
+def _field_tokens(row):
+    """[(tokens, weight)] theo FIELDS; bỏ dấu cả hồ sơ trong một lần gọi fold_text."""
+    folded = fold_text("\x00".join(_field_text(getattr(row, name)) for name, _ in FIELDS))
+    return zip((_WORD.findall(part) for part in folded.split("\x00")), (w for _, w in FIELDS))
+
+
+def _field_text(value):
+    """skills/languages có thể là JSON list."""
+    if not value:
+        return ""
+    if value.lstrip().startswith(("[", "{")):
+        try:
+            data = json.loads(value)
+        except ValueError:
+            return value
+        if isinstance(data, list):
+            return " ".join(str(v.get("name", v) if isinstance(v, dict) else v) for v in data)
+    return value
+
+
+def encode_cursor(score, candidate_id):
+    payload = json.dumps({"s": round(score, 6), "id": candidate_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Trả về (score, id) hoặc None nếu cursor sai."""
+    if not token:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return float(payload["s"]), int(payload["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        return None
+
+
+class CandidateIndex(IncrementalIndex):
+    """
+    Lần nạp lại toàn bộ định kỳ chỉ so updated_at, hồ sơ không đổi thì giữ nguyên posting.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._reset()
+
+    def _reset(self):
+        self._slot_of = {}                  # candidate_id -> slot
+        self._updated_at = {}               # candidate_id -> updated_at lúc nạp
+        self._ids = []                      # slot -> candidate_id (-1 nếu đã xoá)
+        self._doc_terms = []                # slot -> {term: tf có trọng số}
+        self._doc_len = []
+        self._postings = defaultdict(dict)  # term -> {slot: tf}
+        self._posting_arrays = {}           # term -> (slots, tf) dựng lười
+        self._city = []                     # slot -> mã thành phố
+        self._city_codes = {"": 0}
+        self._experience = []               # số tháng kinh nghiệm
+        self._salary = []
+        self._alive = []
+        self._arrays = None
+        self._total_len = 0
+        self._n_docs = 0
+
+    # --- Nạp dữ liệu ---
+    def _rows(self, ids=None):
+        columns = [getattr(Candidate, name) for name, _ in FIELDS]
+        q = db.session.query(Candidate.id, Candidate.updated_at, Candidate.experience_years,
+                             Candidate.experience_months, Candidate.expected_salary, *columns)
+        if ids is not None:
+            q = q.filter(Candidate.id.in_(ids))
+        return q
+
+    def load_all(self):
+        if not self._slot_of:
+            for row in self._rows():
+                self._add(row)
+            return
+        current = dict(db.session.query(Candidate.id, Candidate.updated_at))
+        changed = [cid for cid, updated_at in current.items()
+                   if updated_at is None or self._updated_at.get(cid) != updated_at]
+        removed = [cid for cid in self._slot_of if cid not in current]
+        # Quá nhiều slot đã xoá thì dựng lại từ đầu để thu gọn mảng
+        if len(self._ids) > 2 * (len(current) + 1000):
+            self._reset()
+            changed, removed = list(current), []
+        self.load_ids(changed + removed)
+
+    def load_ids(self, ids):
+        for candidate_id in ids:
+            self._remove(candidate_id)
+        for batch in chunked(ids):
+            for row in self._rows(batch):
+                self._add(row)
+        self._arrays = None
+
+    def _add(self, row):
+        terms = Counter()
+        for tokens, weight in _field_tokens(row):
+            for token in tokens:
+                terms[token] += weight
+        slot = len(self._ids)
+        self._slot_of[row.id] = slot
+        self._updated_at[row.id] = row.updated_at
+        self._ids.append(row.id)
+        self._doc_terms.append(terms)
+        length = sum(terms.values())
+        self._doc_len.append(length)
+        self._total_len += length
+        self._n_docs += 1
+        for term, tf in terms.items():
+            self._postings[term][slot] = tf
+            self._posting_arrays.pop(term, None)
+        city = fold_text(row.city) or ""
+        self._city.append(self._city_codes.setdefault(city, len(self._city_codes)))
+        self._experience.append((row.experience_years or 0) * 12 + (row.experience_months or 0))
+        self._salary.append(np.nan if row.expected_salary is None else row.expected_salary)
+        self._alive.append(True)
+
+    def _remove(self, candidate_id):
+        slot = self._slot_of.pop(candidate_id, None)
+        self._updated_at.pop(candidate_id, None)
+        if slot is None:
+            return
+        for term in self._doc_terms[slot]:
+            postings = self._postings[term]
+            postings.pop(slot, None)
+            if not postings:
+                del self._postings[term]
+            self._posting_arrays.pop(term, None)
+        self._total_len -= self._doc_len[slot]
+        self._n_docs -= 1
+        self._ids[slot] = -1
+        self._doc_terms[slot] = Counter()
+        self._doc_len[slot] = 0
+        self._alive[slot] = False
+
+    # --- Truy vấn ---
+    def _numpy_arrays(self):
+        if self._arrays is None:
+            self._arrays = (
+                np.array(self._ids, dtype=np.int64),
+                np.array(self._doc_len, dtype=np.float32),
+                np.array(self._city, dtype=np.int32),
+                np.array(self._experience, dtype=np.int32),
+                np.array(self._salary, dtype=float),
+                np.array(self._alive, dtype=bool),
+            )
+        return self._arrays
+
+    def _posting_array(self, term):
+        arrays = self._posting_arrays.get(term)
+        if arrays is None:
+            postings = self._postings.get(term, {})
+            arrays = (np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                      np.fromiter(postings.values(), dtype=np.float32, count=len(postings)))
+            self._posting_arrays[term] = arrays
+        return arrays
+
+    def search(self, keyword="", city="", min_experience_months=None, max_salary=None,
+               after=None, per_page=PAGE_SIZE):
+        """
+        Xếp hạng BM25 theo keyword (không có keyword thì ứng viên mới nhất trước),
+        lọc rồi phân trang bằng cursor (score, id). Trả về CandidatePage với items là [(id, score)].
+        """
+        self.ensure_fresh()
+        with self._lock:
+            ids, doc_len, cities, experience, salary, alive = self._numpy_arrays()
+            if not len(ids):
+                return CandidatePage([], 0, None)
+
+            terms = list(dict.fromkeys(_tokens(keyword)))
+            if terms:
+                scores = np.zeros(len(ids), dtype=np.float32)
+                matched = np.zeros(len(ids), dtype=bool)
+                avg_len = self._total_len / max(self._n_docs, 1)
+                for term in terms:
+                    slots, tf = self._posting_array(term)
+                    if not len(slots):
+                        continue
+                    idf = math.log(1 + (self._n_docs - len(slots) + 0.5) / (len(slots) + 0.5))
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len[slots] / avg_len)
+                    scores[slots] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+                    matched[slots] = True
+                mask = alive & matched
+            else:
+                scores = np.zeros(len(ids), dtype=np.float32)
+                mask = alive.copy()
+
+            city = fold_text(city)
+            if city:
+                mask &= cities == self._city_codes.get(city, -1)
+            if min_experience_months:
+                mask &= experience >= min_experience_months
+            if max_salary is not None:
+                # Ứng viên không ghi lương mong muốn vẫn được giữ lại
+                mask &= np.isnan(salary) | (salary <= max_salary)
+
+            slots = np.flatnonzero(mask)
+            total = len(slots)
+            rounded = np.round(scores[slots].astype(float), 6)
+            cursor = decode_cursor(after)
+            if cursor is not None:
+                last_score, last_id = cursor
+                keep = (rounded < last_score) | ((rounded == last_score) & (ids[slots] < last_id))
+                slots, rounded = slots[keep], rounded[keep]
+
+            # Điểm giảm dần, cùng điểm thì id giảm dần (ứng viên mới hơn trước)
+            k = per_page + 1
+            if k < len(slots):
+                # Chỉ sắp xếp các slot có điểm >= điểm thứ k (giữ đủ các slot bằng điểm)
+                kth = np.partition(-rounded, k - 1)[k - 1]
+                top = -rounded <= kth
+                slots, rounded = slots[top], rounded[top]
+            order = np.lexsort((-ids[slots], -rounded))[:per_page + 1]
+            page = [(int(ids[slots[i]]), float(rounded[i])) for i in order]
+
+            next_cursor = encode_cursor(page[per_page - 1][1], page[per_page - 1][0]) \
+                if len(page) > per_page else None
+            return CandidatePage(page[:per_page], total, next_cursor)
+
+
+candidate_index = CandidateIndex()
+candidate_index.watch(Candidate)
+
+
+def search_candidates(keyword="", city="", min_experience_months=None, max_salary=None,
+                      after=None, per_page=PAGE_SIZE):
+    """CandidatePage với items là [(Candidate, score)] theo đúng thứ hạng."""
+    page = candidate_index.search(keyword, city, min_experience_months, max_salary, after, per_page)
+    candidates = {c.id: c for c in Candidate.query.filter(Candidate.id.in_([cid for cid, _ in page.items]))}
+    items = [(candidates[cid], score) for cid, score in page.items if cid in candidates]
+    return page._replace(items=items)
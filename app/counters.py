@@ -0,0 +1,178 @@
+import click
+from sqlalchemy import bindparam, case, event, func, inspect, select
+from sqlalchemy.orm import object_session
+
+from app.extensions import db
+from app.models import User, Candidate, Employer, Message, Notification, ConversationRead
+
+# ============================
+# Bộ đếm chưa đọc lưu sẵn trên users (unread_messages_count, unread_notifications_count)
+# ============================
+# Cập nhật bằng UPDATE ... SET col = col + delta ngay trong flush (cùng transaction với
+# tin nhắn/thông báo), nên đọc badge chỉ là đọc cột của current_user.
+# Bulk UPDATE/DELETE không qua mapper event: sau các thao tác đó gọi adjust_* hoặc chạy
+# `flask reconcile-unread-counts` để tính lại.
+
+# session.info: id các user vừa đổi bộ đếm (badges đánh thức long-poll sau commit)
+CHANGED_USERS_KEY = "unread_changed_users"
+
+_users = User.__table__
+_reads = ConversationRead.__table__
+
+
+def _is_unread(value):
+    return not value
+
+
+def _adjust(connection, column, user_id, delta):
+    if not user_id or not delta:
+        return
+    target = _users.c[column]
+    connection.execute(
+        _users.update().where(_users.c.id == user_id)
+        .values({column: case((target + delta < 0, 0), else_=target + delta)})
+    )
+
+
+def _mark_changed(target, user_id):
+    session = object_session(target)
+    if session is not None and user_id:
+        session.info.setdefault(CHANGED_USERS_KEY, set()).add(user_id)
+
+
+def _read_delta(target):
+    """Chênh lệch số chưa đọc do thay đổi is_read trong lần flush này."""
+    history = inspect(target).attrs.is_read.history
+    if not history.has_changes():
+        return 0
+    old = history.deleted[0] if history.deleted else None
+    return int(_is_unread(target.is_read)) - int(_is_unread(old))
+
+
+# --- Tin nhắn (đã đọc hay chưa theo mốc ConversationRead của người nhận, không theo is_read) ---
+def message_is_unread(connection, message):
+    watermark = connection.execute(
+        select(_reads.c.last_read_message_id).where(
+            _reads.c.conversation_id == message.conversation_id, _reads.c.user_id == message.receiver_id)
+    ).scalar()
+    return message.id > (watermark or 0)
+
+
+def _message_inserted(mapper, connection, target):
+    # Tin mới luôn nằm sau mốc đã đọc của người nhận
+    _adjust(connection, "unread_messages_count", target.receiver_id, 1)
+    _mark_changed(target, target.receiver_id)
+
+
+def _message_deleted(mapper, connection, target):
+    if message_is_unread(connection, target):
+        _adjust(connection, "unread_messages_count", target.receiver_id, -1)
+        _mark_changed(target, target.receiver_id)
+
+
+# --- Thông báo (gắn với hồ sơ ứng viên / nhà tuyển dụng) ---
+def _notification_owner(connection, target):
+    if target.candidate_id is not None:
+        return connection.execute(select(Candidate.user_id).where(Candidate.id == target.candidate_id)).scalar()
+    if target.employer_id is not None:
+        return connection.execute(select(Employer.user_id).where(Employer.id == target.employer_id)).scalar()
+    return None
+
+
+def _notification_inserted(mapper, connection, target):
+    if _is_unread(target.is_read):
+        user_id = _notification_owner(connection, target)
+        _adjust(connection, "unread_notifications_count", user_id, 1)
+        _mark_changed(target, user_id)
+
+
+def _notification_updated(mapper, connection, target):
+    delta = _read_delta(target)
+    if delta:
+        user_id = _notification_owner(connection, target)
+        _adjust(connection, "unread_notifications_count", user_id, delta)
+        _mark_changed(target, user_id)
+
+
+def _notification_deleted(mapper, connection, target):
+    if _is_unread(target.is_read):
+        user_id = _notification_owner(connection, target)
+        _adjust(connection, "unread_notifications_count", user_id, -1)
+        _mark_changed(target, user_id)
+
+
+event.listen(Message, "after_insert", _message_inserted)
+event.listen(Message, "after_delete", _message_deleted)
+event.listen(Notification, "after_insert", _notification_inserted)
+event.listen(Notification, "after_update", _notification_updated)
+event.listen(Notification, "after_delete", _notification_deleted)
+
+
+def adjust_unread_messages(user_id, delta):
+    """Dùng khi dời mốc đã đọc hoặc sau bulk thao tác trên messages (trong cùng transaction)."""
+    _adjust(db.session.connection(), "unread_messages_count", user_id, delta)
+    db.session.info.setdefault(CHANGED_USERS_KEY, set()).add(user_id)
+
+
+def adjust_unread_messages_many(user_ids, delta):
+    """Như adjust_unread_messages cho nhiều user trong một câu UPDATE (vd. gửi tin hàng loạt)."""
+    if not user_ids or not delta:
+        return
+    target = _users.c.unread_messages_count
+    db.session.execute(
+        _users.update().where(_users.c.id.in_(user_ids))
+        .values(unread_messages_count=case((target + delta < 0, 0), else_=target + delta))
+    )
+    db.session.info.setdefault(CHANGED_USERS_KEY, set()).update(user_ids)
+
+
+def adjust_unread_notifications(user_id, delta):
+    """Dùng sau bulk UPDATE trên notifications (trong cùng transaction)."""
+    _adjust(db.session.connection(), "unread_notifications_count", user_id, delta)
+    db.session.info.setdefault(CHANGED_USERS_KEY, set()).add(user_id)
+
+
+# --- Tính lại từ dữ liệu gốc ---
+def _actual_counts():
+    watermark = select(_reads.c.last_read_message_id).where(
+        _reads.c.conversation_id == Message.conversation_id, _reads.c.user_id == Message.receiver_id
+    ).scalar_subquery()
+    messages = select(func.count(Message.id)).where(
+        Message.receiver_id == User.id, Message.id > func.coalesce(watermark, 0)).scalar_subquery()
+    candidate_notifications = select(func.count(Notification.id)).join(
+        Candidate, Notification.candidate_id == Candidate.id).where(
+        Candidate.user_id == User.id, Notification.is_read.isnot(True)).scalar_subquery()
+    employer_notifications = select(func.count(Notification.id)).join(
+        Employer, Notification.employer_id == Employer.id).where(
+        Employer.user_id == User.id, Notification.is_read.isnot(True)).scalar_subquery()
+    return messages, candidate_notifications + employer_notifications
+
+
+def reconcile(batch_size=1000):
+    """
+    So bộ đếm với số thật, sửa các user bị lệch. Trả về số user đã sửa.
+    """
+    messages, notifications = _actual_counts()
+    drifted = db.session.execute(
+        select(User.id, messages.label("messages"), notifications.label("notifications"))
+        .where((User.unread_messages_count != messages) | (User.unread_notifications_count != notifications))
+    ).all()
+    for start in range(0, len(drifted), batch_size):
+        batch = drifted[start:start + batch_size]
+        db.session.execute(
+            _users.update().where(_users.c.id == bindparam("_id")),
+            [{"_id": row.id, "unread_messages_count": row.messages,
+              "unread_notifications_count": row.notifications} for row in batch]
+        )
+        db.session.info.setdefault(CHANGED_USERS_KEY, set()).update(row.id for row in batch)
+    db.session.commit()
+    return len(drifted)
+
+
+def init_app(app):
+    @app.cli.command("reconcile-unread-counts")
+    @click.option("--batch-size", default=1000, show_default=True)
+    def reconcile_unread_counts_command(batch_size):
+        """Tính lại unread_messages_count / unread_notifications_count từ messages (+ mốc đã đọc) và notifications."""
+        fixed = reconcile(batch_size)
+        print(f"Đã sửa bộ đếm của {fixed} user")
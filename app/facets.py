@@ -0,0 +1,320 @@
+from collections import Counter, defaultdict
+
+import numpy as np
+from sqlalchemy import select
+
+from app.extensions import db
+from app.indexing import IncrementalIndex, chunked
+from app.models import Job, JobCategory, job_category_association
+from app.search import keyword_job_ids, nearby_job_ids, search_cache
+from utils.helpers import fold_text
+
+# ============================
+# Đếm facet cho bộ lọc việc làm bằng bitmap in-memory
+# ============================
+# Mỗi job chiếm một "slot"; mỗi giá trị facet (vd. city = "ha noi") giữ một bitmap
+# (Python int) với bit slot bật nếu job có giá trị đó. Số đếm của một giá trị là
+# popcount(bitmap_giá_trị & bitmap_kết_quả_lọc), bỏ qua bộ lọc của chính facet đó
+# để người dùng thấy được các lựa chọn khác (disjunctive faceting).
+
+# Khoảng lương (VND) theo salary_max, nếu không có thì theo salary_min
+SALARY_BANDS = (
+    ("lt10", "Dưới 10 triệu", 0, 10_000_000),
+    ("10-20", "10 - 20 triệu", 10_000_000, 20_000_000),
+    ("20-30", "20 - 30 triệu", 20_000_000, 30_000_000),
+    ("30-50", "30 - 50 triệu", 30_000_000, 50_000_000),
+    ("gt50", "Trên 50 triệu", 50_000_000, None),
+)
+NEGOTIABLE_BAND = ("negotiable", "Thỏa thuận")
+
+DIMENSIONS = ("city", "job_type", "remote_option", "category", "salary")
+
+_NO_DEADLINE = np.iinfo(np.int64).max
+
+
+def salary_band(salary_min, salary_max):
+    value = salary_max if salary_max is not None else salary_min
+    if value is None:
+        return NEGOTIABLE_BAND[0]
+    for key, _, low, high in SALARY_BANDS:
+        if value >= low and (high is None or value < high):
+            return key
+    return SALARY_BANDS[0][0]
+
+
+def _mask_to_bitmap(mask):
+    if not mask.any():
+        return 0
+    return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+
+class FacetIndex(IncrementalIndex):
+    rebuild_detached = True
+
+    def __init__(self):
+        super().__init__()
+        self._reset()
+
+    def _reset(self):
+        self._slot_of = {}                  # job_id -> slot
+        self._slot_values = []              # slot -> {dim: set(value)} (None nếu đã xoá)
+        self._slot_raw = []                 # slot -> giá trị gốc của city/job_type/remote_option
+        self._salary_min = []
+        self._salary_max = []
+        self._deadline = []                 # ordinal, _NO_DEADLINE nếu không có hạn
+        self._free_slots = []               # slot của job đã xoá, _add dùng lại trước khi nới bitmap
+        self._all = 0
+        self._bitmaps = {dim: defaultdict(int) for dim in DIMENSIONS}
+        self._labels = {dim: {} for dim in DIMENSIONS}
+        self._label_votes = {dim: defaultdict(Counter) for dim in ("city", "job_type", "remote_option")}
+        self._arrays = None
+        self._active = None
+
+    # --- Nạp dữ liệu ---
+    def _rows(self, ids=None):
+        q = db.session.query(
+            Job.id, Job.city, Job.city_norm, Job.job_type, Job.job_type_norm,
+            Job.remote_option, Job.remote_option_norm, Job.salary_min, Job.salary_max, Job.deadline
+        )
+        cat_q = select(job_category_association.c.job_id, job_category_association.c.category_id)
+        if ids is not None:
+            q = q.filter(Job.id.in_(ids))
+            cat_q = cat_q.where(job_category_association.c.job_id.in_(ids))
+        categories = defaultdict(set)
+        for job_id, category_id in db.session.execute(cat_q):
+            categories[job_id].add(category_id)
+        return [(row, categories.get(row.id, ())) for row in q]
+
+    def load_all(self):
+        """
+        Dựng lại toàn bộ: gom mã giá trị của từng slot vào mảng numpy rồi tạo mỗi bitmap
+        một lần bằng _mask_to_bitmap, thay vì OR từng bit vào int lớn dần (bậc hai theo số job).
+        """
+        self._reset()
+        self._labels["category"] = dict(db.session.query(JobCategory.id, JobCategory.name).all())
+        for key, label, _, _ in SALARY_BANDS:
+            self._labels["salary"][key] = label
+        self._labels["salary"][NEGOTIABLE_BAND[0]] = NEGOTIABLE_BAND[1]
+
+        rows = self._rows()
+        n = len(rows)
+        codes = {dim: {} for dim in DIMENSIONS if dim != "category"}   # dim -> {value: mã}
+        columns = {dim: np.full(n, -1, dtype=np.int32) for dim in codes}
+        category_slots = defaultdict(list)
+        for slot, (row, categories) in enumerate(rows):
+            values, raw = self._store(slot, row, categories)
+            for dim, dim_codes in codes.items():
+                for value in values[dim]:
+                    columns[dim][slot] = dim_codes.setdefault(value, len(dim_codes))
+            for category_id in categories:
+                category_slots[category_id].append(slot)
+
+        for dim, dim_codes in codes.items():
+            for value, code in dim_codes.items():
+                self._bitmaps[dim][value] = _mask_to_bitmap(columns[dim] == code)
+        for category_id, slots in category_slots.items():
+            mask = np.zeros(n, dtype=bool)
+            mask[slots] = True
+            self._bitmaps["category"][category_id] = _mask_to_bitmap(mask)
+        self._all = _mask_to_bitmap(np.ones(n, dtype=bool))
+
+    def load_ids(self, ids):
+        for job_id in ids:
+            self._remove(job_id)
+        for batch in chunked(ids):
+            for row, categories in self._rows(batch):
+                self._add(row, categories)
+        self._arrays = None
+        self._active = None
+
+    def _store(self, slot, row, categories):
+        """Ghi dữ liệu của job vào slot (slot mới thì nối thêm), trả về (values, raw). Không đụng bitmap."""
+        # Unpack một lần: truy cập thuộc tính của Row chậm hơn tuple nhiều
+        (job_id, city, city_norm, job_type, job_type_norm,
+         remote_option, remote_option_norm, salary_min, salary_max, deadline) = row
+        values = {
+            "city": {city_norm} if city_norm else set(),
+            "job_type": {job_type_norm} if job_type_norm else set(),
+            "remote_option": {remote_option_norm} if remote_option_norm else set(),
+            "category": set(categories),
+            "salary": {salary_band(salary_min, salary_max)},
+        }
+        raw = {"city": city, "job_type": job_type, "remote_option": remote_option}
+        for dim, label in raw.items():
+            for value in values[dim]:
+                self._label_votes[dim][value][label] += 1
+        entry = (
+            values, raw,
+            np.nan if salary_min is None else salary_min,
+            np.nan if salary_max is None else salary_max,
+            deadline.toordinal() if deadline else _NO_DEADLINE,
+        )
+        columns = (self._slot_values, self._slot_raw, self._salary_min, self._salary_max, self._deadline)
+        if slot == len(self._slot_values):
+            for column, value in zip(columns, entry):
+                column.append(value)
+        else:
+            for column, value in zip(columns, entry):
+                column[slot] = value
+        self._slot_of[job_id] = slot
+        return values, raw
+
+    def _add(self, row, categories):
+        slot = self._free_slots.pop() if self._free_slots else len(self._slot_values)
+        bit = 1 << slot
+        values, _ = self._store(slot, row, categories)
+        for dim, dim_values in values.items():
+            for value in dim_values:
+                self._bitmaps[dim][value] |= bit
+        self._all |= bit
+
+    def _remove(self, job_id):
+        slot = self._slot_of.pop(job_id, None)
+        if slot is None:
+            return
+        bit = 1 << slot
+        for dim, dim_values in self._slot_values[slot].items():
+            for value in dim_values:
+                remaining = self._bitmaps[dim][value] & ~bit
+                if remaining:
+                    self._bitmaps[dim][value] = remaining
+                else:
+                    del self._bitmaps[dim][value]
+        for dim, label in self._slot_raw[slot].items():
+            for value in self._slot_values[slot][dim]:
+                votes = self._label_votes[dim][value]
+                votes[label] -= 1
+                if votes[label] <= 0:
+                    del votes[label]
+        self._slot_values[slot] = None
+        self._slot_raw[slot] = None
+        self._salary_min[slot] = np.nan
+        self._salary_max[slot] = np.nan
+        self._deadline[slot] = _NO_DEADLINE
+        self._all &= ~bit
+        self._free_slots.append(slot)
+
+    # --- Bitmap cho các bộ lọc không phải facet ---
+    def _numpy_arrays(self):
+        if self._arrays is None:
+            self._arrays = (
+                np.array(self._salary_min, dtype=float),
+                np.array(self._salary_max, dtype=float),
+                np.array(self._deadline, dtype=np.int64),
+            )
+        return self._arrays
+
+    def _active_bitmap(self, day):
+        if self._active is None or self._active[0] != day:
+            _, _, deadline = self._numpy_arrays()
+            self._active = (day, _mask_to_bitmap(deadline >= day.toordinal()) & self._all)
+        return self._active[1]
+
+    def _salary_bitmap(self, min_salary, max_salary, salary_overlap):
+        salary_min, salary_max, _ = self._numpy_arrays()
+        mask = np.ones(len(salary_min), dtype=bool)
+        # So sánh với NaN luôn False, giống NULL trong SQL
+        if salary_overlap and min_salary is not None and max_salary is not None:
+            mask &= (salary_max >= min_salary) & (salary_min <= max_salary)
+        else:
+            if min_salary is not None:
+                mask &= salary_min >= min_salary
+            if max_salary is not None:
+                mask &= salary_max <= max_salary
+        return _mask_to_bitmap(mask)
+
+    def _ids_bitmap(self, job_ids):
+        slots = [self._slot_of[i] for i in job_ids if i in self._slot_of]
+        mask = np.zeros(len(self._slot_values), dtype=bool)
+        mask[slots] = True
+        return _mask_to_bitmap(mask)
+
+    def _label(self, dim, value):
+        if dim in self._label_votes:
+            votes = self._label_votes[dim].get(value)
+            if votes:
+                return votes.most_common(1)[0][0]
+        return self._labels[dim].get(value, value)
+
+    # --- Truy vấn ---
+    def counts(self, selected, base_bitmap, limit=None):
+        """
+        selected: {dim: set(giá trị đang chọn)}; base_bitmap: kết quả các bộ lọc khác.
+        Trả về {dim: [(value, label, count, is_selected), ...]} sắp theo count giảm dần.
+        """
+        dim_filters = {}
+        for dim, values in selected.items():
+            if values:
+                bitmap = 0
+                for value in values:
+                    bitmap |= self._bitmaps[dim].get(value, 0)
+                dim_filters[dim] = bitmap
+
+        result = {}
+        for dim in DIMENSIONS:
+            scope = base_bitmap
+            for other, bitmap in dim_filters.items():
+                if other != dim:
+                    scope &= bitmap
+            chosen = selected.get(dim) or set()
+            rows = []
+            for value, bitmap in self._bitmaps[dim].items():
+                count = (bitmap & scope).bit_count()
+                if count or value in chosen:
+                    rows.append((value, self._label(dim, value), count, value in chosen))
+            if dim == "salary":
+                order = [key for key, _, _, _ in SALARY_BANDS] + [NEGOTIABLE_BAND[0]]
+                rows.sort(key=lambda r: order.index(r[0]))
+            else:
+                rows.sort(key=lambda r: (-r[2], str(r[1])))
+                if limit:
+                    rows = rows[:limit]
+            result[dim] = rows
+        return result
+
+    def facet_counts(self, location_raw="", job_type_raw="", work_type_raw="", category_raw="",
+                     keyword_ids=None, min_salary=None, max_salary=None,
+                     salary_overlap=False, active_on=None, limit=None):
+        self.ensure_fresh()
+        with self._lock:
+            base = self._all
+            if active_on is not None:
+                base &= self._active_bitmap(active_on)
+            if min_salary is not None or max_salary is not None:
+                base &= self._salary_bitmap(min_salary, max_salary, salary_overlap)
+            if keyword_ids is not None:
+                base &= self._ids_bitmap(keyword_ids)
+
+            selected = {
+                "city": {fold_text(s) for s in (location_raw or "").split(",") if s.strip()},
+                "remote_option": {fold_text(s) for s in (work_type_raw or "").split(",") if s.strip()} - {"all"},
+                "category": {int(s) for s in (category_raw or "").split(",") if s.strip().isdigit()},
+            }
+            if job_type_raw and job_type_raw.lower() != "all":
+                selected["job_type"] = {fold_text(job_type_raw)}
+            return self.counts(selected, base, limit=limit)
+
+
+facet_index = FacetIndex()
+facet_index.watch(Job)
+# Đổi tên category: nạp lại toàn bộ (hiếm khi xảy ra)
+facet_index.watch(JobCategory, get_ids=lambda target: None)
+
+
+def facet_counts(keyword="", near=None, radius_km=None, **filters):
+    """
+    Đếm facet cho bộ lọc hiện tại; keyword/near đi qua full-text index/geohash để lấy tập id.
+    Kết quả nhớ trong search_cache như kết quả tìm kiếm (xoá khi Job/Employer thay đổi).
+    """
+    key = ("facets", " ".join((keyword or "").lower().split()),
+           near and (round(near[0], 4), round(near[1], 4)), radius_km, tuple(sorted(filters.items())))
+    cached = search_cache.get(key)
+    if cached is not None:
+        return cached
+    keyword_ids = keyword_job_ids(keyword) if keyword else None
+    if near is not None:
+        near_ids = [job_id for job_id, _ in nearby_job_ids(near[0], near[1], radius_km)]
+        keyword_ids = near_ids if keyword_ids is None else list(set(keyword_ids) & set(near_ids))
+    result = facet_index.facet_counts(keyword_ids=keyword_ids, **filters)
+    search_cache.set(key, result)
+    return result
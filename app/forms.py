@@ -188,4 +188,7 @@ class EmployerProfileForm(FlaskForm):
 
 class NotificationForm(FlaskForm):
     notification_id = HiddenField('Notification ID', validators=[DataRequired()])
-    mark_read = SubmitField('Mark as Read')
\ No newline at end of file
+    mark_read = SubmitField('Mark as Read')
+class BulkMessageForm(FlaskForm):
+    content = TextAreaField('Nội dung tin nhắn', validators=[DataRequired(), Length(max=5000)])
+    submit = SubmitField('Gửi cho ứng viên đã chọn')
@@ -0,0 +1,59 @@
+import hashlib
+from datetime import datetime, date, time
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from werkzeug.http import is_resource_modified
+
+# ============================
+# Conditional GET cho trang chi tiết (ETag / Last-Modified)
+# ============================
+# Validator lấy từ updated_at (không cần render). Khách vãng lai nhận Cache-Control public
+# để reverse proxy dùng chung; người đã đăng nhập thấy header/thông báo riêng nên luôn private.
+
+DEFAULT_MAX_AGE = 0           # trình duyệt luôn hỏi lại (rẻ vì trả 304)
+DEFAULT_SHARED_MAX_AGE = 60   # reverse proxy được giữ trang tối đa 60 giây
+
+
+def _is_shareable():
+    # Có flash đang chờ thì trang sẽ hiển thị nó, không được dùng lại bản cache
+    return (request.method in ("GET", "HEAD")
+            and not current_user.is_authenticated
+            and not session.get("_flashes"))
+
+
+def page_validators(kind, object_id, *parts):
+    """
+    (etag, last_modified) cho một trang từ các updated_at (và giá trị phụ như số job).
+    Ngày hiện tại nằm trong validator vì trang hiển thị trạng thái còn hạn/hết hạn của job.
+    """
+    today = date.today()
+    stamps = [p for p in parts if isinstance(p, datetime)]
+    last_modified = max(stamps + [datetime.combine(today, time.min)])
+    raw = "|".join([kind, str(object_id), today.isoformat()] + [str(p) for p in parts])
+    return hashlib.sha1(raw.encode()).hexdigest()[:20], last_modified.replace(microsecond=0)
+
+
+def conditional_page(etag, last_modified, render):
+    """
+    Trả về 304 nếu client/proxy đã có bản mới nhất (không gọi render), ngược lại render()
+    và gắn ETag / Last-Modified / Cache-Control.
+    """
+    if not _is_shareable():
+        response = make_response(render())
+        response.headers["Cache-Control"] = "private, no-cache"
+        response.vary.add("Cookie")
+        return response
+
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(render())
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get("HTTP_CACHE_MAX_AGE", DEFAULT_MAX_AGE)
+    response.cache_control.s_maxage = current_app.config.get("HTTP_CACHE_SHARED_MAX_AGE",
+                                                             DEFAULT_SHARED_MAX_AGE)
+    response.vary.add("Cookie")
+    return response
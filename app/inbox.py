@@ -0,0 +1,376 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import case, event, func, insert, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from app import counters, message_search, realtime
+from app.extensions import db
+from app.models import Conversation, ConversationRead, Message, User
+
+# ============================
+# Tóm tắt hội thoại cho hộp thư (tin nhắn cuối, số chưa đọc của từng người)
+# ============================
+# Các cột last_message_id / last_message_at / user1_unread_count / user2_unread_count trên
+# conversations được cập nhật trong cùng flush với tin nhắn (giống app.counters), nên hộp thư
+# chỉ là một query theo index (user, last_message_at) với phân trang cursor.
+# Đã đọc/chưa đọc theo mốc ConversationRead: mark_read chỉ ghi một dòng mốc và các bộ đếm,
+# không UPDATE từng tin nhắn.
+# Bulk INSERT/UPDATE trên messages không qua mapper event: chạy `flask rebuild-inbox-summaries`.
+
+INBOX_PAGE_SIZE = 20
+BULK_INSERT_CHUNK = 500     # số dòng mỗi câu INSERT nhiều VALUES khi gửi hàng loạt
+HISTORY_PAGE_SIZE = 50      # số tin nhắn mỗi lần tải lịch sử chat
+MAX_HISTORY_PAGE_SIZE = 100
+
+_conversations = Conversation.__table__
+_messages = Message.__table__
+_reads = ConversationRead.__table__
+
+
+def _unread_delta_values(receiver_id, delta):
+    """SET userX_unread_count += delta cho phía người nhận (kẹp ở 0)."""
+    values = {}
+    for side in ("user1", "user2"):
+        column = _conversations.c[f"{side}_unread_count"]
+        updated = column + case((_conversations.c[f"{side}_id"] == receiver_id, delta), else_=0)
+        values[column.key] = case((updated < 0, 0), else_=updated)
+    return values
+
+
+def _message_inserted(mapper, connection, target):
+    newer = _conversations.c.last_message_id.is_(None) | (_conversations.c.last_message_id < target.id)
+    values = {
+        "last_message_id": case((newer, target.id), else_=_conversations.c.last_message_id),
+        "last_message_at": case((newer, target.created_at), else_=_conversations.c.last_message_at),
+    }
+    values.update(_unread_delta_values(target.receiver_id, 1))
+    connection.execute(_conversations.update().where(_conversations.c.id == target.conversation_id).values(values))
+
+
+def _message_deleted(mapper, connection, target):
+    # Tin nhắn đã bị xoá khỏi bảng: tính lại tin nhắn cuối từ phần còn lại
+    last_id = select(func.max(_messages.c.id)).where(
+        _messages.c.conversation_id == target.conversation_id).scalar_subquery()
+    values = {
+        "last_message_id": last_id,
+        "last_message_at": func.coalesce(
+            select(_messages.c.created_at).where(_messages.c.id == last_id).scalar_subquery(),
+            _conversations.c.created_at),
+    }
+    if counters.message_is_unread(connection, target):
+        values.update(_unread_delta_values(target.receiver_id, -1))
+    connection.execute(_conversations.update().where(_conversations.c.id == target.conversation_id).values(values))
+
+
+event.listen(Message, "after_insert", _message_inserted)
+event.listen(Message, "after_delete", _message_deleted)
+
+
+def find_conversation(user_id, other_id):
+    low, high = sorted((user_id, other_id))
+    return Conversation.query.filter_by(low_user_id=low, high_user_id=high).first()
+
+
+def _insert_ignoring_duplicate(dialect_name, table=_conversations, key_columns=("low_user_id", "high_user_id")):
+    """INSERT bỏ qua khi trùng khoá key_columns (mặc định cặp user của hội thoại); None nếu dialect không hỗ trợ."""
+    if dialect_name == "mysql":
+        stmt = mysql.insert(table)
+        return stmt.on_duplicate_key_update({key_columns[0]: table.c[key_columns[0]]})
+    if dialect_name == "sqlite":
+        return sqlite.insert(table).on_conflict_do_nothing(index_elements=list(key_columns))
+    if dialect_name == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing(index_elements=list(key_columns))
+    return None
+
+
+def _insert_conversations(rows):
+    """Insert các cặp chưa có hội thoại; cặp đã có (kể cả do request khác vừa tạo) được bỏ qua."""
+    stmt = _insert_ignoring_duplicate(db.session.get_bind().dialect.name)
+    if stmt is not None:
+        db.session.execute(stmt, rows)
+        return
+    for row in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(_conversations).values(row))
+        except IntegrityError:
+            pass
+
+
+def _new_conversation_row(user_id, other_id, now):
+    low, high = sorted((user_id, other_id))
+    return {"user1_id": user_id, "user2_id": other_id, "low_user_id": low, "high_user_id": high,
+            "created_at": now, "last_message_at": now}
+
+
+def get_or_create_conversation(user_id, other_id):
+    """
+    Hội thoại duy nhất của cặp user, tạo nếu chưa có. Hai request gửi đồng thời không tạo trùng:
+    INSERT dựa vào unique key (ON DUPLICATE KEY / ON CONFLICT DO NOTHING) rồi đọc lại dòng thắng.
+    Không commit: hội thoại mới được commit cùng tin nhắn đầu tiên.
+    """
+    conversation = find_conversation(user_id, other_id)
+    if conversation is not None:
+        return conversation
+
+    _insert_conversations([_new_conversation_row(user_id, other_id, datetime.utcnow())])
+    low, high = sorted((user_id, other_id))
+    return Conversation.query.filter_by(low_user_id=low, high_user_id=high).one()
+
+
+def _conversation_ids_with(user_id, other_ids):
+    """{other_id: conversation_id} cho các cặp (user_id, other_id) đã có hội thoại, một query."""
+    rows = db.session.execute(
+        select(_conversations.c.id, _conversations.c.low_user_id, _conversations.c.high_user_id).where(
+            ((_conversations.c.low_user_id == user_id) & _conversations.c.high_user_id.in_(other_ids)) |
+            ((_conversations.c.high_user_id == user_id) & _conversations.c.low_user_id.in_(other_ids)))
+    ).all()
+    return {(high if low == user_id else low): conversation_id for conversation_id, low, high in rows}
+
+
+# ============================
+# Gửi một nội dung cho nhiều người (vd. nhà tuyển dụng nhắn mọi ứng viên của một job)
+# ============================
+BULK_SENT = "sent"
+BULK_SELF = "self"
+BULK_NOT_FOUND = "not_found"
+
+
+def _insert_messages(rows):
+    """
+    INSERT nhiều dòng theo lô, trả về id của đúng các dòng vừa insert (không lẫn tin do request khác
+    ghi cùng lúc). Dialect có RETURNING thì lấy thẳng. Không có thì suy từ lastrowid: một INSERT nhiều
+    dòng VALUES được cấp id liên tiếp (MySQL: mọi innodb_autoinc_lock_mode, với auto_increment_increment = 1;
+    SQLite ghi tuần tự). MySQL trả id dòng đầu, SQLite trả id dòng cuối.
+    """
+    dialect = db.session.get_bind().dialect
+    ids = []
+    for start in range(0, len(rows), BULK_INSERT_CHUNK):
+        stmt = insert(_messages).values(rows[start:start + BULK_INSERT_CHUNK])
+        if dialect.insert_returning:
+            ids.extend(db.session.execute(stmt.returning(_messages.c.id)).scalars())
+            continue
+        result = db.session.execute(stmt)
+        first = result.lastrowid if dialect.name == "mysql" else result.lastrowid - result.rowcount + 1
+        ids.extend(range(first, first + result.rowcount))
+    return ids
+
+
+def send_bulk(sender_id, recipient_ids, content):
+    """
+    Gửi content từ sender tới từng recipient bằng các câu lệnh theo tập thay vì từng tin:
+    tìm/tạo mọi hội thoại, INSERT nhiều dòng cho messages, một UPDATE tóm tắt hội thoại và
+    một UPDATE bộ đếm chưa đọc. Insert bằng Core nên tự làm phần việc của các mapper event
+    (index tìm kiếm, sự kiện realtime). Không commit.
+    Trả về {recipient_id: {"status": ..., "conversation_id": ..., "message_id": ...}}.
+    """
+    results = {}
+    candidates = []
+    for user_id in dict.fromkeys(recipient_ids):
+        if user_id == sender_id:
+            results[user_id] = {"status": BULK_SELF}
+        else:
+            candidates.append(user_id)
+    existing = set(db.session.execute(select(User.id).where(User.id.in_(candidates))).scalars()) if candidates else set()
+    recipients = []
+    for user_id in candidates:
+        if user_id in existing:
+            recipients.append(user_id)
+        else:
+            results[user_id] = {"status": BULK_NOT_FOUND}
+    if not recipients:
+        return results
+
+    # DATETIME của MySQL không lưu phần lẻ giây: cắt trước để giá trị đọc lại khớp giá trị đã ghi
+    now = datetime.utcnow().replace(microsecond=0)
+    conversation_ids = _conversation_ids_with(sender_id, recipients)
+    missing = [user_id for user_id in recipients if user_id not in conversation_ids]
+    if missing:
+        _insert_conversations([_new_conversation_row(sender_id, user_id, now) for user_id in missing])
+        conversation_ids.update(_conversation_ids_with(sender_id, missing))
+
+    rows = [{"sender_id": sender_id, "receiver_id": user_id, "conversation_id": conversation_ids[user_id],
+             "content": content, "created_at": now, "is_read": False} for user_id in recipients]
+    message_ids = _insert_messages(rows)
+    touched = list(conversation_ids.values())
+    messages = []
+    for start in range(0, len(message_ids), BULK_INSERT_CHUNK):
+        messages.extend(Message.query.filter(Message.id.in_(message_ids[start:start + BULK_INSERT_CHUNK])))
+    messages.sort(key=lambda msg: msg.id)
+
+    # Tóm tắt hội thoại: tin nhắn cuối + mỗi hội thoại thêm một tin chưa đọc cho phía người nhận
+    last_id = select(func.max(_messages.c.id)).where(
+        _messages.c.conversation_id == _conversations.c.id).correlate(_conversations).scalar_subquery()
+    values = {
+        "last_message_id": last_id,
+        "last_message_at": select(_messages.c.created_at).where(_messages.c.id == last_id).scalar_subquery(),
+    }
+    for side in ("user1", "user2"):
+        column = _conversations.c[f"{side}_unread_count"]
+        values[column.key] = column + case((_conversations.c[f"{side}_id"] != sender_id, 1), else_=0)
+    db.session.execute(_conversations.update().where(_conversations.c.id.in_(touched)).values(values))
+    counters.adjust_unread_messages_many(recipients, 1)
+
+    message_search.index_messages(messages)
+    for msg in messages:
+        realtime.publish_after_commit(db.session, realtime.conversation_channel(msg.conversation_id),
+                                      realtime.message_event(msg))
+        results[msg.receiver_id] = {"status": BULK_SENT, "conversation_id": msg.conversation_id,
+                                    "message_id": msg.id}
+    return results
+
+
+def encode_cursor(conversation):
+    payload = json.dumps({"t": conversation.last_message_at.isoformat() if conversation.last_message_at else None,
+                          "id": conversation.id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Trả về (last_message_at, id) hoặc None nếu cursor sai."""
+    if not token:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return datetime.fromisoformat(payload["t"]), int(payload["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        return None
+
+
+def inbox_page(user_id, after=None, per_page=INBOX_PAGE_SIZE):
+    """
+    Hội thoại của user, mới hoạt động trước. Trả về (conversations, next_cursor).
+    Mỗi nhánh của OR dùng index (user1_id|user2_id, last_message_at).
+    """
+    q = Conversation.query.filter((Conversation.user1_id == user_id) | (Conversation.user2_id == user_id))
+    cursor = decode_cursor(after)
+    if cursor is not None:
+        last_at, last_id = cursor
+        q = q.filter((Conversation.last_message_at < last_at) |
+                     ((Conversation.last_message_at == last_at) & (Conversation.id < last_id)))
+    rows = q.order_by(Conversation.last_message_at.desc(), Conversation.id.desc()).limit(per_page + 1).all()
+    next_cursor = encode_cursor(rows[per_page - 1]) if len(rows) > per_page else None
+    return rows[:per_page], next_cursor
+
+
+def chat_history(conversation_id, before_id=None, after_id=None, limit=HISTORY_PAGE_SIZE):
+    """
+    Một đoạn lịch sử chat theo index (conversation_id, id), trả về (messages tăng dần theo id, has_more).
+    - mặc định: limit tin mới nhất; before_id: các tin ngay trước đó (cuộn lên)
+    - after_id: các tin sau đó (làm mới tăng dần), has_more = còn tin mới hơn chưa trả về
+    """
+    limit = max(1, min(limit or HISTORY_PAGE_SIZE, MAX_HISTORY_PAGE_SIZE))
+    q = Message.query.filter(Message.conversation_id == conversation_id)
+    if after_id is not None:
+        rows = q.filter(Message.id > after_id).order_by(Message.id.asc()).limit(limit + 1).all()
+        return rows[:limit], len(rows) > limit
+    if before_id is not None:
+        q = q.filter(Message.id < before_id)
+    rows = q.order_by(Message.id.desc()).limit(limit + 1).all()
+    return list(reversed(rows[:limit])), len(rows) > limit
+
+
+def _watermark(conversation_id, user_id):
+    return select(_reads.c.last_read_message_id).where(
+        _reads.c.conversation_id == conversation_id, _reads.c.user_id == user_id).scalar_subquery()
+
+
+def _count_unread(conversation_id, user_id, after_id, up_to_id=None):
+    """Đếm tin gửi cho user trong khoảng id (after_id, up_to_id] bằng index (conversation_id, id)."""
+    q = select(func.count(_messages.c.id)).where(
+        _messages.c.conversation_id == conversation_id, _messages.c.receiver_id == user_id,
+        _messages.c.id > after_id)
+    if up_to_id is not None:
+        q = q.where(_messages.c.id <= up_to_id)
+    return q
+
+
+def unread_count(conversation_id, user_id):
+    """Số tin chưa đọc tính thẳng từ mốc đã đọc (không dùng cột lưu sẵn)."""
+    return db.session.execute(
+        _count_unread(conversation_id, user_id, func.coalesce(_watermark(conversation_id, user_id), 0))
+    ).scalar()
+
+
+def _ensure_read_row(conversation_id, user_id):
+    """Tạo dòng conversation_reads (mốc 0 = như chưa có dòng) nếu chưa có, không lỗi khi request khác vừa tạo."""
+    row = {"conversation_id": conversation_id, "user_id": user_id, "last_read_message_id": 0,
+           "updated_at": datetime.utcnow()}
+    stmt = _insert_ignoring_duplicate(db.session.get_bind().dialect.name, _reads, ("conversation_id", "user_id"))
+    if stmt is not None:
+        db.session.execute(stmt, [row])
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(_reads).values(row))
+    except IntegrityError:
+        pass
+
+
+def mark_read(conversation, user_id, up_to_id=None):
+    """
+    Dời mốc đã đọc của user tới up_to_id (mặc định tin nhắn cuối) và trừ các bộ đếm tương ứng.
+    Hai request đồng thời (vd. hai tab cùng gọi markRead) không trừ hai lần: dòng mốc bị khoá
+    (SELECT ... FOR UPDATE) trước khi đọc mốc cũ, và chỉ trừ bộ đếm khi UPDATE có điều kiện
+    last_read_message_id < up_to thực sự đổi dòng. Người gọi commit.
+    Trả về số tin vừa chuyển sang đã đọc.
+    """
+    last_id = conversation.last_message_id or 0
+    up_to = last_id if up_to_id is None else min(up_to_id, last_id)
+    if up_to <= 0:
+        return 0
+    key = (_reads.c.conversation_id == conversation.id, _reads.c.user_id == user_id)
+    locked = select(_reads.c.last_read_message_id).where(*key).with_for_update()
+    previous = db.session.execute(locked).scalar()
+    if previous is None:
+        _ensure_read_row(conversation.id, user_id)
+        previous = db.session.execute(locked).scalar() or 0
+    if up_to <= previous:
+        return 0
+
+    # Đếm trong khoảng (previous, up_to] chứ không dùng số lưu trên conversation (có thể đã cũ)
+    newly_read = db.session.execute(_count_unread(conversation.id, user_id, previous, up_to)).scalar()
+    result = db.session.execute(
+        _reads.update().where(*key, _reads.c.last_read_message_id < up_to)
+        .values(last_read_message_id=up_to, updated_at=datetime.utcnow()))
+    if result.rowcount != 1:
+        return 0
+    if newly_read:
+        db.session.execute(_conversations.update().where(_conversations.c.id == conversation.id)
+                           .values(_unread_delta_values(user_id, -newly_read)))
+        counters.adjust_unread_messages(user_id, -newly_read)
+        db.session.expire(conversation, ["user1_unread_count", "user2_unread_count"])
+    return newly_read
+
+
+def rebuild_summaries():
+    """Tính lại tin nhắn cuối và số chưa đọc của mọi hội thoại từ bảng messages."""
+    last_id = select(func.max(_messages.c.id)).where(
+        _messages.c.conversation_id == _conversations.c.id).scalar_subquery()
+
+    def unread(user_column):
+        watermark = func.coalesce(_watermark(_conversations.c.id, user_column), 0)
+        return _count_unread(_conversations.c.id, user_column, watermark).scalar_subquery()
+
+    db.session.execute(_conversations.update().values(last_message_id=last_id))
+    db.session.execute(_conversations.update().values(
+        last_message_at=func.coalesce(
+            select(_messages.c.created_at).where(_messages.c.id == _conversations.c.last_message_id)
+            .scalar_subquery(),
+            _conversations.c.created_at),
+        user1_unread_count=unread(_conversations.c.user1_id),
+        user2_unread_count=unread(_conversations.c.user2_id),
+    ))
+    db.session.commit()
+
+
+def init_app(app):
+    @app.cli.command("rebuild-inbox-summaries")
+    def rebuild_inbox_summaries_command():
+        """Tính lại last_message_* / user*_unread_count trên conversations."""
+        rebuild_summaries()
+        print("Đã tính lại tóm tắt hội thoại")
@@ -0,0 +1,132 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+# Tất cả index đang đăng ký, để event commit/rollback của Session biết cần báo cho ai
+_INDEXES = []
+
+
+class IncrementalIndex:
+    """
+    Index in-memory: nạp toàn bộ ở lần dùng đầu, sau đó chỉ nạp lại các id bị thay đổi.
+
+    Id thay đổi được gom qua mapper event vào session.info và chỉ áp dụng sau commit
+    (rollback thì bỏ), nên index không bao giờ thấy dữ liệu chưa commit.
+    max_age: quá thời gian này thì nạp lại toàn bộ, để bắt thay đổi từ worker khác.
+
+    Lớp con cài đặt load_all() và load_ids(ids).
+    rebuild_detached = True: lần nạp lại định kỳ dựng index mới ngoài lock (trên một instance tạm,
+    load_all phải gán mới toàn bộ state) rồi mới tráo vào; trong lúc đó các request khác vẫn đọc
+    index cũ thay vì chờ. Chỉ lần nạp đầu tiên là giữ lock.
+    """
+
+    max_age = 300
+    rebuild_detached = False
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded_at = None
+        self._dirty = set()
+        self._invalid = False
+        self._rebuilding = False
+        self._session_key = f"dirty_ids:{type(self).__name__}:{id(self)}"
+        _INDEXES.append(self)
+
+    # --- Đăng ký theo dõi model ---
+    def watch(self, model, get_ids=None, events=("after_insert", "after_update", "after_delete")):
+        """
+        get_ids(target) trả về các id cần nạp lại; trả về None nghĩa là nạp lại toàn bộ.
+        Mặc định là [target.id].
+        """
+        get_ids = get_ids or (lambda target: [target.id])
+
+        def _listener(mapper, connection, target):
+            ids = get_ids(target)
+            session = object_session(target)
+            if session is None:
+                self._mark(ids)
+                return
+            pending = session.info.setdefault(self._session_key, [])
+            pending.append(ids)
+
+        for name in events:
+            event.listen(model, name, _listener)
+
+    def _mark(self, ids):
+        with self._lock:
+            if ids is None:
+                self._invalid = True
+            else:
+                self._dirty.update(ids)
+
+    def mark_dirty(self, ids):
+        self._mark(list(ids))
+
+    def invalidate(self):
+        self._mark(None)
+
+    # --- Đọc ---
+    def ensure_fresh(self):
+        with self._lock:
+            first = self._loaded_at is None
+            expired = first or time.monotonic() - self._loaded_at > self.max_age
+            if not (expired or self._invalid):
+                if self._dirty:
+                    ids, self._dirty = self._dirty, set()
+                    self.load_ids(ids)
+                return
+            if first or not self.rebuild_detached:
+                self._dirty.clear()
+                self._invalid = False
+                self.load_all()
+                self._loaded_at = time.monotonic()
+                return
+            if self._rebuilding:
+                return              # request khác đang dựng lại, tạm dùng index hiện có
+            self._rebuilding = True
+            self._invalid = False
+        try:
+            state = self.build_all()
+        except Exception:
+            with self._lock:
+                self._rebuilding = False
+                self._invalid = True
+            raise
+        with self._lock:
+            # Id đổi trong lúc dựng vẫn nằm trong _dirty, được nạp lại ở lần gọi sau
+            self.__dict__.update(state)
+            self._loaded_at = time.monotonic()
+            self._rebuilding = False
+
+    def build_all(self):
+        """Chạy load_all() trên một instance tạm (không lock, không đăng ký event), trả về state của nó."""
+        fresh = object.__new__(type(self))
+        fresh.load_all()
+        return vars(fresh)
+
+    def load_all(self):
+        raise NotImplementedError
+
+    def load_ids(self, ids):
+        raise NotImplementedError
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_ids(session):
+    for index in _INDEXES:
+        for ids in session.info.pop(index._session_key, ()):
+            index._mark(ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_ids(session):
+    for index in _INDEXES:
+        session.info.pop(index._session_key, None)
+
+
+def chunked(items, size=500):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
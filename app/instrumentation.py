@@ -0,0 +1,123 @@
+import re
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ============================
+# Đo SQL theo từng request: số query, thời gian DB, phát hiện N+1, header Server-Timing
+# ============================
+
+N_PLUS_ONE_THRESHOLD = 5      # cùng một câu lệnh lặp >= ngần này lần trong 1 request thì cảnh báo
+
+_NUMBER_RE = re.compile(r"\b\d+(\.\d+)?\b")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_IN_LIST_RE = re.compile(r"\(\s*(\?|%s|:\w+)(\s*,\s*(\?|%s|:\w+))*\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(statement):
+    """Chuẩn hoá câu SQL để gom các lần chạy giống nhau (bỏ literal, gộp danh sách IN)."""
+    s = _STRING_RE.sub("?", statement)
+    s = _NUMBER_RE.sub("?", s)
+    s = _IN_LIST_RE.sub("(?)", s)
+    s = re.sub(r"__\[POSTCOMPILE_\w+\]", "?", s)
+    return _SPACE_RE.sub(" ", s).strip()
+
+
+class RequestStats:
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.fingerprints = Counter()
+        self._render_started = []
+
+    def record(self, statement, elapsed):
+        self.query_count += 1
+        self.db_time += elapsed
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def suspected_n_plus_one(self, threshold=N_PLUS_ONE_THRESHOLD):
+        return [(fp, count) for fp, count in self.fingerprints.most_common() if count >= threshold]
+
+    def server_timing(self):
+        total = time.perf_counter() - self.started
+        return ", ".join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.query_count} queries"',
+            f"render;dur={self.render_time * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ])
+
+
+def current_stats():
+    """RequestStats của request hiện tại (None nếu ngoài request hoặc đã tắt đo)."""
+    if has_request_context():
+        return g.get("_request_stats")
+    return None
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("_query_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats = current_stats()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+
+def _on_render_start(app, template, context, **extra):
+    stats = current_stats()
+    if stats is not None:
+        stats._render_started.append(time.perf_counter())
+
+
+def _on_rendered(app, template, context, **extra):
+    stats = current_stats()
+    if stats is not None and stats._render_started:
+        elapsed = time.perf_counter() - stats._render_started.pop()
+        # Template lồng nhau: chỉ cộng thời gian của lần render ngoài cùng
+        if not stats._render_started:
+            stats.render_time += elapsed
+
+
+def init_app(app):
+    """
+    Cấu hình:
+    - SQL_INSTRUMENTATION (mặc định True): bật đo
+    - SERVER_TIMING (mặc định True): gắn header Server-Timing
+    - SQL_N_PLUS_ONE_THRESHOLD: ngưỡng cảnh báo N+1
+    """
+    if not app.config.get("SQL_INSTRUMENTATION", True):
+        return
+
+    before_render_template.connect(_on_render_start, app)
+    template_rendered.connect(_on_rendered, app)
+
+    @app.before_request
+    def _start_request_stats():
+        g._request_stats = RequestStats()
+
+    @app.after_request
+    def _finish_request_stats(response):
+        stats = current_stats()
+        if stats is None:
+            return response
+        if app.config.get("SERVER_TIMING", True):
+            response.headers["Server-Timing"] = stats.server_timing()
+        threshold = app.config.get("SQL_N_PLUS_ONE_THRESHOLD", N_PLUS_ONE_THRESHOLD)
+        for statement, count in stats.suspected_n_plus_one(threshold):
+            app.logger.warning("Nghi N+1 ở %s %s: %d lần | %s",
+                               request.method, request.path, count, statement[:300])
+        return response
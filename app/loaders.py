@@ -0,0 +1,140 @@
+from collections import defaultdict
+
+from flask import g, has_request_context
+from sqlalchemy import inspect, tuple_
+from sqlalchemy.orm import RelationshipDirection
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.extensions import db
+
+# ============================
+# Nạp quan hệ theo lô cho danh sách sắp render (kiểu DataLoader)
+# ============================
+# Template đọc job.employer.logo, app.candidate.user... từng dòng một -> mỗi dòng 1 query.
+# prime(objects, "employer", "job.employer.user") gom khoá ngoại của cả danh sách, nạp mỗi
+# loại đối tượng bằng một query IN (...) rồi gán vào quan hệ như thể đã load sẵn.
+# Đối tượng đã nạp được nhớ theo (class, khoá chính) tới hết request.
+
+
+def _memo():
+    if not has_request_context():
+        return {}
+    memo = g.get("_loader_memo")
+    if memo is None:
+        memo = g._loader_memo = {}
+    return memo
+
+
+def _key_of(columns, obj_mapper, obj):
+    values = tuple(getattr(obj, obj_mapper.get_property_by_column(c).key) for c in columns)
+    return None if any(v is None for v in values) else values
+
+
+def _in_filter(columns, keys):
+    if len(columns) == 1:
+        return columns[0].in_([k[0] for k in keys])
+    return tuple_(*columns).in_(keys)
+
+
+def _load_many_to_one(objects, prop, memo):
+    mapper = inspect(type(objects[0]))
+    target = prop.mapper
+    local_cols = [local for local, _ in prop.local_remote_pairs]
+    remote_cols = [remote for _, remote in prop.local_remote_pairs]
+
+    wanted = {}
+    for obj in objects:
+        if prop.key in obj.__dict__:
+            continue
+        key = _key_of(local_cols, mapper, obj)
+        if key is not None:
+            wanted.setdefault(key, []).append(obj)
+    if not wanted:
+        return
+
+    # Khoá ngoại trỏ vào khoá chính: lấy luôn từ identity map của session nếu đã có
+    by_primary_key = list(remote_cols) == list(target.primary_key)
+    for key in wanted:
+        if by_primary_key and (target.class_, key) not in memo:
+            cached = db.session.identity_map.get(target.identity_key_from_primary_key(key))
+            if cached is not None:
+                memo[(target.class_, key)] = cached
+
+    missing = [k for k in wanted if (target.class_, k) not in memo]
+    for batch_start in range(0, len(missing), 500):
+        batch = missing[batch_start:batch_start + 500]
+        for row in db.session.query(target.class_).filter(_in_filter(remote_cols, batch)):
+            memo[(target.class_, _key_of(remote_cols, target, row))] = row
+
+    for key, owners in wanted.items():
+        value = memo.get((target.class_, key))
+        for obj in owners:
+            set_committed_value(obj, prop.key, value)
+
+
+def _load_one_to_many(objects, prop, memo):
+    mapper = inspect(type(objects[0]))
+    target = prop.mapper
+    local_cols = [local for local, _ in prop.local_remote_pairs]
+    remote_cols = [remote for _, remote in prop.local_remote_pairs]
+
+    pending = {}
+    for obj in objects:
+        if prop.key in obj.__dict__:
+            continue
+        key = _key_of(local_cols, mapper, obj)
+        if key is not None:
+            pending.setdefault(key, []).append(obj)
+    if not pending:
+        return
+
+    groups = defaultdict(list)
+    keys = list(pending)
+    for batch_start in range(0, len(keys), 500):
+        batch = keys[batch_start:batch_start + 500]
+        q = db.session.query(target.class_).filter(_in_filter(remote_cols, batch))
+        if prop.order_by:
+            q = q.order_by(*prop.order_by)
+        else:
+            q = q.order_by(*target.primary_key)
+        for row in q:
+            groups[_key_of(remote_cols, target, row)].append(row)
+            memo[(target.class_, tuple(target.primary_key_from_instance(row)))] = row
+
+    for key, owners in pending.items():
+        for obj in owners:
+            set_committed_value(obj, prop.key, list(groups.get(key, ())))
+
+
+def prime(objects, *paths):
+    """
+    Nạp trước các quan hệ theo đường dẫn (vd. "employer", "job.employer.user", "cv")
+    cho cả danh sách. Hỗ trợ quan hệ many-to-one và one-to-many.
+    Trả về chính danh sách để dùng trực tiếp: jobs = prime(query.all(), "employer").
+    """
+    objects = [o for o in objects if o is not None]
+    if not objects:
+        return objects
+    memo = _memo()
+    for path in paths:
+        level = objects
+        for name in path.split("."):
+            level = [o for o in level if o is not None]
+            if not level:
+                break
+            prop = inspect(type(level[0])).relationships[name]
+            if prop.secondary is not None:
+                raise ValueError(f"prime() không hỗ trợ quan hệ many-to-many: {path}")
+            if prop.direction is RelationshipDirection.MANYTOONE:
+                _load_many_to_one(level, prop, memo)
+            else:
+                _load_one_to_many(level, prop, memo)
+            next_level = []
+            for obj in level:
+                value = getattr(obj, name)
+                if prop.uselist:
+                    next_level.extend(value)
+                else:
+                    next_level.append(value)
+            level = list({id(o): o for o in next_level if o is not None}.values())
+    return objects
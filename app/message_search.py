@@ -0,0 +1,319 @@
+import base64
+import binascii
+import json
+import re
+
+from markupsafe import Markup, escape
+from sqlalchemy import event, inspect, text
+
+from app.extensions import db
+from app.models import Conversation, Message
+from app.search import tokenize_keyword
+from utils.helpers import fold_text
+
+# ============================
+# Full-text index cho tìm kiếm trong tin nhắn của user
+# ============================
+# Bảng phụ chứa content của tin nhắn + cột owners gồm token "usr<id>" của người gửi và người nhận.
+# Điều kiện "tin nhắn của tôi" nằm ngay trong biểu thức full-text (owners:usr12 AND content:...),
+# nên index chỉ giao danh sách posting của user với của từ khoá, không phụ thuộc kích thước bảng
+# messages. Kết quả vẫn được join lại conversations theo khoá chính để chắc chắn đúng phạm vi.
+# - SQLite: bảng ảo FTS5 (rowid = messages.id), snippet() đánh dấu từ khớp
+# - MySQL: bảng InnoDB có FULLTEXT index, snippet cắt trong Python
+# - Dialect khác: fallback về ILIKE trên messages
+INDEX_TABLE = "message_search_index"
+SEARCH_PAGE_SIZE = 20
+SNIPPET_TOKENS = 12        # số từ quanh chỗ khớp
+SNIPPET_CHARS = 160
+
+# Ký tự đánh dấu chỗ khớp trong snippet thô, được escape rồi đổi thành <mark> khi render
+_HL_START, _HL_END, _ELLIPSIS = "\x02", "\x03", "…"
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def owner_token(user_id):
+    return f"usr{user_id}"
+
+
+def _owners(message):
+    return f"{owner_token(message.sender_id)} {owner_token(message.receiver_id)}"
+
+
+def render_snippet(raw):
+    """Snippet thô (có ký tự đánh dấu) -> HTML an toàn với <mark>."""
+    html = str(escape(raw))
+    return Markup(html.replace(_HL_START, "<mark>").replace(_HL_END, "</mark>"))
+
+
+def highlight(content, tokens, max_chars=SNIPPET_CHARS):
+    """Cắt đoạn quanh từ khớp đầu tiên và đánh dấu các từ khớp (so khớp không dấu, theo tiền tố)."""
+    content = content or ""
+    folded = [fold_text(t) for t in tokens]
+    matches = [m for m in _WORD_RE.finditer(content)
+               if any(fold_text(m.group()).startswith(t) for t in folded)]
+    start = max(0, matches[0].start() - max_chars // 3) if matches else 0
+    end = min(len(content), start + max_chars)
+    parts, pos = [], start
+    for m in matches:
+        if m.start() < start or m.end() > end:
+            continue
+        parts.append(content[pos:m.start()])
+        parts.append(_HL_START + m.group() + _HL_END)
+        pos = m.end()
+    parts.append(content[pos:end])
+    prefix = _ELLIPSIS if start > 0 else ""
+    suffix = _ELLIPSIS if end < len(content) else ""
+    return prefix + "".join(parts) + suffix
+
+
+class IlikeBackend:
+    """Không có full-text index: ILIKE trên messages của các hội thoại của user."""
+
+    name = "ilike"
+
+    def ensure_index(self, conn):
+        return False
+
+    def rebuild(self, conn):
+        pass
+
+    def upsert(self, conn, message):
+        pass
+
+    def delete(self, conn, message_id):
+        pass
+
+    def upsert_many(self, conn, messages):
+        pass
+
+    def search(self, user_id, keyword, before_id=None, limit=SEARCH_PAGE_SIZE):
+        """Danh sách (message_id, snippet thô), id giảm dần."""
+        tokens = tokenize_keyword(keyword)
+        if not tokens:
+            return []
+        q = db.session.query(Message.id, Message.content).join(
+            Conversation, Conversation.id == Message.conversation_id
+        ).filter((Conversation.user1_id == user_id) | (Conversation.user2_id == user_id))
+        for token in tokens:
+            q = q.filter(Message.content.ilike(f"%{token}%"))
+        if before_id is not None:
+            q = q.filter(Message.id < before_id)
+        rows = q.order_by(Message.id.desc()).limit(limit).all()
+        return [(message_id, highlight(content, tokens)) for message_id, content in rows]
+
+
+class SQLiteFTSBackend(IlikeBackend):
+    name = "fts5"
+
+    def ensure_index(self, conn):
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5("
+            "content, owners, tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+        has_rows = conn.execute(text(f"SELECT 1 FROM {INDEX_TABLE} LIMIT 1")).first()
+        has_messages = conn.execute(text("SELECT 1 FROM messages LIMIT 1")).first()
+        if has_messages and not has_rows:
+            self.rebuild(conn)
+            return True
+        return False
+
+    def rebuild(self, conn):
+        conn.execute(text(f"DELETE FROM {INDEX_TABLE}"))
+        conn.execute(text(
+            f"INSERT INTO {INDEX_TABLE} (rowid, content, owners) "
+            "SELECT id, content, 'usr' || sender_id || ' usr' || receiver_id FROM messages"
+        ))
+
+    def upsert(self, conn, message):
+        self.delete(conn, message.id)
+        conn.execute(text(f"INSERT INTO {INDEX_TABLE} (rowid, content, owners) VALUES (:id, :content, :owners)"),
+                     {"id": message.id, "content": message.content, "owners": _owners(message)})
+
+    def delete(self, conn, message_id):
+        conn.execute(text(f"DELETE FROM {INDEX_TABLE} WHERE rowid = :id"), {"id": message_id})
+
+    def upsert_many(self, conn, messages):
+        # Tin nhắn vừa insert theo lô nên chưa có trong index
+        conn.execute(text(f"INSERT INTO {INDEX_TABLE} (rowid, content, owners) VALUES (:id, :content, :owners)"),
+                     [{"id": m.id, "content": m.content, "owners": _owners(m)} for m in messages])
+
+    @staticmethod
+    def match_expression(user_id, keyword):
+        # Token trong "..." để FTS5 không hiểu nhầm thành toán tử, token cuối match theo tiền tố
+        tokens = tokenize_keyword(keyword)
+        if not tokens:
+            return None
+        parts = [f'"{t}"' for t in tokens]
+        parts[-1] += "*"
+        return f'owners : "{owner_token(user_id)}" AND content : ({" AND ".join(parts)})'
+
+    def search(self, user_id, keyword, before_id=None, limit=SEARCH_PAGE_SIZE):
+        expr = self.match_expression(user_id, keyword)
+        if expr is None:
+            return []
+        rows = db.session.execute(text(
+            f"SELECT s.rowid, snippet({INDEX_TABLE}, 0, :hl_start, :hl_end, :ellipsis, {SNIPPET_TOKENS}) "
+            f"FROM {INDEX_TABLE} s "
+            "JOIN messages m ON m.id = s.rowid "
+            "JOIN conversations c ON c.id = m.conversation_id "
+            f"WHERE {INDEX_TABLE} MATCH :fts_query AND s.rowid < :before_id "
+            "AND (c.user1_id = :user_id OR c.user2_id = :user_id) "
+            "ORDER BY s.rowid DESC LIMIT :limit"
+        ), {"fts_query": expr, "before_id": before_id if before_id is not None else 2 ** 62,
+            "user_id": user_id, "limit": limit,
+            "hl_start": _HL_START, "hl_end": _HL_END, "ellipsis": _ELLIPSIS}).all()
+        return [(message_id, snippet) for message_id, snippet in rows]
+
+
+class MySQLFulltextBackend(IlikeBackend):
+    name = "mysql_fulltext"
+
+    def ensure_index(self, conn):
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {INDEX_TABLE} ("
+            "message_id INT NOT NULL PRIMARY KEY, content TEXT, owners VARCHAR(64), "
+            f"FULLTEXT KEY ft_{INDEX_TABLE} (content, owners)"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+        ))
+        has_rows = conn.execute(text(f"SELECT 1 FROM {INDEX_TABLE} LIMIT 1")).first()
+        has_messages = conn.execute(text("SELECT 1 FROM messages LIMIT 1")).first()
+        if has_messages and not has_rows:
+            self.rebuild(conn)
+            return True
+        return False
+
+    def rebuild(self, conn):
+        conn.execute(text(f"DELETE FROM {INDEX_TABLE}"))
+        conn.execute(text(
+            f"INSERT INTO {INDEX_TABLE} (message_id, content, owners) "
+            "SELECT id, content, CONCAT('usr', sender_id, ' usr', receiver_id) FROM messages"
+        ))
+
+    def upsert(self, conn, message):
+        conn.execute(text(f"REPLACE INTO {INDEX_TABLE} (message_id, content, owners) VALUES (:id, :content, :owners)"),
+                     {"id": message.id, "content": message.content, "owners": _owners(message)})
+
+    def delete(self, conn, message_id):
+        conn.execute(text(f"DELETE FROM {INDEX_TABLE} WHERE message_id = :id"), {"id": message_id})
+
+    def upsert_many(self, conn, messages):
+        conn.execute(text(f"REPLACE INTO {INDEX_TABLE} (message_id, content, owners) VALUES (:id, :content, :owners)"),
+                     [{"id": m.id, "content": m.content, "owners": _owners(m)} for m in messages])
+
+    @staticmethod
+    def match_expression(user_id, keyword):
+        # BOOLEAN MODE: token owner + mọi từ khoá đều bắt buộc, token cuối match tiền tố
+        tokens = tokenize_keyword(keyword)
+        if not tokens:
+            return None
+        parts = [f"+{t}" for t in tokens]
+        parts[-1] += "*"
+        return f"+{owner_token(user_id)} " + " ".join(parts)
+
+    def search(self, user_id, keyword, before_id=None, limit=SEARCH_PAGE_SIZE):
+        expr = self.match_expression(user_id, keyword)
+        if expr is None:
+            return []
+        # owners và content chung một FULLTEXT index nên "usrN" trong nội dung cũng khớp:
+        # điều kiện trên conversations loại các dòng đó
+        rows = db.session.execute(text(
+            f"SELECT s.message_id, s.content FROM {INDEX_TABLE} s "
+            "JOIN messages m ON m.id = s.message_id "
+            "JOIN conversations c ON c.id = m.conversation_id "
+            "WHERE MATCH (s.content, s.owners) AGAINST (:fts_query IN BOOLEAN MODE) "
+            "AND s.message_id < :before_id AND (c.user1_id = :user_id OR c.user2_id = :user_id) "
+            "ORDER BY s.message_id DESC LIMIT :limit"
+        ), {"fts_query": expr, "before_id": before_id if before_id is not None else 2 ** 31,
+            "user_id": user_id, "limit": limit}).all()
+        tokens = tokenize_keyword(keyword)
+        return [(message_id, highlight(content, tokens)) for message_id, content in rows]
+
+
+_BACKENDS = {
+    "sqlite": SQLiteFTSBackend(),
+    "mysql": MySQLFulltextBackend(),
+}
+_FALLBACK = IlikeBackend()
+
+
+def get_backend(dialect_name=None):
+    if dialect_name is None:
+        dialect_name = db.engine.dialect.name
+    return _BACKENDS.get(dialect_name, _FALLBACK)
+
+
+def ensure_index():
+    """Tạo bảng index nếu chưa có và nạp dữ liệu lần đầu."""
+    with db.engine.begin() as conn:
+        return get_backend(conn.dialect.name).ensure_index(conn)
+
+
+def rebuild_index():
+    with db.engine.begin() as conn:
+        get_backend(conn.dialect.name).rebuild(conn)
+
+
+def index_messages(messages):
+    """Đưa các tin nhắn insert bằng Core (không qua mapper event) vào index, trong transaction hiện tại."""
+    if messages:
+        conn = db.session.connection()
+        get_backend(conn.dialect.name).upsert_many(conn, messages)
+
+
+# ============================
+# Đồng bộ index khi tin nhắn thay đổi
+# ============================
+@event.listens_for(Message, "after_insert")
+def _index_message_insert(mapper, connection, target):
+    get_backend(connection.dialect.name).upsert(connection, target)
+
+
+@event.listens_for(Message, "after_update")
+def _index_message_update(mapper, connection, target):
+    if inspect(target).attrs.content.history.has_changes():
+        get_backend(connection.dialect.name).upsert(connection, target)
+
+
+@event.listens_for(Message, "after_delete")
+def _index_message_delete(mapper, connection, target):
+    get_backend(connection.dialect.name).delete(connection, target.id)
+
+
+# ============================
+# Tìm kiếm, phân trang bằng cursor (id tin nhắn cuối của trang trước)
+# ============================
+def encode_cursor(message_id):
+    payload = json.dumps({"id": message_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        return None
+
+
+def search_messages(user_id, keyword, after=None, per_page=SEARCH_PAGE_SIZE):
+    """
+    Tin nhắn của user khớp keyword, mới nhất trước.
+    Trả về (danh sách (Message, snippet HTML), next_cursor).
+    """
+    hits = get_backend().search(user_id, keyword, before_id=decode_cursor(after), limit=per_page + 1)
+    next_cursor = encode_cursor(hits[per_page - 1][0]) if len(hits) > per_page else None
+    hits = hits[:per_page]
+    messages = {m.id: m for m in Message.query.filter(Message.id.in_([h[0] for h in hits])).all()} if hits else {}
+    return [(messages[i], render_snippet(s)) for i, s in hits if i in messages], next_cursor
+
+
+def init_app(app):
+    with app.app_context():
+        ensure_index()
+
+    @app.cli.command("reindex-messages")
+    def reindex_messages_command():
+        """Dựng lại full-text index cho toàn bộ tin nhắn."""
+        rebuild_index()
+        print(f"Đã dựng lại {INDEX_TABLE} ({get_backend().name})")
@@ -2,7 +2,10 @@ from datetime import datetime
 
 import pytz
 from flask_login import UserMixin
+from sqlalchemy import event
 from app.extensions import db, login_manager
+from utils.helpers import fold_text
+from utils.geo import geohash_encode
 from werkzeug.security import generate_password_hash, check_password_hash
 
 
@@ -21,6 +24,9 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     active = db.Column(db.Boolean, default=True)
     expiry_date = db.Column(db.DateTime, nullable=True)
+    # Bộ đếm chưa đọc cho badge, cập nhật cùng transaction bởi app.counters
+    unread_messages_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    unread_notifications_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
 
     # Liên kết One-to-One với Candidate/Employer
@@ -117,6 +123,7 @@ class Employer(db.Model):
     company_size = db.Column(db.String(50))
     address = db.Column(db.String(200))
     city = db.Column(db.String(100))
+    city_norm = db.Column(db.String(100), index=True)  # city đã chuẩn hoá (fold_text), dùng để lọc
     website = db.Column(db.String(200))
     description = db.Column(db.Text)
     logo = db.Column(db.String(255))
@@ -136,6 +143,12 @@ class Employer(db.Model):
 
 class Job(db.Model):
     __tablename__ = "jobs"
+    __table_args__ = (
+        db.Index("ix_jobs_city_norm_created_at", "city_norm", "created_at"),
+        db.Index("ix_jobs_city_norm_district_norm", "city_norm", "district_norm"),
+        db.Index("ix_jobs_job_type_norm_created_at", "job_type_norm", "created_at"),
+        db.Index("ix_jobs_remote_option_norm_created_at", "remote_option_norm", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     employer_id = db.Column(db.Integer, db.ForeignKey("employers.id"), nullable=False)
@@ -165,8 +178,15 @@ class Job(db.Model):
     remote_option = db.Column(db.String(20))  # Onsite | Remote | Hybrid
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
+    geohash = db.Column(db.String(12), index=True)  # ô lưới từ latitude/longitude, cho tìm kiếm theo bán kính
     interview_date = db.Column(db.DateTime)
 
+    # Cột chuẩn hoá (chữ thường, bỏ dấu) cho bộ lọc, cập nhật bởi event before_insert/before_update
+    city_norm = db.Column(db.String(100))
+    district_norm = db.Column(db.String(100))
+    job_type_norm = db.Column(db.String(50))
+    remote_option_norm = db.Column(db.String(20))
+
     employer = db.relationship("Employer", back_populates="jobs")
     applications = db.relationship("Application", back_populates="job")
     saved_jobs = db.relationship("SavedJob", back_populates="job")
@@ -176,6 +196,22 @@ class Job(db.Model):
         return f"<Job {self.title}>"
 
 
+@event.listens_for(Job, "before_insert")
+@event.listens_for(Job, "before_update")
+def _normalize_job_columns(mapper, connection, target):
+    target.city_norm = fold_text(target.city)
+    target.district_norm = fold_text(target.district)
+    target.job_type_norm = fold_text(target.job_type)
+    target.remote_option_norm = fold_text(target.remote_option)
+    target.geohash = geohash_encode(target.latitude, target.longitude)
+
+
+@event.listens_for(Employer, "before_insert")
+@event.listens_for(Employer, "before_update")
+def _normalize_employer_columns(mapper, connection, target):
+    target.city_norm = fold_text(target.city)
+
+
 class Application(db.Model):
     __tablename__ = "applications"
 
@@ -240,6 +276,12 @@ class Notification(db.Model):
     candidate_id = db.Column(db.Integer, db.ForeignKey("candidates.id"), nullable=True)
     employer_id = db.Column(db.Integer, db.ForeignKey("employers.id"), nullable=True)
 
+    __table_args__ = (
+        # Trang thông báo: mới nhất trước theo (created_at, id) của từng hồ sơ
+        db.Index("ix_notifications_candidate_id_created_at", "candidate_id", "created_at", "id"),
+        db.Index("ix_notifications_employer_id_created_at", "employer_id", "created_at", "id"),
+    )
+
     candidate = db.relationship("Candidate", back_populates="notifications")
     employer = db.relationship("Employer", back_populates="notifications")
 
@@ -258,11 +300,45 @@ class Conversation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user1_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     user2_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    # Cặp user đã sắp xếp (min, max): mỗi cặp chỉ có một hội thoại, tra cứu theo unique index
+    low_user_id = db.Column(db.Integer, nullable=False)
+    high_user_id = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Tóm tắt cho hộp thư, cập nhật cùng flush với tin nhắn (app.inbox)
+    last_message_id = db.Column(db.Integer)  # không đặt FK để tránh vòng conversations <-> messages
+    last_message_at = db.Column(db.DateTime, default=datetime.utcnow)  # chưa có tin nhắn thì = created_at
+    user1_unread_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    user2_unread_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        db.UniqueConstraint("low_user_id", "high_user_id", name="uq_conversations_user_pair"),
+        db.Index("ix_conversations_user1_id_last_message_at", "user1_id", "last_message_at"),
+        db.Index("ix_conversations_user2_id_last_message_at", "user2_id", "last_message_at"),
+    )
 
     user1 = db.relationship("User", foreign_keys=[user1_id])
     user2 = db.relationship("User", foreign_keys=[user2_id])
     messages = db.relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
+    last_message = db.relationship("Message", primaryjoin="foreign(Conversation.last_message_id) == Message.id",
+                                   viewonly=True)
+    reads = db.relationship("ConversationRead", cascade="all, delete-orphan")
+
+    def other_user_id(self, user_id):
+        return self.user2_id if self.user1_id == user_id else self.user1_id
+
+    def unread_count_for(self, user_id):
+        if self.user1_id == user_id:
+            return self.user1_unread_count or 0
+        if self.user2_id == user_id:
+            return self.user2_unread_count or 0
+        return 0
+
+
+@event.listens_for(Conversation, "before_insert")
+@event.listens_for(Conversation, "before_update")
+def _canonical_conversation_pair(mapper, connection, target):
+    target.low_user_id, target.high_user_id = sorted((target.user1_id, target.user2_id))
+
 
 class Message(db.Model):
     __tablename__ = "messages"
@@ -276,6 +352,11 @@ class Message(db.Model):
     attachment_url = db.Column(db.String(255))
     is_read = db.Column(db.Boolean, default=False)
 
+    __table_args__ = (
+        # Lịch sử chat: N tin mới nhất / trước before_id / sau after_id của một hội thoại
+        db.Index("ix_messages_conversation_id_id", "conversation_id", "id"),
+    )
+
     sender = db.relationship("User", foreign_keys=[sender_id], backref="sent_messages")
     receiver = db.relationship("User", foreign_keys=[receiver_id], backref="received_messages")
     conversation = db.relationship("Conversation", back_populates="messages")
@@ -284,6 +365,19 @@ class Message(db.Model):
         return f"<Message {self.sender_id} → {self.receiver_id}>"
 
 
+class ConversationRead(db.Model):
+    """
+    Mốc đã đọc của một người trong hội thoại: tin nhắn gửi cho user có id > last_read_message_id là chưa đọc.
+    Đánh dấu đã đọc chỉ ghi một dòng ở đây (app.inbox.mark_read); Message.is_read không còn được cập nhật.
+    """
+    __tablename__ = "conversation_reads"
+
+    conversation_id = db.Column(db.Integer, db.ForeignKey("conversations.id", ondelete="CASCADE"), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    last_read_message_id = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class Payment(db.Model):
     __tablename__ = "payments"
 
@@ -0,0 +1,133 @@
+import base64
+import binascii
+import json
+import os
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import select
+
+from app import counters
+from app.extensions import db
+from app.models import Notification
+
+# ============================
+# Trang thông báo, đánh dấu tất cả đã đọc, dọn thông báo cũ
+# ============================
+# Thông báo gắn với hồ sơ ứng viên hoặc nhà tuyển dụng. Trang thông báo đọc theo index
+# (candidate_id|employer_id, created_at, id) với phân trang cursor, không nạp cả relationship.
+# Đánh dấu tất cả / dọn dẹp là UPDATE / DELETE theo tập nên không qua mapper event:
+# tự chỉnh bộ đếm bằng counters.adjust_unread_notifications.
+
+NOTIFICATION_PAGE_SIZE = 20
+DROPDOWN_SIZE = 5                 # số thông báo trên dropdown ở header
+PURGE_BATCH_SIZE = 1000
+RETENTION_DAYS = 90               # mặc định của flask purge-notifications
+
+_notifications = Notification.__table__
+
+
+def owner_filter(user):
+    """Điều kiện lọc thông báo của user theo hồ sơ, None nếu user không có hồ sơ."""
+    if user.role == "candidate" and user.candidate_profile:
+        return _notifications.c.candidate_id == user.candidate_profile.id
+    if user.role == "employer" and user.employer_profile:
+        return _notifications.c.employer_id == user.employer_profile.id
+    return None
+
+
+def encode_cursor(notification):
+    payload = json.dumps({"t": notification.created_at.isoformat() if notification.created_at else None,
+                          "id": notification.id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Trả về (created_at, id) hoặc None nếu cursor sai."""
+    if not token:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return datetime.fromisoformat(payload["t"]), int(payload["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        return None
+
+
+def feed_page(user, after=None, per_page=NOTIFICATION_PAGE_SIZE):
+    """Thông báo của user, mới nhất trước. Trả về (notifications, next_cursor)."""
+    owner = owner_filter(user)
+    if owner is None:
+        return [], None
+    q = Notification.query.filter(owner)
+    cursor = decode_cursor(after)
+    if cursor is not None:
+        created_at, last_id = cursor
+        q = q.filter((Notification.created_at < created_at) |
+                     ((Notification.created_at == created_at) & (Notification.id < last_id)))
+    rows = q.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(per_page + 1).all()
+    next_cursor = encode_cursor(rows[per_page - 1]) if len(rows) > per_page else None
+    return rows[:per_page], next_cursor
+
+
+def recent(user, limit=DROPDOWN_SIZE):
+    return feed_page(user, per_page=limit)[0]
+
+
+def mark_all_read(user):
+    """
+    Một câu UPDATE cho mọi thông báo chưa đọc của user, trừ bộ đếm theo số dòng đổi.
+    Không commit; trả về số thông báo vừa đánh dấu.
+    """
+    owner = owner_filter(user)
+    if owner is None:
+        return 0
+    result = db.session.execute(
+        _notifications.update().where(owner, _notifications.c.is_read.isnot(True)).values(is_read=True)
+    )
+    if result.rowcount:
+        counters.adjust_unread_notifications(user.id, -result.rowcount)
+    return result.rowcount
+
+
+def purge_read(older_than_days, batch_size=PURGE_BATCH_SIZE):
+    """
+    Xoá thông báo đã đọc tạo trước older_than_days ngày, mỗi lô batch_size dòng một transaction
+    để không khoá bảng lâu. Thông báo chưa đọc giữ nguyên nên bộ đếm không đổi. Trả về số dòng đã xoá.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    deleted = 0
+    while True:
+        ids = db.session.execute(
+            select(_notifications.c.id)
+            .where(_notifications.c.is_read.is_(True), _notifications.c.created_at < cutoff)
+            .order_by(_notifications.c.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return deleted
+        db.session.execute(_notifications.delete().where(_notifications.c.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+
+
+def init_app(app):
+    """
+    Cấu hình hoặc biến môi trường cùng tên:
+    - NOTIFICATION_RETENTION_DAYS: số ngày giữ thông báo đã đọc khi chạy `flask purge-notifications`
+      không có --days (mặc định 90)
+    """
+    retention_days = int(app.config.get("NOTIFICATION_RETENTION_DAYS",
+                                        os.getenv("NOTIFICATION_RETENTION_DAYS", RETENTION_DAYS)))
+
+    @app.context_processor
+    def inject_recent_notifications():
+        # Hàm chứ không phải danh sách: chỉ query khi template thực sự vẽ dropdown
+        return dict(recent_notifications=recent)
+
+    @app.cli.command("purge-notifications")
+    @click.option("--days", type=int, default=retention_days, show_default=True,
+                  help="Xoá thông báo đã đọc cũ hơn số ngày này (mặc định NOTIFICATION_RETENTION_DAYS)")
+    @click.option("--batch-size", default=PURGE_BATCH_SIZE, show_default=True)
+    def purge_notifications_command(days, batch_size):
+        """Xoá thông báo đã đọc quá hạn lưu giữ, theo từng lô."""
+        deleted = purge_read(days, batch_size)
+        print(f"Đã xoá {deleted} thông báo đã đọc cũ hơn {days} ngày")
@@ -0,0 +1,172 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from flask import request
+from flask_login import current_user
+from werkzeug.utils import import_string
+
+# ============================
+# Trạng thái online (presence) và "đang nhập" trong chat, không ghi DB chính
+# ============================
+# Mỗi request của user đã đăng nhập (kể cả long-poll /badges mà mọi trang đều mở) là một
+# heartbeat: gia hạn online thêm TTL giây. last_seen chỉ lưu tới phút nên đa số heartbeat không
+# phải ghi gì. Backend:
+# - LocalPresenceBackend: dict trong process, đủ cho một worker
+# - SQLitePresenceBackend: file SQLite riêng trên máy, các worker cùng máy dùng chung
+# Cấu hình PRESENCE_BACKEND (đường dẫn import hoặc instance), PRESENCE_BACKEND_OPTIONS, PRESENCE_TTL.
+# Sự kiện "đang nhập" không lưu ở đâu cả: phát thẳng qua realtime.hub tới các stream của hội thoại.
+
+PRESENCE_TTL = 60                 # giây không có heartbeat thì coi là offline
+LAST_SEEN_RESOLUTION = 60         # last_seen làm tròn xuống theo phút
+LAST_SEEN_RETENTION = 7 * 24 * 3600
+PRUNE_INTERVAL = 3600             # giây giữa hai lần dọn last_seen quá cũ
+TYPING_TTL = 6                    # client ẩn "đang nhập..." sau bấy nhiêu giây nếu không có sự kiện mới
+
+
+def _coarse(ts):
+    return int(ts // LAST_SEEN_RESOLUTION * LAST_SEEN_RESOLUTION)
+
+
+class LocalPresenceBackend:
+    """
+    Backend trong process. Backend khác cần cùng các hàm:
+    touch(user_id, expires_at, last_seen), get_many(user_ids) -> {user_id: (expires_at, last_seen)}, prune(before).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def touch(self, user_id, expires_at, last_seen):
+        with self._lock:
+            self._entries[user_id] = (expires_at, last_seen)
+
+    def get_many(self, user_ids):
+        with self._lock:
+            return {uid: self._entries[uid] for uid in user_ids if uid in self._entries}
+
+    def prune(self, before):
+        with self._lock:
+            for uid in [uid for uid, (_, seen) in self._entries.items() if seen < before]:
+                del self._entries[uid]
+
+
+class SQLitePresenceBackend:
+    """File SQLite dùng chung giữa các worker trên cùng máy (WAL, mỗi thread một connection)."""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(tempfile.gettempdir(), "presence.db")
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS presence ("
+            "user_id INTEGER PRIMARY KEY, expires_at REAL NOT NULL, last_seen INTEGER NOT NULL)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def touch(self, user_id, expires_at, last_seen):
+        self._conn().execute(
+            "INSERT INTO presence (user_id, expires_at, last_seen) VALUES (?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET expires_at = excluded.expires_at, last_seen = excluded.last_seen",
+            (user_id, expires_at, last_seen))
+
+    def get_many(self, user_ids):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        placeholders = ",".join("?" * len(user_ids))
+        rows = self._conn().execute(
+            f"SELECT user_id, expires_at, last_seen FROM presence WHERE user_id IN ({placeholders})", user_ids)
+        return {uid: (expires_at, last_seen) for uid, expires_at, last_seen in rows}
+
+    def prune(self, before):
+        self._conn().execute("DELETE FROM presence WHERE last_seen < ?", (before,))
+
+
+class PresenceRegistry:
+
+    def __init__(self, backend=None, ttl=PRESENCE_TTL):
+        self.backend = backend or LocalPresenceBackend()
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._written = {}        # user_id -> (expires_at, last_seen) lần ghi gần nhất của process này
+        self._last_prune = time.time()
+
+    def touch(self, user_id, now=None):
+        """
+        Heartbeat. Chỉ ghi xuống backend khi hạn online đã trôi quá nửa TTL hoặc last_seen sang phút mới.
+        Trả về True nếu có ghi.
+        """
+        now = time.time() if now is None else now
+        last_seen = _coarse(now)
+        with self._lock:
+            written = self._written.get(user_id)
+            if written is not None and written[0] - now > self.ttl / 2 and written[1] == last_seen:
+                return False
+            self._written[user_id] = (now + self.ttl, last_seen)
+            prune_due = now - self._last_prune > PRUNE_INTERVAL
+            if prune_due:
+                self._last_prune = now
+        self.backend.touch(user_id, now + self.ttl, last_seen)
+        if prune_due:
+            self.prune(now)
+        return True
+
+    def status(self, user_ids, now=None):
+        """{user_id: {"online": bool, "last_seen": epoch giây (đã làm tròn) hoặc None}}"""
+        now = time.time() if now is None else now
+        entries = self.backend.get_many(user_ids)
+        result = {}
+        for uid in user_ids:
+            expires_at, last_seen = entries.get(uid, (0, None))
+            result[uid] = {"online": expires_at > now, "last_seen": last_seen}
+        return result
+
+    def is_online(self, user_id):
+        return self.status([user_id])[user_id]["online"]
+
+    def prune(self, now=None):
+        now = time.time() if now is None else now
+        self.backend.prune(now - LAST_SEEN_RETENTION)
+        with self._lock:
+            self._written = {uid: w for uid, w in self._written.items() if w[0] > now}
+
+
+registry = PresenceRegistry()
+
+
+def typing_event(user_id, conversation_id, typing=True):
+    # Không có id: không ảnh hưởng Last-Event-ID / resume của stream tin nhắn
+    return {"event": "typing",
+            "data": {"user_id": user_id, "conversation_id": conversation_id, "typing": typing, "ttl": TYPING_TTL}}
+
+
+def init_app(app):
+    """
+    Cấu hình:
+    - PRESENCE_BACKEND: đường dẫn import tới lớp backend (mặc định LocalPresenceBackend),
+      vd. "app.presence.SQLitePresenceBackend" khi chạy nhiều worker
+    - PRESENCE_BACKEND_OPTIONS: dict tham số cho backend, vd. {"path": "/var/run/job/presence.db"}
+    - PRESENCE_TTL
+    """
+    backend = app.config.get("PRESENCE_BACKEND")
+    if backend:
+        options = app.config.get("PRESENCE_BACKEND_OPTIONS", {})
+        registry.backend = import_string(backend)(**options) if isinstance(backend, str) else backend
+    registry.ttl = app.config.get("PRESENCE_TTL", PRESENCE_TTL)
+
+    @app.before_request
+    def _presence_heartbeat():
+        if request.endpoint == "static":
+            return
+        if current_user.is_authenticated:
+            registry.touch(current_user.id)
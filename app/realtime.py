@@ -0,0 +1,219 @@
+import json
+import queue
+import threading
+from collections import defaultdict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from werkzeug.utils import import_string
+
+from app.models import Message
+
+# ============================
+# Đẩy sự kiện realtime (Server-Sent Events) thay cho polling
+# ============================
+# Hub giữ danh sách subscriber theo kênh (vd. "conversation:12"), mỗi subscriber là một hàng đợi.
+# Sự kiện đi qua backend: LocalBackend chuyển thẳng trong process; khi chạy nhiều worker thì
+# thay bằng backend pub/sub dùng chung (Redis...) qua cấu hình REALTIME_BACKEND.
+# Tin nhắn mới chỉ được phát sau khi commit (rollback thì bỏ), giống IncrementalIndex.
+#
+# Mỗi kết nối SSE giữ một thread của server: chạy với worker gevent/eventlet hoặc thread đủ nhiều.
+
+HEARTBEAT_INTERVAL = 15          # giây, comment ": ping" giữ kết nối qua proxy
+MAX_CONNECTIONS_PER_USER = 5
+SUBSCRIBER_QUEUE_SIZE = 256
+RETRY_MS = 3000                  # trình duyệt chờ bấy nhiêu trước khi tự kết nối lại
+
+_PENDING_KEY = "realtime_pending"
+
+
+class TooManyConnections(Exception):
+    pass
+
+
+class LocalBackend:
+    """
+    Backend trong process. Backend dùng chung giữa các process cần cài đặt cùng hai hàm:
+    start(deliver) đăng ký callback nhận sự kiện, publish(channel, event) gửi sự kiện đi.
+    """
+
+    def __init__(self):
+        self._deliver = None
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, channel, event):
+        if self._deliver is not None:
+            self._deliver(channel, event)
+
+
+class Subscription:
+
+    def __init__(self, hub, channel, user_id):
+        self.hub = hub
+        self.channel = channel
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def get(self, timeout):
+        """Sự kiện tiếp theo hoặc None nếu hết timeout."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class Hub:
+
+    def __init__(self, backend=None, max_per_user=MAX_CONNECTIONS_PER_USER):
+        self._lock = threading.Lock()
+        self._channels = defaultdict(set)
+        self._per_user = defaultdict(int)
+        self.max_per_user = max_per_user
+        self.set_backend(backend or LocalBackend())
+
+    def set_backend(self, backend):
+        self.backend = backend
+        backend.start(self._deliver)
+
+    def subscribe(self, channel, user_id):
+        with self._lock:
+            if self._per_user[user_id] >= self.max_per_user:
+                raise TooManyConnections(user_id)
+            self._per_user[user_id] += 1
+            subscription = Subscription(self, channel, user_id)
+            self._channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is None or subscription not in subscribers:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._channels[subscription.channel]
+            self._per_user[subscription.user_id] -= 1
+            if self._per_user[subscription.user_id] <= 0:
+                del self._per_user[subscription.user_id]
+
+    def publish(self, channel, event):
+        """event: dict có "id", "event", "data"."""
+        self.backend.publish(channel, event)
+
+    def _deliver(self, channel, event):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                # Client đọc quá chậm: đóng stream, trình duyệt kết nối lại và resume bằng Last-Event-ID
+                subscription.overflowed = True
+
+    def connection_count(self, user_id=None):
+        with self._lock:
+            if user_id is not None:
+                return self._per_user.get(user_id, 0)
+            return sum(self._per_user.values())
+
+
+hub = Hub()
+
+
+def format_sse(event):
+    lines = []
+    if event.get("id") is not None:
+        lines.append(f"id: {event['id']}")
+    if event.get("event"):
+        lines.append(f"event: {event['event']}")
+    data = json.dumps(event.get("data"), ensure_ascii=False, separators=(",", ":"))
+    lines.extend(f"data: {line}" for line in data.splitlines())
+    return "\n".join(lines) + "\n\n"
+
+
+def stream(subscription, backlog=(), last_id=0, heartbeat=None):
+    """
+    Sinh chuỗi SSE: backlog (đọc từ DB trước đó) rồi sự kiện live từ subscription.
+    Sự kiện có id <= id đã gửi bị bỏ, nên subscribe trước khi đọc backlog không gây trùng.
+    Không chạm vào DB hay request context: chạy được sau khi request đã trả response.
+    Client ngắt kết nối được phát hiện ở lần ghi kế tiếp (chậm nhất một nhịp heartbeat).
+    """
+    heartbeat = heartbeat or HEARTBEAT_INTERVAL
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        for event in backlog:
+            last_id = max(last_id, event["id"])
+            yield format_sse(event)
+        while not subscription.overflowed:
+            event = subscription.get(timeout=heartbeat)
+            if event is None:
+                yield ": ping\n\n"
+                continue
+            if event.get("id") is not None:
+                if event["id"] <= last_id:
+                    continue
+                last_id = event["id"]
+            yield format_sse(event)
+    finally:
+        subscription.close()
+
+
+def conversation_channel(conversation_id):
+    return f"conversation:{conversation_id}"
+
+
+def message_payload(msg):
+    return {
+        "id": msg.id,
+        "sender_id": msg.sender_id,
+        "receiver_id": msg.receiver_id,
+        "content": msg.content,
+        "created_at": msg.created_at.isoformat() if msg.created_at else None,
+        "created_at_display": msg.created_at.strftime("%H:%M %d/%m/%Y") if msg.created_at else None,
+        "conversation_id": msg.conversation_id,
+    }
+
+
+def message_event(msg):
+    return {"id": msg.id, "event": "message", "data": message_payload(msg)}
+
+
+def publish_after_commit(session, channel, event):
+    """Phát event khi session commit (bỏ nếu rollback), vd. cho tin nhắn insert bằng Core."""
+    session.info.setdefault(_PENDING_KEY, []).append((channel, event))
+
+
+@event.listens_for(Message, "after_insert")
+def _queue_message_event(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        publish_after_commit(session, conversation_channel(target.conversation_id), message_event(target))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session):
+    for channel, message in session.info.pop(_PENDING_KEY, ()):
+        hub.publish(channel, message)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_app(app):
+    """
+    Cấu hình:
+    - REALTIME_BACKEND: đường dẫn import tới lớp backend (mặc định LocalBackend)
+    - REALTIME_MAX_CONNECTIONS_PER_USER
+    """
+    backend = app.config.get("REALTIME_BACKEND")
+    if backend:
+        hub.set_backend(import_string(backend)() if isinstance(backend, str) else backend)
+    hub.max_per_user = app.config.get("REALTIME_MAX_CONNECTIONS_PER_USER", MAX_CONNECTIONS_PER_USER)
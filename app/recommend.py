@@ -0,0 +1,260 @@
+import json
+import re
+import zlib
+from collections import Counter
+from datetime import date
+
+import numpy as np
+from scipy import sparse
+
+from app.extensions import db
+from app.indexing import IncrementalIndex, chunked
+from app.models import Job, Application
+from utils.helpers import fold_text
+
+# ============================
+# Gợi ý việc làm cho ứng viên ("Việc làm dành cho bạn")
+# ============================
+# Mỗi job được băm thành vector thưa (hashing trick) từ tiêu đề/yêu cầu/mô tả đã bỏ dấu,
+# lưu sẵn theo job. Khi gợi ý: ghép thành ma trận CSR, nhân IDF và chuẩn hoá, rồi tính
+# cosine với hồ sơ ứng viên cho tất cả job còn hạn trong một phép nhân ma trận.
+# Điểm cuối = trộn độ khớp nội dung + mức lương phù hợp + cùng thành phố.
+
+N_FEATURES = 1 << 18
+TEXT_WEIGHT = 0.7
+SALARY_WEIGHT = 0.15
+CITY_WEIGHT = 0.15
+NEUTRAL_FIT = 0.5          # thiếu dữ liệu lương thì coi là trung tính
+
+# Trọng số theo trường (lặp token thay vì nhân để giữ TF dạng đếm)
+JOB_FIELDS = (("title", 3), ("requirements", 2), ("description", 1))
+CANDIDATE_FIELDS = (("expected_position", 3), ("current_position", 2), ("skills", 2), ("major", 1))
+
+_WORD = re.compile(r"[\w+#]+")
+
+
+def _tokens(text):
+    words = _WORD.findall(fold_text(text) or "")
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _hash(token):
+    return zlib.crc32(token.encode("utf-8")) % N_FEATURES
+
+
+def hash_features(fields):
+    """[(text, weight)] -> (indices, tf) đã sắp theo index; tf = 1 + log(count)."""
+    tokens = Counter()
+    for text, weight in fields:
+        for token in _tokens(text):
+            tokens[token] += weight
+    counts = Counter()
+    for token, count in tokens.items():
+        counts[_hash(token)] += count
+    if not counts:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+    indices = np.fromiter(sorted(counts), dtype=np.int32, count=len(counts))
+    tf = 1.0 + np.log(np.array([counts[i] for i in indices], dtype=np.float32))
+    return indices, tf.astype(np.float32)
+
+
+def _skills_text(value):
+    """Candidate.skills là JSON list hoặc chuỗi phân tách bằng dấu phẩy."""
+    if not value:
+        return ""
+    try:
+        data = json.loads(value)
+    except (TypeError, ValueError):
+        return value.replace(",", " ; ")
+    if isinstance(data, list):
+        return " ; ".join(str(s.get("name", s) if isinstance(s, dict) else s) for s in data)
+    return str(data)
+
+
+def candidate_features(candidate):
+    fields = []
+    for name, weight in CANDIDATE_FIELDS:
+        value = getattr(candidate, name, None)
+        if name == "skills":
+            value = _skills_text(value)
+        if value:
+            fields.append((value, weight))
+    return hash_features(fields)
+
+
+class RecommendIndex(IncrementalIndex):
+    """
+    Vector của job được giữ theo (job_id, updated_at): lần nạp lại toàn bộ định kỳ chỉ đọc
+    các cột nhỏ, text chỉ được đọc và băm lại cho job mới hoặc đã sửa.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._vectors = {}                  # job_id -> (updated_at, indices, tf)
+        self._reset()
+
+    def _reset(self):
+        self._slot_of = {}                  # job_id -> slot
+        self._job_ids = []                  # slot -> job_id (None nếu đã xoá)
+        self._features = []                 # slot -> (indices, tf)
+        self._salary_top = []
+        self._city = []
+        self._remote = []
+        self._deadline = []
+        self._df = np.zeros(N_FEATURES, dtype=np.int32)
+        self._n_docs = 0
+        self._matrix = None
+
+    # --- Nạp dữ liệu ---
+    def _rows(self, ids=None):
+        q = db.session.query(Job.id, Job.updated_at, Job.salary_min, Job.salary_max,
+                             Job.city_norm, Job.remote_option_norm, Job.deadline)
+        if ids is not None:
+            q = q.filter(Job.id.in_(ids))
+        return q.all()
+
+    def _load(self, rows, force=False, update_df=True):
+        stale = [row.id for row in rows
+                 if force or self._vectors.get(row.id, (None,))[0] != row.updated_at or row.updated_at is None]
+        text_columns = [getattr(Job, name) for name, _ in JOB_FIELDS]
+        for batch in chunked(stale):
+            for job_id, updated_at, *texts in db.session.query(Job.id, Job.updated_at, *text_columns) \
+                    .filter(Job.id.in_(batch)):
+                fields = [(text, weight) for text, (_, weight) in zip(texts, JOB_FIELDS)]
+                self._vectors[job_id] = (updated_at, *hash_features(fields))
+        for row in rows:
+            self._add(row, update_df)
+
+    def load_all(self):
+        self._reset()
+        rows = self._rows()
+        live = {row.id for row in rows}
+        for job_id in [i for i in self._vectors if i not in live]:
+            del self._vectors[job_id]
+        self._load(rows, update_df=False)
+        if self._features:
+            self._df = np.bincount(np.concatenate([ix for ix, _ in self._features]),
+                                   minlength=N_FEATURES).astype(np.int32)
+
+    def load_ids(self, ids):
+        for job_id in ids:
+            self._remove(job_id)
+            self._vectors.pop(job_id, None)
+        for batch in chunked(ids):
+            self._load(self._rows(batch), force=True)
+        self._matrix = None
+
+    def _add(self, row, update_df=True):
+        if row.id not in self._vectors:
+            return
+        _, indices, tf = self._vectors[row.id]
+        slot = len(self._job_ids)
+        self._slot_of[row.id] = slot
+        self._job_ids.append(row.id)
+        self._features.append((indices, tf))
+        if update_df:
+            self._df[indices] += 1
+        self._n_docs += 1
+        top = row.salary_max if row.salary_max is not None else row.salary_min
+        self._salary_top.append(np.nan if top is None else top)
+        self._city.append(row.city_norm or "")
+        self._remote.append(row.remote_option_norm == "remote")
+        self._deadline.append(row.deadline.toordinal() if row.deadline else np.iinfo(np.int64).max)
+
+    def _remove(self, job_id):
+        slot = self._slot_of.pop(job_id, None)
+        if slot is None:
+            return
+        indices, _ = self._features[slot]
+        self._df[indices] -= 1
+        self._n_docs -= 1
+        self._job_ids[slot] = None
+        self._features[slot] = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))
+        self._deadline[slot] = -1
+
+    # --- Ma trận TF-IDF, dựng lại từ vector đã lưu (không đọc lại text) ---
+    def _idf(self):
+        return np.log((1 + self._n_docs) / (1 + self._df.astype(np.float32))) + 1
+
+    def _build_matrix(self):
+        idf = self._idf()
+        lengths = np.array([len(ix) for ix, _ in self._features], dtype=np.int64)
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        if indptr[-1]:
+            indices = np.concatenate([ix for ix, _ in self._features])
+            data = np.concatenate([tf for _, tf in self._features]) * idf[indices]
+        else:
+            indices = np.empty(0, dtype=np.int32)
+            data = np.empty(0, dtype=np.float32)
+        matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(self._features), N_FEATURES))
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        matrix = sparse.diags(1 / norms) @ matrix
+        self._matrix = (
+            matrix.tocsr(),
+            idf,
+            np.array(self._salary_top, dtype=float),
+            np.array(self._city, dtype=object),
+            np.array(self._remote, dtype=bool),
+            np.array(self._deadline, dtype=np.int64),
+        )
+        return self._matrix
+
+    # --- Truy vấn ---
+    def recommend(self, candidate, limit=10, exclude_ids=(), today=None):
+        """[(job_id, score)] sắp theo điểm giảm dần, chỉ gồm job còn hạn."""
+        today = today or date.today()
+        q_indices, q_tf = candidate_features(candidate)
+        self.ensure_fresh()
+        with self._lock:
+            if not self._job_ids:
+                return []
+            matrix, idf, salary_top, city, remote, deadline = self._matrix or self._build_matrix()
+
+            if len(q_indices):
+                q = np.zeros(N_FEATURES, dtype=np.float32)
+                q[q_indices] = q_tf * idf[q_indices]
+                q /= np.linalg.norm(q) or 1
+                text_score = matrix @ q
+            else:
+                text_score = np.zeros(matrix.shape[0], dtype=np.float32)
+
+            if candidate.expected_salary:
+                with np.errstate(invalid="ignore"):
+                    salary_fit = np.clip(salary_top / candidate.expected_salary, 0, 1)
+                salary_fit[np.isnan(salary_fit)] = NEUTRAL_FIT
+            else:
+                salary_fit = np.full(matrix.shape[0], NEUTRAL_FIT)
+
+            candidate_city = fold_text(candidate.city) or ""
+            city_match = remote | ((city == candidate_city) & (candidate_city != ""))
+
+            score = TEXT_WEIGHT * text_score + SALARY_WEIGHT * salary_fit + CITY_WEIGHT * city_match
+            eligible = deadline >= today.toordinal()
+            if len(q_indices):
+                eligible &= text_score > 0
+            for job_id in exclude_ids:
+                slot = self._slot_of.get(job_id)
+                if slot is not None:
+                    eligible[slot] = False
+
+            candidates = np.flatnonzero(eligible)
+            if not len(candidates):
+                return []
+            k = min(limit, len(candidates))
+            top = candidates[np.argpartition(-score[candidates], k - 1)[:k]]
+            top = top[np.argsort(-score[top], kind="stable")]
+            return [(self._job_ids[slot], float(score[slot])) for slot in top]
+
+
+recommend_index = RecommendIndex()
+recommend_index.watch(Job)
+
+
+def recommended_jobs(candidate, limit=10):
+    """Danh sách (Job, điểm) cho ứng viên, bỏ các job đã ứng tuyển."""
+    applied = [job_id for (job_id,) in
+               db.session.query(Application.job_id).filter(Application.candidate_id == candidate.id)]
+    ranked = recommend_index.recommend(candidate, limit=limit, exclude_ids=applied)
+    jobs = {job.id: job for job in Job.query.filter(Job.id.in_([job_id for job_id, _ in ranked]))}
+    return [(jobs[job_id], score) for job_id, score in ranked if job_id in jobs]
@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from app.models import User, Candidate, Employer, Job, db
+from app.loaders import prime
 from sqlalchemy import extract, func
 from datetime import datetime, timedelta
 
@@ -59,7 +60,7 @@ def dashboard():
     employer_values = [next((count for m, count in employer_counts if m == i), 0) for i in range(1, 13)]
 
     # ===== Recent items =====
-    recent_jobs = Job.query.order_by(Job.created_at.desc()).limit(5).all()
+    recent_jobs = prime(Job.query.order_by(Job.created_at.desc()).limit(5).all(), "employer")
     recent_candidates = Candidate.query.order_by(Candidate.created_at.desc()).limit(5).all()
     recent_employers = Employer.query.order_by(Employer.created_at.desc()).limit(5).all()
 
@@ -143,7 +144,7 @@ def delete_user(user_id):
 @login_required
 @admin_required
 def list_candidates():
-    candidates = Candidate.query.all()
+    candidates = prime(Candidate.query.all(), "user")
     return render_template("admin/candidates.html", candidates=candidates)
 
 
@@ -173,7 +174,7 @@ def delete_candidate(candidate_id):
 @login_required
 @admin_required
 def list_employers():
-    employers = Employer.query.all()
+    employers = prime(Employer.query.all(), "user", "jobs")
     return render_template("admin/employers.html", employers=employers)
 
 
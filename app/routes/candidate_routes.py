@@ -15,6 +15,9 @@ import os
 from utils.mail_utils import send_email  # đảm bảo import hàm gửi mail
 
 from app.routes.cv_routes import CVHistory
+from app.recommend import recommended_jobs
+from app.loaders import prime
+from app import notifications
 
 candidate_bp = Blueprint("candidate", __name__, url_prefix="/candidate")
 
@@ -156,13 +159,42 @@ def saved_jobs():
 
     saved_jobs = SavedJob.query.filter_by(candidate_id=current_user.candidate_profile.id) \
         .order_by(SavedJob.saved_at.desc()).all()
+    prime(saved_jobs, "job.employer")
     return render_template("candidate/saved_jobs.html", saved_jobs=saved_jobs)
 
 
+# Việc làm gợi ý cho ứng viên (JSON)
+@candidate_bp.route("/recommended_jobs")
+@login_required
+def recommended_jobs_json():
+    if current_user.role != "candidate" or not current_user.candidate_profile:
+        return jsonify({"error": "Chỉ ứng viên mới xem được việc làm gợi ý"}), 403
+
+    limit = max(1, min(request.args.get("limit", 10, type=int), 50))
+    return jsonify({
+        "jobs": [
+            {
+                "id": job.id,
+                "title": job.title,
+                "company_name": job.employer.company_name if job.employer else None,
+                "city": job.city,
+                "job_type": job.job_type,
+                "remote_option": job.remote_option,
+                "salary_min": job.salary_min,
+                "salary_max": job.salary_max,
+                "score": round(score, 4),
+                "url": url_for("job.job_detail", job_id=job.id),
+            }
+            for job, score in recommended_jobs(current_user.candidate_profile, limit=limit)
+        ]
+    })
+
+
 @candidate_bp.route("/applications")
 @login_required
 def applications():
     apps = Application.query.filter_by(candidate_id=current_user.candidate_profile.id).all()
+    prime(apps, "job.employer.user", "cv")
     return render_template("candidate/applications.html", applications=apps)
 
 
@@ -281,15 +313,9 @@ def upload_avatar():
 @login_required
 def view_notifications():
     form = NotificationForm()
-    if current_user.role == "candidate":
-        notifs = current_user.candidate_profile.notifications
-    elif current_user.role == "employer":
-        notifs = current_user.employer_profile.notifications
-    else:
-        notifs = []
-
-    notifs = sorted(notifs, key=lambda n: n.created_at, reverse=True)
-    return render_template("notifications/notifications.html", notifications=notifs, form=form)
+    notifs, next_cursor = notifications.feed_page(current_user, after=request.args.get("after"))
+    return render_template("notifications/notifications.html", notifications=notifs, form=form,
+                           next_cursor=next_cursor)
 
 @candidate_bp.route("/notifications/mark_read/<int:notif_id>", methods=["POST"])
 @login_required
@@ -316,12 +342,7 @@ def mark_all_notifications_read():
     if current_user.role != "candidate" or not (hasattr(current_user, 'candidate_profile') and current_user.candidate_profile):
         return jsonify({"success": False, "message": "Chỉ ứng viên mới dùng chức năng này"}), 403
 
-    notifications = Notification.query.filter_by(
-        candidate_id=current_user.candidate_profile.id,
-        is_read=False
-    ).all()
-    for notif in notifications:
-        notif.is_read = True
+    notifications.mark_all_read(current_user)
     db.session.commit()
     return jsonify({"success": True, "message": "Tất cả thông báo đã được đánh dấu là đã đọc"})
 
@@ -329,9 +350,7 @@ def mark_all_notifications_read():
 @candidate_bp.route("/unread_notifications_count")
 @login_required
 def unread_notifications_count():
-    # chỉ đếm notifications gắn candidate_id cho tài khoản candidate hiện tại
-    if current_user.role != "candidate" or not getattr(current_user, "candidate_profile", None):
+    # bộ đếm lưu sẵn trên users (app.counters), không cần COUNT
+    if current_user.role != "candidate":
         return jsonify({"count": 0})
-    candidate_id = current_user.candidate_profile.id
-    count = Notification.query.filter_by(candidate_id=candidate_id, is_read=False).count()
-    return jsonify({"count": count})
+    return jsonify({"count": current_user.unread_notifications_count})
@@ -6,9 +6,14 @@ from flask_wtf.csrf import validate_csrf
 from sqlalchemy import func, case, or_, and_
 from werkzeug.utils import secure_filename
 
-from app.models import Job, Application, Employer, Notification
+from app.models import Job, Application, Employer, Notification, Candidate
+from app.candidate_search import search_candidates
+from app.http_cache import page_validators, conditional_page
+from app.loaders import prime
 from app.extensions import db
-from app.forms import JobForm, EmployerProfileForm, NotificationForm
+from app.forms import JobForm, EmployerProfileForm, NotificationForm, BulkMessageForm
+from app import inbox, notifications
+from utils.helpers import fold_text
 from datetime import datetime, date, time
 from cloudinary.uploader import upload
 
@@ -113,8 +118,92 @@ def view_applicants(job_id):
     if current_user.role != "employer" or job.employer_id != current_user.employer_profile.id:
         flash("Không có quyền truy cập", "danger")
         return redirect(url_for("employer.dashboard"))
-    applications = job.applications
-    return render_template("employer/view_applications.html", job=job, applications=applications)
+    applications = prime(job.applications, "candidate.user")
+    return render_template("employer/view_applications.html", job=job, applications=applications,
+                           bulk_form=BulkMessageForm())
+
+# ======================================================
+# Nhắn tin hàng loạt cho ứng viên của một job
+# ======================================================
+@employer_bp.route("/job/<int:job_id>/applicants/message", methods=["POST"])
+@login_required
+def message_applicants(job_id):
+    job = Job.query.get_or_404(job_id)
+    wants_json = request.accept_mimetypes.best == "application/json"
+    if current_user.role != "employer" or job.employer_id != current_user.employer_profile.id:
+        if wants_json:
+            return jsonify({"success": False, "message": "Không có quyền truy cập"}), 403
+        flash("Không có quyền truy cập", "danger")
+        return redirect(url_for("employer.dashboard"))
+
+    form = BulkMessageForm()
+    if not form.validate_on_submit():
+        if wants_json:
+            return jsonify({"success": False, "errors": form.errors}), 400
+        flash("Vui lòng nhập nội dung tin nhắn", "warning")
+        return redirect(url_for("employer.view_applicants", job_id=job.id))
+
+    # Chỉ gửi cho user là ứng viên của job này (một query lấy toàn bộ)
+    applicant_user_ids = set(db.session.execute(
+        db.select(Candidate.user_id).join(Application, Application.candidate_id == Candidate.id)
+        .where(Application.job_id == job.id)
+    ).scalars())
+    requested = request.form.getlist("recipient_ids", type=int)
+    recipient_ids = [uid for uid in requested if uid in applicant_user_ids]
+
+    results = inbox.send_bulk(current_user.id, recipient_ids, form.content.data.strip())
+    for uid in requested:
+        results.setdefault(uid, {"status": "not_applicant"})
+    db.session.commit()
+
+    sent = sum(1 for r in results.values() if r["status"] == inbox.BULK_SENT)
+    failed = len(results) - sent
+    if wants_json:
+        return jsonify({"success": True, "sent": sent, "failed": failed,
+                        "results": {str(uid): r for uid, r in results.items()}})
+    if sent:
+        flash(f"Đã gửi tin nhắn tới {sent} ứng viên", "success")
+    if failed:
+        flash(f"{failed} người nhận không gửi được (không phải ứng viên của tin này)", "warning")
+    if not results:
+        flash("Chưa chọn ứng viên nào", "warning")
+    return redirect(url_for("employer.view_applicants", job_id=job.id))
+
+# ======================================================
+# Tìm ứng viên (chỉ dành cho tài khoản Premium)
+# ======================================================
+@employer_bp.route("/candidates")
+@login_required
+def search_candidates_view():
+    if current_user.role != "employer":
+        flash("Chỉ nhà tuyển dụng mới tìm được ứng viên", "danger")
+        return redirect(url_for("job.list_jobs"))
+    if not current_user.isPremiumActive:
+        flash("Bạn cần nâng cấp tài khoản Premium để tìm kiếm ứng viên", "warning")
+        return redirect(url_for("payment.payment_view"))
+
+    keyword = (request.args.get("q", "") or "").strip()
+    city = (request.args.get("city", "") or "").strip()
+    min_experience_years = request.args.get("min_experience", type=int)
+    max_salary = request.args.get("max_salary", type=int)
+    per_page = max(1, min(request.args.get("per_page", 20, type=int), 50))
+
+    page = search_candidates(
+        keyword=keyword,
+        city=city,
+        min_experience_months=min_experience_years * 12 if min_experience_years else None,
+        max_salary=max_salary,
+        after=request.args.get("after"),
+        per_page=per_page
+    )
+    search_params = {
+        "q": keyword,
+        "city": city,
+        "min_experience": min_experience_years or "",
+        "max_salary": max_salary or "",
+        "per_page": per_page
+    }
+    return render_template("employer/search_candidates.html", page=page, search=search_params)
 
 # ======================================================
 # Sửa tin tuyển dụng
@@ -291,7 +380,13 @@ def list_employers():
         ))
 
     if city:
-        base_query = base_query.filter(Employer.city.ilike(f"%{city}%"))
+        # Khớp từ đầu một từ của tên thành phố đã bỏ dấu: "ho chi" và "chi minh" đều ra "TP Hồ Chí Minh".
+        # Nhánh tiền tố dùng được index city_norm; escape %/_ để người dùng không tự chèn wildcard
+        term = fold_text(city).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        base_query = base_query.filter(or_(
+            Employer.city_norm.like(f"{term}%", escape="\\"),
+            Employer.city_norm.like(f"% {term}%", escape="\\"),
+        ))
 
     # Subquery để đếm số công việc đang mở
     now = date.today()
@@ -339,37 +434,41 @@ def list_employers():
 @employer_bp.route('/employers/<int:employer_id>')
 def employer_detail(employer_id):
     employer = Employer.query.get_or_404(employer_id)
-    now = date.today()
-
-    # Fetch active jobs for the employer
-    jobs = Job.query.filter(
-        Job.employer_id == employer_id,
-        or_(Job.deadline == None, Job.deadline >= now)
-    ).all()
-
-    for job in jobs:
-        job.is_active = (job.deadline is None) or (job.deadline >= now)
+    # Trang liệt kê job của công ty: validator gồm job sửa gần nhất và số job (bắt cả job bị xoá)
+    jobs_updated_at, jobs_count = db.session.query(func.max(Job.updated_at), func.count(Job.id)) \
+        .filter(Job.employer_id == employer_id).one()
+    etag, last_modified = page_validators("employer", employer_id, employer.updated_at,
+                                          jobs_updated_at, jobs_count)
+
+    def render():
+        now = date.today()
+
+        # Fetch active jobs for the employer
+        jobs = Job.query.filter(
+            Job.employer_id == employer_id,
+            or_(Job.deadline == None, Job.deadline >= now)
+        ).all()
+
+        for job in jobs:
+            job.is_active = (job.deadline is None) or (job.deadline >= now)
+
+        return render_template(
+            'employer/employer_detail.html',
+            employer=employer,
+            jobs=jobs,
+            now=now
+        )
 
-    return render_template(
-        'employer/employer_detail.html',
-        employer=employer,
-        jobs=jobs,
-        now=now
-    )
+    return conditional_page(etag, last_modified, render)
 
 
 @employer_bp.route("/notifications")
 @login_required
 def view_notifications():
     form = NotificationForm()
-    if current_user.role == "candidate":
-        notifs = current_user.candidate_profile.notifications
-    elif current_user.role == "employer":
-        notifs = current_user.employer_profile.notifications
-    else:
-        notifs = []
-    notifs = sorted(notifs, key=lambda n: n.created_at, reverse=True)
-    return render_template("employer/notifications.html", notifications=notifs)
+    notifs, next_cursor = notifications.feed_page(current_user, after=request.args.get("after"))
+    return render_template("notifications/notifications.html", notifications=notifs, form=form,
+                           next_cursor=next_cursor)
 
 @employer_bp.route("/notifications/mark_read/<int:notif_id>", methods=["POST"])  # alias to match candidate
 @login_required
@@ -403,12 +502,7 @@ def mark_all_notifications_read():
     if current_user.role != "employer" or not (hasattr(current_user, 'employer_profile') and current_user.employer_profile):
         return jsonify({"success": False, "message": "Chỉ nhà tuyển dụng mới dùng chức năng này"}), 403
 
-    notifications = Notification.query.filter_by(
-        employer_id=current_user.employer_profile.id,
-        is_read=False
-    ).all()
-    for notif in notifications:
-        notif.is_read = True
+    notifications.mark_all_read(current_user)
     db.session.commit()
     return jsonify({"success": True, "message": "Tất cả thông báo đã được đánh dấu là đã đọc"})
 
@@ -416,9 +510,7 @@ def mark_all_notifications_read():
 @employer_bp.route("/unread_notifications_count")
 @login_required
 def unread_notifications_count():
-    # chỉ đếm notifications gắn employer_id cho tài khoản employer hiện tại
-    if current_user.role != "employer" or not getattr(current_user, "employer_profile", None):
+    # bộ đếm lưu sẵn trên users (app.counters), không cần COUNT
+    if current_user.role != "employer":
         return jsonify({"count": 0})
-    employer_id = current_user.employer_profile.id
-    count = Notification.query.filter_by(employer_id=employer_id, is_read=False).count()
-    return jsonify({"count": count})
+    return jsonify({"count": current_user.unread_notifications_count})
@@ -3,14 +3,20 @@ import re
 from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, send_from_directory, \
     jsonify
 from flask_login import login_required, current_user
-from sqlalchemy import case, or_, func, and_
+from sqlalchemy import or_
 
 from app.forms import JobForm
 from app.models import Job, Employer
+from app.search import search_jobs, nearby_job_ids, DEFAULT_RADIUS_KM, MAX_RADIUS_KM
+from app.facets import facet_counts
+from app.suggest import suggest, SUGGEST_LIMIT
+from app.http_cache import page_validators, conditional_page
+from app.loaders import prime
 from app.extensions import db
 from datetime import datetime, date
 
 from app.routes.main import load_json_file
+from utils.geo import parse_latlng
 
 job_bp = Blueprint("job", __name__, url_prefix="/jobs")
 
@@ -50,7 +56,9 @@ def post_job():
                 working_days=form.working_days.data,
                 deadline=form.deadline.data,
                 remote_option=form.remote_option.data,
-                interview_date=form.interview_date.data
+                interview_date=form.interview_date.data,
+                latitude=request.form.get("latitude", type=float),
+                longitude=request.form.get("longitude", type=float)
             )
             db.session.add(job)
             db.session.commit()
@@ -76,6 +84,13 @@ def parse_int_from_str(s):
         return None
     return int(digits)
 
+def parse_near_args():
+    """Đọc near=lat,lng và radius_km từ query string; near sai định dạng thì bỏ qua."""
+    near = parse_latlng(request.args.get("near"))
+    radius_km = request.args.get("radius_km", DEFAULT_RADIUS_KM, type=float) or DEFAULT_RADIUS_KM
+    radius_km = max(0.1, min(radius_km, MAX_RADIUS_KM))
+    return near, radius_km
+
 # Danh sách job (cho ứng viên)
 @job_bp.route("/")
 def list_jobs():
@@ -87,7 +102,10 @@ def list_jobs():
     location_raw = request.args.get("city", "")
     job_type_raw = (request.args.get("job_type", "") or "").strip()
     work_type_raw = (request.args.get("work_type", "") or "").strip()
+    category_raw = (request.args.get("category", "") or "").strip()
     sort_by = request.args.get("sort_by", "")
+    near_raw = (request.args.get("near", "") or "").strip()
+    near, radius_km = parse_near_args()
 
     min_salary_raw = request.args.get("salary_min") or request.args.get("min_salary") or request.args.get("min")
     max_salary_raw = request.args.get("salary_max") or request.args.get("max_salary") or request.args.get("max")
@@ -100,62 +118,42 @@ def list_jobs():
         flash("Mức lương tối thiểu không được lớn hơn mức lương tối đa", "warning")
         min_salary, max_salary = None, None
 
-    q = Job.query.outerjoin(Employer)
-
-    # --- Keyword ---
-    if keyword:
-        kw_like = f"%{keyword}%"
-        q = q.filter(or_(
-            Job.title.ilike(kw_like),
-            Job.description.ilike(kw_like),
-            Employer.company_name.ilike(kw_like)
-        ))
-
-    # --- Location ---
-    if location_raw:
-        locs = [s.strip() for s in location_raw.split(",") if s.strip()]
-        if locs:
-            locs_lower = [l.lower() for l in locs]
-            q = q.filter(func.lower(Job.city).in_(locs_lower))
-
-    # --- Job type ---
-    if job_type_raw and job_type_raw.lower() != "all":
-        q = q.filter(func.lower(Job.job_type) == job_type_raw.lower())
-
-    # --- Work type ---
-    if work_type_raw:
-        work_types = [s.strip().lower() for s in work_type_raw.split(",") if s.strip()]
-        if work_types and "all" not in work_types:
-            q = q.filter(func.lower(Job.remote_option).in_(work_types))
-
-    # --- Salary filter ---
-    if min_salary is not None:
-        q = q.filter(Job.salary_min >= min_salary)
-    if max_salary is not None:
-        q = q.filter(Job.salary_max <= max_salary)
-
-    # --- Filter active jobs ---
     now = date.today()
-    q = q.filter(or_(Job.deadline == None, Job.deadline >= now))
-
-    # --- Sort ---
-    if sort_by == "salary_desc":
-        q = q.order_by(
-            case((Job.salary_max == None, 1), else_=0),
-            Job.salary_max.desc()
-        )
-    elif sort_by == "salary_asc":
-        q = q.order_by(
-            case((Job.salary_min == None, 1), else_=0),
-            Job.salary_min.asc()
-        )
-    elif sort_by == "newest":
-        q = q.order_by(Job.created_at.desc())
-    else:
-        q = q.order_by(Job.created_at.desc())
-
-    pagination = q.paginate(page=page, per_page=per_page, error_out=False)
-    jobs_page = pagination.items
+    pagination = search_jobs(
+        keyword=keyword,
+        location_raw=location_raw,
+        job_type_raw=job_type_raw,
+        work_type_raw=work_type_raw,
+        min_salary=min_salary,
+        max_salary=max_salary,
+        sort_by=sort_by,
+        active_on=now,
+        category_raw=category_raw,
+        near=near,
+        radius_km=radius_km,
+        page=page,
+        per_page=per_page,
+        after=request.args.get("after")
+    )
+    jobs_page = prime(pagination.items, "employer")
+    if current_user.is_authenticated and current_user.role == "candidate" and current_user.candidate_profile:
+        prime(current_user.candidate_profile.saved_jobs, "job")
+
+    # --- Facet counts cho sidebar ---
+    facets = facet_counts(
+        keyword=keyword,
+        location_raw=location_raw,
+        job_type_raw=job_type_raw,
+        work_type_raw=work_type_raw,
+        category_raw=category_raw,
+        min_salary=min_salary,
+        max_salary=max_salary,
+        active_on=now,
+        near=near,
+        radius_km=radius_km,
+        limit=10
+    )
+    facet_count = {dim: {value: count for value, _, count, _ in rows} for dim, rows in facets.items()}
 
     # Gán is_active cho mỗi job (dù đã lọc active, nhưng để chắc chắn cho template)
     for job in jobs_page:
@@ -167,6 +165,9 @@ def list_jobs():
         "job_type": job_type_raw,
         "work_types": work_type_raw.split(",") if work_type_raw else [],
         "job_types": [job_type_raw] if job_type_raw else [],
+        "category": category_raw,
+        "near": near_raw if near else "",
+        "radius_km": radius_km if near else "",
         "sort_by": sort_by,
         "min_salary": min_salary_raw or "",
         "max_salary": max_salary_raw or "",
@@ -183,6 +184,11 @@ def list_jobs():
         search=search_params,
         total_pages=pagination.pages,
         page=pagination.page,
+        next_cursor=pagination.next_cursor,
+        total=pagination.total,
+        total_exact=pagination.total_exact,
+        facets=facets,
+        facet_count=facet_count,
         user=current_user,
         logo=logo,
         now=now
@@ -191,11 +197,18 @@ def list_jobs():
 # Chi tiết job
 @job_bp.route("/<int:job_id>")
 def job_detail(job_id):
-    job = Job.query.get_or_404(job_id)
-    now = date.today()
-    job.is_active = (job.deadline is None) or (job.deadline >= now)
+    # Validator chỉ cần updated_at của job và công ty, chưa load job/employer/user
+    job_updated_at, employer_updated_at = db.session.query(Job.updated_at, Employer.updated_at) \
+        .outerjoin(Employer, Job.employer).filter(Job.id == job_id).first_or_404()
+    etag, last_modified = page_validators("job", job_id, job_updated_at, employer_updated_at)
+
+    def render():
+        job = Job.query.get_or_404(job_id)
+        now = date.today()
+        job.is_active = (job.deadline is None) or (job.deadline >= now)
+        return render_template("jobs/job_detail.html", job=job, now=datetime.utcnow())
 
-    return render_template("jobs/job_detail.html", job=job, now=datetime.utcnow())
+    return conditional_page(etag, last_modified, render)
 
 # Quản lý job của employer
 @job_bp.route("/manage")
@@ -209,6 +222,49 @@ def manage_jobs():
     return render_template("jobs/manage_jobs.html", jobs=jobs)
 
 
+# Gợi ý từ khóa cho ô tìm kiếm (JSON), trả lời từ index in-memory
+@job_bp.route("/suggest")
+def suggest_keywords():
+    q = (request.args.get("q", "") or "").strip()[:100]
+    limit = max(1, min(request.args.get("limit", SUGGEST_LIMIT, type=int), 20))
+    return jsonify({
+        "q": q,
+        "suggestions": [
+            {"text": text, "type": kind, "count": count}
+            for text, kind, count in suggest(q, limit=limit)
+        ],
+    })
+
+# Job gần vị trí, sắp theo khoảng cách (JSON)
+@job_bp.route("/nearby")
+def nearby_jobs():
+    near, radius_km = parse_near_args()
+    if near is None:
+        return jsonify({"error": "Tham số near phải có dạng lat,lng"}), 400
+    limit = max(1, min(request.args.get("limit", 20, type=int), 100))
+
+    base = db.session.query(Job.id).filter(or_(Job.deadline.is_(None), Job.deadline >= date.today()))
+    nearest = nearby_job_ids(near[0], near[1], radius_km, base_query=base)[:limit]
+    jobs = {job.id: job for job in prime(Job.query.filter(Job.id.in_([job_id for job_id, _ in nearest])).all(),
+                                         "employer")}
+    return jsonify({
+        "near": {"lat": near[0], "lng": near[1]},
+        "radius_km": radius_km,
+        "jobs": [
+            {
+                "id": job_id,
+                "title": jobs[job_id].title,
+                "company_name": jobs[job_id].employer.company_name if jobs[job_id].employer else None,
+                "city": jobs[job_id].city,
+                "district": jobs[job_id].district,
+                "salary": format_salary_range(jobs[job_id].salary_min, jobs[job_id].salary_max),
+                "distance_km": round(distance, 2),
+                "url": url_for("job.job_detail", job_id=job_id),
+            }
+            for job_id, distance in nearest if job_id in jobs
+        ],
+    })
+
 @job_bp.route("/provinces")
 def provinces():
     return send_from_directory("static/data", "provinces.json")
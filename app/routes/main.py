@@ -1,10 +1,13 @@
+import hmac
 import json
 import os
 import re
-from flask import Blueprint, render_template, request, send_from_directory, current_app
-from flask_login import current_user
-from app.models import Job, Employer, db
-from sqlalchemy import or_, and_, func, desc, asc, case
+from flask import Blueprint, render_template, request, current_app, Response, abort
+from flask_login import current_user, login_required
+from app import badges
+from app.search import search_jobs, search_cache
+from app.recommend import recommended_jobs
+from app.loaders import prime
 
 # ============================
 # Blueprint
@@ -78,48 +81,22 @@ def index():
     min_salary = parse_int_from_str(min_salary_raw)
     max_salary = parse_int_from_str(max_salary_raw)
 
-    # --- Query jobs ---
-    q = Job.query.outerjoin(Employer)
-
-    if keyword:
-        kw_like = f"%{keyword}%"
-        q = q.filter(or_(
-            Job.title.ilike(kw_like),
-            Job.description.ilike(kw_like),
-            Employer.company_name.ilike(kw_like)
-        ))
-
-    if location_raw:
-        locs = [s.strip() for s in location_raw.split(",") if s.strip()]
-        if locs:
-            q = q.filter(func.lower(Job.city).in_([l.lower() for l in locs]))
-
-    if job_type_raw and job_type_raw.lower() != "all":
-        q = q.filter(func.lower(Job.job_type) == job_type_raw.lower())
-
-    if work_type_raw:
-        work_types = [s.strip().lower() for s in work_type_raw.split(",") if s.strip()]
-        if work_types and "all" not in work_types:
-            q = q.filter(func.lower(Job.remote_option).in_(work_types))
-
-    if min_salary is not None and max_salary is not None:
-        q = q.filter(and_(Job.salary_max >= min_salary, Job.salary_min <= max_salary))
-    else:
-        if min_salary is not None:
-            q = q.filter(Job.salary_min >= min_salary)
-        if max_salary is not None:
-            q = q.filter(Job.salary_max <= max_salary)
-
-    # --- Sorting ---
-    if sort_by == "salary_desc":
-        q = q.order_by(case((Job.salary_max == None, 1), else_=0), Job.salary_max.desc())
-    elif sort_by == "salary_asc":
-        q = q.order_by(case((Job.salary_min == None, 1), else_=0), Job.salary_min.asc())
-    else:
-        q = q.order_by(Job.created_at.desc())
-
-    pagination = q.paginate(page=page, per_page=per_page, error_out=False)
-    jobs_page = pagination.items
+    # --- Query jobs --- (trang chủ không hiển thị tổng số nên bỏ COUNT)
+    pagination = search_jobs(
+        keyword=keyword,
+        location_raw=location_raw,
+        job_type_raw=job_type_raw,
+        work_type_raw=work_type_raw,
+        min_salary=min_salary,
+        max_salary=max_salary,
+        sort_by=sort_by,
+        salary_overlap=True,
+        page=page,
+        per_page=per_page,
+        after=request.args.get("after"),
+        with_total=False
+    )
+    jobs_page = prime(pagination.items, "employer")
 
     search_params = {
         "keyword": keyword,
@@ -133,6 +110,12 @@ def index():
         "per_page": per_page
     }
 
+    # --- Việc làm dành cho ứng viên đang đăng nhập ---
+    jobs_for_you = []
+    if current_user.is_authenticated and current_user.role == "candidate" and current_user.candidate_profile:
+        jobs_for_you = prime([job for job, _ in recommended_jobs(current_user.candidate_profile, limit=4)],
+                             "employer")
+
     # --- Check logo an toàn ---
     logo = None
     if current_user.is_authenticated and current_user.role == "employer" and current_user.employer_profile:
@@ -141,6 +124,7 @@ def index():
     return render_template(
         "index.html",
         jobs=jobs_page,
+        jobs_for_you=jobs_for_you,
         search=search_params,
         total_pages=pagination.pages,
         page=pagination.page,
@@ -148,6 +132,46 @@ def index():
         logo=logo
     )
 
+@main_bp.route("/badges")
+@login_required
+def badge_counts():
+    """
+    Số tin nhắn và thông báo chưa đọc, ETag là phiên bản của cặp số này.
+    If-None-Match khớp -> 304. Thêm ?wait=<giây> để long-poll: giữ request tới khi số đổi
+    hoặc hết thời gian (không giữ kết nối DB trong lúc chờ).
+    """
+    client_etag = next(iter(request.if_none_match.as_set(include_weak=True)), None)
+    wait = min(request.args.get("wait", 0, type=float), badges.MAX_LONG_POLL_TIMEOUT)
+    if client_etag and wait > 0:
+        counts = badges.badge_waiters.wait_for_change(current_user, client_etag, wait)
+    else:
+        counts = badges.get_badges(current_user)
+
+    etag = badges.badge_etag(counts)
+    if client_etag == etag:
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(dict(counts, version=etag))
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@main_bp.route("/metrics")
+def metrics():
+    """
+    Bộ đếm dạng Prometheus text format. Chỉ admin đã đăng nhập, hoặc request có header
+    "Authorization: Bearer <METRICS_TOKEN>" khi đã cấu hình METRICS_TOKEN (cho Prometheus scrape).
+    """
+    token = current_app.config.get("METRICS_TOKEN", os.getenv("METRICS_TOKEN"))
+    authorization = request.headers.get("Authorization", "")
+    is_admin = current_user.is_authenticated and current_user.role == "admin"
+    if not is_admin and not (token and hmac.compare_digest(authorization, f"Bearer {token}")):
+        abort(403)
+    lines = search_cache.prometheus_lines()
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+
 @main_bp.app_template_global()
 def format_salary_range(min_salary, max_salary):
     def to_mil(v):
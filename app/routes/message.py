@@ -1,8 +1,12 @@
-from flask import Blueprint, render_template, request, redirect, url_for, jsonify
+from flask import Blueprint, Response, render_template, request, redirect, url_for, jsonify
 from flask_login import login_required, current_user
 from app.models import db, Message, User, Conversation
 from datetime import datetime
 from sqlalchemy import desc
+from app.loaders import prime
+from app import realtime, badges, inbox, message_search, presence
+
+STREAM_BACKLOG_LIMIT = 200  # số tin nhắn tối đa gửi bù khi (re)connect SSE
 
 # Blueprint cho messages
 messages_bp = Blueprint("messages", __name__)
@@ -13,20 +17,18 @@ def chat_with_user(user_id):
     # Lấy user đối phương
     other_user = User.query.get_or_404(user_id)
 
-    # Debug in ra console
-    print("🔹 current_user =", current_user.id, "🔹 other_user =", other_user.id)
-
-    # Lấy toàn bộ tin nhắn 2 chiều
-    chat_messages = Message.query.filter(
-        ((Message.sender_id == current_user.id) & (Message.receiver_id == other_user.id)) |
-        ((Message.sender_id == other_user.id) & (Message.receiver_id == current_user.id))
-    ).order_by(Message.created_at.asc()).all()
+    conversation = inbox.find_conversation(current_user.id, other_user.id)
 
-    user_id = {current_user.id, other_user.id}
-    for m in chat_messages:
-        print(f"[{m.id}] {m.sender_id} → {m.receiver_id} : {m.content}")
+    chat_messages, has_more = [], False
+    if conversation:
+        inbox.mark_read(conversation, current_user.id)
+        db.session.commit()
+        # Chỉ nạp trang tin nhắn mới nhất, phần cũ hơn tải qua /history?before_id=
+        chat_messages, has_more = inbox.chat_history(conversation.id)
 
-    return render_template("messages/chat.html", other_user=other_user, chat_messages=chat_messages)
+    return render_template("messages/chat.html", other_user=other_user, chat_messages=chat_messages,
+                           conversation=conversation, has_more=has_more,
+                           display_names=build_display_names({current_user.id, other_user.id}))
 
 
 @messages_bp.route("/send/<int:user_id>", methods=["POST"])
@@ -40,17 +42,8 @@ def send_message_user(user_id):
             return jsonify({"error": "empty"}), 400
         return redirect(url_for("messages.chat_with_user", user_id=other_user.id))
 
-    # Tìm conversation cũ giữa 2 người
-    conversation = Conversation.query.filter(
-        ((Conversation.user1_id == current_user.id) & (Conversation.user2_id == other_user.id)) |
-        ((Conversation.user1_id == other_user.id) & (Conversation.user2_id == current_user.id))
-    ).first()
-
-    # Nếu chưa có thì tạo mới
-    if not conversation:
-        conversation = Conversation(user1_id=current_user.id, user2_id=other_user.id)
-        db.session.add(conversation)
-        db.session.commit()
+    # Conversation duy nhất giữa 2 người (tạo mới nếu chưa có, commit cùng tin nhắn)
+    conversation = inbox.get_or_create_conversation(current_user.id, other_user.id)
 
     # Thêm tin nhắn mới
     new_msg = Message(
@@ -65,49 +58,50 @@ def send_message_user(user_id):
     db.session.commit()
 
     if request.headers.get("X-Requested-With") == "XMLHttpRequest" or request.accept_mimetypes.accept_json:
-        return jsonify({
-            "id": new_msg.id,
-            "sender_id": new_msg.sender_id,
-            "receiver_id": new_msg.receiver_id,
-            "content": new_msg.content,
-            "created_at": new_msg.created_at.isoformat(),
-            "created_at_display": new_msg.created_at.strftime("%H:%M %d/%m/%Y"),
-            "conversation_id": new_msg.conversation_id
-        }), 201
+        return jsonify(realtime.message_payload(new_msg)), 201
 
     return redirect(url_for("messages.chat_with_user", user_id=other_user.id))
 
 @messages_bp.route("/conversations")
 @login_required
 def list_conversations():
-    # Tìm tất cả hội thoại mà user đang tham gia
+    # Hội thoại user đang tham gia, mới hoạt động trước (tin nhắn cuối lấy từ cột tóm tắt)
     conversations = Conversation.query.filter(
         (Conversation.user1_id == current_user.id) | (Conversation.user2_id == current_user.id)
-    ).all()
+    ).order_by(Conversation.last_message_at.desc(), Conversation.id.desc()).all()
+    prime(conversations, "user1", "user2", "last_message")
 
     return render_template("messages/conversations.html", conversations=conversations, current_user=current_user)
 
 @messages_bp.route("/")
 @login_required
 def index():
-    # Lấy tất cả hội thoại của user hiện tại
-    conversations = Conversation.query.filter(
-        (Conversation.user1_id == current_user.id) |
-        (Conversation.user2_id == current_user.id)
-    ).all()
-
-    # Thêm thuộc tính last_message cho từng conversation
-    for convo in conversations:
-        if convo.messages:  # Nếu có tin nhắn
-            convo.last_message = sorted(
-                convo.messages,
-                key=lambda m: m.created_at,
-                reverse=True
-            )[0]
-        else:
-            convo.last_message = None
+    # Một trang hội thoại của user hiện tại, phân trang bằng cursor ?after=
+    conversations, next_cursor = inbox.inbox_page(current_user.id, after=request.args.get("after"))
+    prime(conversations, "last_message")
+    display_names = build_display_names({c.other_user_id(current_user.id) for c in conversations})
+
+    return render_template("messages/index.html", conversations=conversations,
+                           display_names=display_names, next_cursor=next_cursor)
+
 
-    return render_template("messages/index.html", conversations=conversations)
+@messages_bp.route("/search")
+@login_required
+def search_messages():
+    """Tìm trong tin nhắn của current_user: ?q=, phân trang bằng ?after=<cursor>."""
+    keyword = request.args.get("q", "").strip()
+    results, next_cursor = message_search.search_messages(current_user.id, keyword, after=request.args.get("after")) \
+        if keyword else ([], None)
+
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify({
+            "results": [dict(realtime.message_payload(msg), snippet=str(snippet)) for msg, snippet in results],
+            "next_cursor": next_cursor,
+        })
+
+    other_ids = {msg.receiver_id if msg.sender_id == current_user.id else msg.sender_id for msg, _ in results}
+    return render_template("messages/search.html", keyword=keyword, results=results,
+                           next_cursor=next_cursor, display_names=build_display_names(other_ids))
 
 
 @messages_bp.route("/conversation/<int:conversation_id>")
@@ -124,20 +118,41 @@ def conversation_detail(conversation_id):
     else:
         other_user = convo.user1
 
-    # 🔹 Lấy tin nhắn của hội thoại
-    messages = Message.query.filter_by(conversation_id=convo.id).order_by(Message.created_at.asc()).all()
-    # Đánh dấu tất cả tin nhắn gửi cho current_user trong cuộc trò chuyện này là đã đọc
-    unread_msgs = Message.query.filter_by(conversation_id=convo.id, receiver_id=current_user.id, is_read=False).all()
-    for msg in unread_msgs:
-        msg.is_read = True
+    # Đánh dấu cả hội thoại là đã đọc (dời mốc đã đọc của current_user)
+    inbox.mark_read(convo, current_user.id)
     db.session.commit()
 
+    # 🔹 Lấy trang tin nhắn mới nhất của hội thoại (sau commit để không phải nạp lại từng tin)
+    messages, has_more = inbox.chat_history(convo.id)
+
     return render_template(
         "messages/chat.html",
         conversation=convo,
         messages=messages,
-        other_user=other_user
+        chat_messages=messages,
+        has_more=has_more,
+        other_user=other_user,
+        display_names=build_display_names({convo.user1_id, convo.user2_id})
+    )
+
+
+@messages_bp.route("/conversation/<int:conversation_id>/history")
+@login_required
+def conversation_history(conversation_id):
+    """
+    JSON lịch sử chat: ?before_id= để cuộn lên, ?after_id= để lấy tin mới, ?limit= (tối đa 100).
+    """
+    convo = Conversation.query.get_or_404(conversation_id)
+    if current_user.id not in [convo.user1_id, convo.user2_id]:
+        return jsonify({"error": "forbidden"}), 403
+
+    messages, has_more = inbox.chat_history(
+        convo.id,
+        before_id=request.args.get("before_id", type=int),
+        after_id=request.args.get("after_id", type=int),
+        limit=request.args.get("limit", inbox.HISTORY_PAGE_SIZE, type=int),
     )
+    return jsonify({"messages": [realtime.message_payload(m) for m in messages], "has_more": has_more})
 
 @messages_bp.route("/conversation/<int:conversation_id>/send", methods=["POST"])
 @login_required
@@ -174,36 +189,83 @@ def send_message_conversation(conversation_id):
 
 
     if request.headers.get("X-Requested-With") == "XMLHttpRequest" or request.accept_mimetypes.accept_json:
-        return jsonify({
-            "id": msg.id,
-            "sender_id": msg.sender_id,
-            "receiver_id": msg.receiver_id,
-            "content": msg.content,
-            "created_at": msg.created_at.isoformat(),
-            "created_at_display": msg.created_at.strftime("%H:%M %d/%m/%Y"),
-            "conversation_id": msg.conversation_id
-        }), 201
+        return jsonify(realtime.message_payload(msg)), 201
 
     return redirect(url_for("messages.conversation_detail", conversation_id=convo.id))
 
+
+@messages_bp.route("/conversation/<int:conversation_id>/read", methods=["POST"])
+@login_required
+def mark_conversation_read(conversation_id):
+    """Dời mốc đã đọc tới up_to_id (mặc định tin nhắn cuối), vd. khi tin mới tới qua SSE lúc đang mở chat."""
+    convo = Conversation.query.get_or_404(conversation_id)
+    if current_user.id not in [convo.user1_id, convo.user2_id]:
+        return jsonify({"error": "forbidden"}), 403
+
+    inbox.mark_read(convo, current_user.id, request.form.get("up_to_id", type=int))
+    db.session.commit()
+    return jsonify({"unread": convo.unread_count_for(current_user.id)})
+
+
+@messages_bp.route("/conversation/<int:conversation_id>/stream")
+@login_required
+def conversation_stream(conversation_id):
+    """
+    SSE: đẩy tin nhắn mới của hội thoại ngay khi được commit.
+    Kết nối lại tự gửi Last-Event-ID (id tin nhắn cuối đã nhận) -> gửi bù các tin nhắn sau đó;
+    lần đầu client truyền ?after=<id tin nhắn cuối đang hiển thị>.
+    """
+    convo = Conversation.query.get_or_404(conversation_id)
+    if current_user.id not in [convo.user1_id, convo.user2_id]:
+        return "Bạn không có quyền", 403
+
+    last_id = request.headers.get("Last-Event-ID", type=int) or request.args.get("after", 0, type=int)
+    try:
+        # Subscribe trước khi đọc backlog để không lọt tin nhắn commit giữa hai bước
+        subscription = realtime.hub.subscribe(realtime.conversation_channel(convo.id), current_user.id)
+    except realtime.TooManyConnections:
+        return jsonify({"error": "too_many_connections"}), 429
+    try:
+        recent = Message.query.filter(Message.conversation_id == convo.id, Message.id > last_id) \
+            .order_by(Message.id.desc()).limit(STREAM_BACKLOG_LIMIT).all()
+        backlog = [realtime.message_event(m) for m in reversed(recent)]
+    except Exception:
+        subscription.close()
+        raise
+
+    response = Response(realtime.stream(subscription, backlog, last_id), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # nginx không buffer stream
+    return response
+
+@messages_bp.route("/conversation/<int:conversation_id>/typing", methods=["POST"])
+@login_required
+def conversation_typing(conversation_id):
+    """Báo "đang nhập" tới các stream đang mở của hội thoại (không lưu lại)."""
+    convo = Conversation.query.get_or_404(conversation_id)
+    if current_user.id not in [convo.user1_id, convo.user2_id]:
+        return jsonify({"error": "forbidden"}), 403
+
+    typing = request.form.get("typing", "1") != "0"
+    realtime.hub.publish(realtime.conversation_channel(convo.id),
+                         presence.typing_event(current_user.id, convo.id, typing))
+    return "", 204
+
+
+@messages_bp.route("/presence")
+@login_required
+def presence_status():
+    """Trạng thái online: ?user_ids=1,2,3 (tối đa 50), đọc từ presence registry, không query DB."""
+    user_ids = [int(s) for s in request.args.get("user_ids", "").split(",") if s.strip().isdigit()][:50]
+    statuses = presence.registry.status(user_ids)
+    return jsonify({str(uid): status for uid, status in statuses.items()})
+
 # dem so tin nhan chua doc
 @messages_bp.route("/unread_count")
 @login_required
 def unread_count():
-    count = Message.query.filter_by(receiver_id=current_user.id, is_read=False).count()
-    return {"count": count}
-
-# Inject vào template context
-@messages_bp.app_context_processor
-def inject_unread_count():
-    if current_user.is_authenticated:
-        unread_count = Message.query.filter_by(
-            receiver_id=current_user.id,
-            is_read=False
-        ).count()
-    else:
-        unread_count = 0
-    return dict(unread_count=unread_count)
+    return {"count": badges.get_badges(current_user)["messages"]}
+
 @messages_bp.route("/messages/")
 @login_required
 def message_list():
@@ -219,7 +281,7 @@ def build_display_names(user_ids: set):
     Trả về dict: { user_id: display_name }
     - Nếu user.role == 'candidate' => lấy từ Candidate.full_name (hoặc name)
     - Nếu user.role == 'employer' => lấy từ Employer.company_name (hoặc name)
-    - Nếu ko có profile => fallback user.username
+    - Nếu ko có profile => fallback user.email
     """
     if not user_ids:
         return {}
@@ -239,12 +301,12 @@ def build_display_names(user_ids: set):
         if role == "candidate":
             c = candidate_map.get(uid)
             # thay thế 'full_name' bằng tên field thực tế trong model Candidate
-            display[uid] = getattr(c, "full_name", None) or getattr(c, "name", None) or u.username
+            display[uid] = getattr(c, "full_name", None) or getattr(c, "name", None) or u.email
         elif role == "employer":
             e = employer_map.get(uid)
             # thay 'company_name' bằng field thực tế trong model Employer
-            display[uid] = getattr(e, "company_name", None) or getattr(e, "name", None) or u.username
+            display[uid] = getattr(e, "company_name", None) or getattr(e, "name", None) or u.email
         else:
-            display[uid] = u.username or f"User#{uid}"
+            display[uid] = u.email or f"User#{uid}"
 
     return display
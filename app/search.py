@@ -0,0 +1,607 @@
+import base64
+import binascii
+import json
+import math
+import os
+import re
+from datetime import datetime
+
+from sqlalchemy import event, text, or_, and_, case, inspect, func, select
+from sqlalchemy.orm import Session, object_session
+
+from app.cache import TTLCache
+from app.extensions import db
+from app.models import Job, Employer, job_category_association
+from utils.helpers import fold_text
+from utils.geo import EARTH_RADIUS_KM, covering_cells, bounding_box, haversine_km
+
+# ============================
+# Full-text index cho tìm kiếm việc làm
+# ============================
+# Bảng phụ chứa title/description/requirements của job + company_name của employer.
+# - SQLite: bảng ảo FTS5 (rowid = jobs.id), xếp hạng bằng bm25()
+# - MySQL: bảng InnoDB có FULLTEXT index, xếp hạng bằng MATCH ... AGAINST
+# - Dialect khác: fallback về ILIKE như trước
+INDEX_TABLE = "job_search_index"
+
+# Trọng số bm25 theo thứ tự cột: title, description, requirements, company_name
+BM25_WEIGHTS = (10.0, 1.0, 2.0, 5.0)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Các cột của Job ảnh hưởng tới index
+_INDEXED_JOB_ATTRS = ("title", "description", "requirements", "employer_id")
+
+
+def tokenize_keyword(keyword):
+    return _TOKEN_RE.findall(keyword or "")
+
+
+class IlikeBackend:
+    """Không có full-text index: quét ILIKE như cách cũ, không xếp hạng."""
+
+    name = "ilike"
+
+    def ensure_index(self, conn):
+        return False
+
+    def rebuild(self, conn):
+        pass
+
+    def upsert(self, conn, job_id):
+        pass
+
+    def delete(self, conn, job_id):
+        pass
+
+    def rename_company(self, conn, employer_id):
+        pass
+
+    def match_ids(self, keyword):
+        """Câu SELECT id các job khớp keyword (không xếp hạng, không ORDER BY); None = không lọc."""
+        return self.apply(db.session.query(Job.id).outerjoin(Employer), keyword).statement
+
+    def apply(self, q, keyword, rank=False):
+        kw_like = f"%{keyword}%"
+        return q.filter(or_(
+            Job.title.ilike(kw_like),
+            Job.description.ilike(kw_like),
+            Job.requirements.ilike(kw_like),
+            Employer.company_name.ilike(kw_like)
+        ))
+
+
+class SQLiteFTSBackend(IlikeBackend):
+    name = "fts5"
+
+    def ensure_index(self, conn):
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5("
+            "title, description, requirements, company_name, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+        has_rows = conn.execute(text(f"SELECT 1 FROM {INDEX_TABLE} LIMIT 1")).first()
+        has_jobs = conn.execute(text("SELECT 1 FROM jobs LIMIT 1")).first()
+        if has_jobs and not has_rows:
+            self.rebuild(conn)
+            return True
+        return False
+
+    def rebuild(self, conn):
+        conn.execute(text(f"DELETE FROM {INDEX_TABLE}"))
+        conn.execute(text(
+            f"INSERT INTO {INDEX_TABLE} (rowid, title, description, requirements, company_name) "
+            "SELECT j.id, j.title, j.description, j.requirements, e.company_name "
+            "FROM jobs j LEFT JOIN employers e ON e.id = j.employer_id"
+        ))
+
+    def upsert(self, conn, job_id):
+        self.delete(conn, job_id)
+        conn.execute(text(
+            f"INSERT INTO {INDEX_TABLE} (rowid, title, description, requirements, company_name) "
+            "SELECT j.id, j.title, j.description, j.requirements, e.company_name "
+            "FROM jobs j LEFT JOIN employers e ON e.id = j.employer_id WHERE j.id = :id"
+        ), {"id": job_id})
+
+    def delete(self, conn, job_id):
+        conn.execute(text(f"DELETE FROM {INDEX_TABLE} WHERE rowid = :id"), {"id": job_id})
+
+    def rename_company(self, conn, employer_id):
+        conn.execute(text(
+            f"UPDATE {INDEX_TABLE} SET company_name = "
+            "(SELECT company_name FROM employers WHERE id = :eid) "
+            "WHERE rowid IN (SELECT id FROM jobs WHERE employer_id = :eid)"
+        ), {"eid": employer_id})
+
+    @staticmethod
+    def match_expression(keyword):
+        # Mỗi token được đặt trong "..." để FTS5 không hiểu nhầm thành toán tử,
+        # token cuối match theo tiền tố để gõ dở vẫn ra kết quả.
+        tokens = tokenize_keyword(keyword)
+        if not tokens:
+            return None
+        parts = [f'"{t}"' for t in tokens]
+        parts[-1] += "*"
+        return " ".join(parts)
+
+    def match_ids(self, keyword):
+        # Đọc thẳng rowid trong index: không tính bm25, không join jobs/employers
+        expr = self.match_expression(keyword)
+        if expr is None:
+            return None
+        return text(f"SELECT rowid FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH :fts_query").bindparams(fts_query=expr)
+
+    def apply(self, q, keyword, rank=False):
+        expr = self.match_expression(keyword)
+        if expr is None:
+            return q
+        weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+        fts = text(
+            f"SELECT rowid AS job_id, bm25({INDEX_TABLE}, {weights}) AS rank "
+            f"FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH :fts_query"
+        ).bindparams(fts_query=expr).columns(
+            db.column("job_id", db.Integer), db.column("rank", db.Float)
+        ).subquery("fts")
+        q = q.join(fts, fts.c.job_id == Job.id)
+        if rank:
+            # bm25() của SQLite trả về số âm, càng nhỏ càng liên quan
+            q = q.order_by(None).order_by(fts.c.rank.asc(), Job.created_at.desc(), Job.id.desc())
+        return q
+
+
+class MySQLFulltextBackend(IlikeBackend):
+    name = "mysql_fulltext"
+
+    _COLUMNS = "title, description, requirements, company_name"
+
+    def ensure_index(self, conn):
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {INDEX_TABLE} ("
+            "job_id INT NOT NULL PRIMARY KEY, "
+            "title VARCHAR(200), description TEXT, requirements TEXT, company_name VARCHAR(200), "
+            f"FULLTEXT KEY ft_{INDEX_TABLE} ({self._COLUMNS})"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+        ))
+        has_rows = conn.execute(text(f"SELECT 1 FROM {INDEX_TABLE} LIMIT 1")).first()
+        has_jobs = conn.execute(text("SELECT 1 FROM jobs LIMIT 1")).first()
+        if has_jobs and not has_rows:
+            self.rebuild(conn)
+            return True
+        return False
+
+    def rebuild(self, conn):
+        conn.execute(text(f"DELETE FROM {INDEX_TABLE}"))
+        conn.execute(text(
+            f"INSERT INTO {INDEX_TABLE} (job_id, {self._COLUMNS}) "
+            "SELECT j.id, j.title, j.description, j.requirements, e.company_name "
+            "FROM jobs j LEFT JOIN employers e ON e.id = j.employer_id"
+        ))
+
+    def upsert(self, conn, job_id):
+        conn.execute(text(
+            f"REPLACE INTO {INDEX_TABLE} (job_id, {self._COLUMNS}) "
+            "SELECT j.id, j.title, j.description, j.requirements, e.company_name "
+            "FROM jobs j LEFT JOIN employers e ON e.id = j.employer_id WHERE j.id = :id"
+        ), {"id": job_id})
+
+    def delete(self, conn, job_id):
+        conn.execute(text(f"DELETE FROM {INDEX_TABLE} WHERE job_id = :id"), {"id": job_id})
+
+    def rename_company(self, conn, employer_id):
+        conn.execute(text(
+            f"UPDATE {INDEX_TABLE} s JOIN jobs j ON j.id = s.job_id "
+            "JOIN employers e ON e.id = j.employer_id "
+            "SET s.company_name = e.company_name WHERE j.employer_id = :eid"
+        ), {"eid": employer_id})
+
+    @staticmethod
+    def match_expression(keyword):
+        # BOOLEAN MODE: +token bắt buộc, token cuối match tiền tố
+        tokens = tokenize_keyword(keyword)
+        if not tokens:
+            return None
+        parts = [f"+{t}" for t in tokens]
+        parts[-1] += "*"
+        return " ".join(parts)
+
+    def match_ids(self, keyword):
+        expr = self.match_expression(keyword)
+        if expr is None:
+            return None
+        return text(
+            f"SELECT job_id FROM {INDEX_TABLE} WHERE MATCH ({self._COLUMNS}) AGAINST (:fts_query IN BOOLEAN MODE)"
+        ).bindparams(fts_query=expr)
+
+    def apply(self, q, keyword, rank=False):
+        expr = self.match_expression(keyword)
+        if expr is None:
+            return q
+        match = f"MATCH ({self._COLUMNS}) AGAINST (:fts_query IN BOOLEAN MODE)"
+        fts = text(
+            f"SELECT job_id, {match} AS score FROM {INDEX_TABLE} WHERE {match}"
+        ).bindparams(fts_query=expr).columns(
+            db.column("job_id", db.Integer), db.column("score", db.Float)
+        ).subquery("fts")
+        q = q.join(fts, fts.c.job_id == Job.id)
+        if rank:
+            # MySQL: điểm càng cao càng liên quan
+            q = q.order_by(None).order_by(fts.c.score.desc(), Job.created_at.desc(), Job.id.desc())
+        return q
+
+
+_BACKENDS = {
+    "sqlite": SQLiteFTSBackend(),
+    "mysql": MySQLFulltextBackend(),
+}
+_FALLBACK = IlikeBackend()
+
+
+def get_backend(dialect_name=None):
+    if dialect_name is None:
+        dialect_name = db.engine.dialect.name
+    return _BACKENDS.get(dialect_name, _FALLBACK)
+
+
+def ensure_index():
+    """Tạo bảng index nếu chưa có và nạp dữ liệu lần đầu."""
+    with db.engine.begin() as conn:
+        return get_backend(conn.dialect.name).ensure_index(conn)
+
+
+def rebuild_index():
+    with db.engine.begin() as conn:
+        get_backend(conn.dialect.name).rebuild(conn)
+
+
+# ============================
+# Đồng bộ index khi job / employer thay đổi
+# ============================
+@event.listens_for(Job, "after_insert")
+def _index_job_insert(mapper, connection, target):
+    get_backend(connection.dialect.name).upsert(connection, target.id)
+
+
+@event.listens_for(Job, "after_update")
+def _index_job_update(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[attr].history.has_changes() for attr in _INDEXED_JOB_ATTRS):
+        get_backend(connection.dialect.name).upsert(connection, target.id)
+
+
+@event.listens_for(Job, "after_delete")
+def _index_job_delete(mapper, connection, target):
+    get_backend(connection.dialect.name).delete(connection, target.id)
+
+
+@event.listens_for(Employer, "after_update")
+def _index_employer_update(mapper, connection, target):
+    if inspect(target).attrs.company_name.history.has_changes():
+        get_backend(connection.dialect.name).rename_company(connection, target.id)
+
+
+# ============================
+# Query dùng chung cho trang chủ và /jobs/
+# ============================
+def build_job_query(keyword="", location_raw="", job_type_raw="", work_type_raw="",
+                    min_salary=None, max_salary=None, sort_by="",
+                    salary_overlap=False, active_on=None, category_raw="",
+                    near=None, radius_km=None):
+    """
+    Dựng query tìm việc từ các tham số đã parse.
+    - salary_overlap: khi có cả min và max thì lọc theo khoảng lương giao nhau (trang chủ)
+    - active_on: nếu truyền ngày thì chỉ lấy job còn hạn tới ngày đó (/jobs/)
+    - near=(lat, lng), radius_km: chỉ lấy job trong bán kính
+    """
+    q = Job.query.outerjoin(Employer)
+
+    # --- Sort --- (luôn kèm Job.id để thứ tự ổn định, cần cho keyset pagination)
+    if sort_by == "salary_desc":
+        q = q.order_by(case((Job.salary_max == None, 1), else_=0), Job.salary_max.desc(), Job.id.desc())
+    elif sort_by == "salary_asc":
+        q = q.order_by(case((Job.salary_min == None, 1), else_=0), Job.salary_min.asc(), Job.id.asc())
+    else:
+        q = q.order_by(Job.created_at.desc(), Job.id.desc())
+
+    # --- Keyword ---
+    if keyword:
+        q = get_backend().apply(q, keyword, rank=(sort_by == "relevance"))
+
+    # --- Location --- (so khớp trên cột đã chuẩn hoá: "ha-noi" == "Hà Nội")
+    if location_raw:
+        locs = [fold_text(s) for s in location_raw.split(",") if s.strip()]
+        if locs:
+            q = q.filter(Job.city_norm.in_(locs))
+
+    # --- Job type ---
+    if job_type_raw and job_type_raw.lower() != "all":
+        q = q.filter(Job.job_type_norm == fold_text(job_type_raw))
+
+    # --- Work type ---
+    if work_type_raw:
+        work_types = [fold_text(s) for s in work_type_raw.split(",") if s.strip()]
+        if work_types and "all" not in work_types:
+            q = q.filter(Job.remote_option_norm.in_(work_types))
+
+    # --- Category --- (danh sách id JobCategory)
+    category_ids = [int(s) for s in (category_raw or "").split(",") if s.strip().isdigit()]
+    if category_ids:
+        q = q.filter(Job.id.in_(
+            select(job_category_association.c.job_id)
+            .where(job_category_association.c.category_id.in_(category_ids))
+        ))
+
+    # --- Near me --- (điều kiện ngay trong SQL, không đổ danh sách id vào IN (...))
+    if near is not None:
+        q = q.filter(*nearby_conditions(near[0], near[1], radius_km or DEFAULT_RADIUS_KM))
+
+    # --- Salary ---
+    if salary_overlap and min_salary is not None and max_salary is not None:
+        q = q.filter(and_(Job.salary_max >= min_salary, Job.salary_min <= max_salary))
+    else:
+        if min_salary is not None:
+            q = q.filter(Job.salary_min >= min_salary)
+        if max_salary is not None:
+            q = q.filter(Job.salary_max <= max_salary)
+
+    # --- Active jobs ---
+    if active_on is not None:
+        q = q.filter(or_(Job.deadline == None, Job.deadline >= active_on))
+
+    return q
+
+
+# ============================
+# Tìm job theo bán kính: lọc thô bằng geohash + bounding box (dùng index), rồi tính haversine
+# ============================
+DEFAULT_RADIUS_KM = 10
+MAX_RADIUS_KM = 200
+
+
+def _coarse_conditions(lat, lng, radius_km):
+    """Tiền tố geohash (dùng index) + bounding box: tập cha của hình tròn."""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    cells = covering_cells(lat, lng, radius_km)
+    return [
+        or_(*[and_(Job.geohash >= cell, Job.geohash < cell + "~") for cell in cells]),
+        Job.latitude.between(min_lat, max_lat),
+        Job.longitude.between(min_lng, max_lng),
+    ]
+
+
+def nearby_conditions(lat, lng, radius_km):
+    """
+    Điều kiện SQL cho "job trong bán kính", dùng trong build_job_query.
+    Bỏ các góc của bounding box bằng khoảng cách equirectangular (chỉ phép nhân/cộng nên chạy
+    trên mọi DB); sai lệch so với haversine dưới ~1% ở mép vòng tròn với bán kính tối đa.
+    """
+    radius_km = min(float(radius_km), MAX_RADIUS_KM)
+    km_per_deg = math.radians(EARTH_RADIUS_KM)
+    dlat = (Job.latitude - lat) * km_per_deg
+    dlng = (Job.longitude - lng) * (km_per_deg * math.cos(math.radians(lat)))
+    return _coarse_conditions(lat, lng, radius_km) + [dlat * dlat + dlng * dlng <= radius_km * radius_km]
+
+
+def nearby_job_ids(lat, lng, radius_km, base_query=None):
+    """Danh sách (job_id, khoảng cách km) trong bán kính, sắp theo khoảng cách tăng dần (haversine chính xác)."""
+    radius_km = min(float(radius_km), MAX_RADIUS_KM)
+    q = base_query if base_query is not None else db.session.query(Job.id, Job.latitude, Job.longitude)
+    q = q.filter(*_coarse_conditions(lat, lng, radius_km))
+    result = []
+    for job_id, job_lat, job_lng in q.with_entities(Job.id, Job.latitude, Job.longitude):
+        distance = haversine_km(lat, lng, job_lat, job_lng)
+        if distance <= radius_km:
+            result.append((job_id, distance))
+    result.sort(key=lambda r: r[1])
+    return result
+
+
+def keyword_job_ids(keyword):
+    """
+    Tập id job khớp keyword (qua full-text index), dùng cho facet; None nếu keyword không lọc gì.
+    Nhớ trong search_cache theo keyword đã chuẩn hoá như khoá của search_jobs, xoá cùng lúc khi
+    Job/Employer thay đổi.
+    """
+    key = ("keyword_ids", " ".join((keyword or "").lower().split()))
+    cached = search_cache.get(key)
+    if cached is not None:
+        return cached[0]
+    stmt = get_backend().match_ids(keyword)
+    ids = None if stmt is None else [job_id for (job_id,) in db.session.execute(stmt)]
+    search_cache.set(key, (ids,))
+    return ids
+
+
+# ============================
+# Phân trang: OFFSET cho vài trang đầu, keyset (cursor) cho các trang sau
+# ============================
+# Chỉ OFFSET_PAGE_LIMIT trang đầu được đánh số; sau đó phải đi tiếp bằng cursor "after",
+# nên crawler không thể ép DB chạy OFFSET sâu. Tổng số kết quả chỉ đếm tới COUNT_CAP.
+OFFSET_PAGE_LIMIT = 5
+COUNT_CAP = 1000
+
+# sort_by -> (cột sắp xếp, chiều); NULL luôn xếp cuối, Job.id là khoá phụ
+KEYSET_SORTS = {
+    "salary_desc": (Job.salary_max, "desc"),
+    "salary_asc": (Job.salary_min, "asc"),
+    "newest": (Job.created_at, "desc"),
+    "": (Job.created_at, "desc"),
+}
+
+
+def encode_cursor(sort_by, job):
+    column, _ = KEYSET_SORTS[sort_by]
+    value = getattr(job, column.key)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({"s": sort_by, "v": value, "id": job.id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, sort_by):
+    """Trả về (value, id) hoặc None nếu cursor sai / không khớp kiểu sắp xếp."""
+    if not token or sort_by not in KEYSET_SORTS:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        if payload["s"] != sort_by:
+            return None
+        value, last_id = payload["v"], int(payload["id"])
+        column, _ = KEYSET_SORTS[sort_by]
+        if value is not None and column.key == "created_at":
+            value = datetime.fromisoformat(value)
+        elif value is not None:
+            value = int(value)
+        return value, last_id
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        return None
+
+
+def _keyset_filter(sort_by, value, last_id):
+    column, direction = KEYSET_SORTS[sort_by]
+    after_id = Job.id < last_id if direction == "desc" else Job.id > last_id
+    if value is None:
+        # Đang ở vùng NULL (cuối danh sách): chỉ còn so theo id
+        return and_(column.is_(None), after_id)
+    after_value = column < value if direction == "desc" else column > value
+    return or_(after_value, and_(column == value, after_id), column.is_(None))
+
+
+def capped_count(q, cap=COUNT_CAP):
+    """Đếm tối đa cap+1 dòng. Trả về (total, exact)."""
+    limited = q.order_by(None).with_entities(Job.id).limit(cap + 1).subquery()
+    total = db.session.execute(select(func.count()).select_from(limited)).scalar()
+    if total > cap:
+        return cap, False
+    return total, True
+
+
+class JobPage:
+    """Kết quả một trang job (thay cho Pagination của Flask-SQLAlchemy)."""
+
+    def __init__(self, items, page, pages, total, total_exact, next_cursor):
+        self.items = items
+        self.page = page            # None khi đang ở chế độ cursor
+        self.pages = pages          # số trang được đánh số (<= OFFSET_PAGE_LIMIT)
+        self.total = total          # None nếu không đếm
+        self.total_exact = total_exact
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def paginate_jobs(q, sort_by="", page=1, per_page=12, after=None, with_total=True):
+    """
+    Phân trang query từ build_job_query().
+    - after: cursor từ trang trước -> keyset, không OFFSET, không COUNT
+    - page: chỉ dùng cho OFFSET_PAGE_LIMIT trang đầu
+    """
+    keyset = sort_by in KEYSET_SORTS
+    cursor = decode_cursor(after, sort_by) if keyset else None
+
+    if cursor is not None:
+        rows = q.filter(_keyset_filter(sort_by, *cursor)).limit(per_page + 1).all()
+        page, total, total_exact = None, None, False
+    else:
+        page = max(1, min(page or 1, OFFSET_PAGE_LIMIT))
+        rows = q.limit(per_page + 1).offset((page - 1) * per_page).all()
+        total, total_exact = capped_count(q) if with_total else (None, False)
+
+    items = rows[:per_page]
+    next_cursor = None
+    if len(rows) > per_page and keyset:
+        next_cursor = encode_cursor(sort_by, items[-1])
+
+    if total is not None:
+        pages = min(max(1, math.ceil(total / per_page)), OFFSET_PAGE_LIMIT)
+    else:
+        pages = min(page or OFFSET_PAGE_LIMIT, OFFSET_PAGE_LIMIT)
+    return JobPage(items, page, pages, total, total_exact, next_cursor)
+
+
+# ============================
+# Cache kết quả tìm kiếm (danh sách id + tổng số), xoá khi Job/Employer thay đổi
+# ============================
+# Cache nằm trong từng process: thay đổi chỉ xoá cache của process đã ghi, các worker khác
+# vẫn có thể trả kết quả cũ tới hết TTL. Chạy nhiều worker thì đặt SEARCH_CACHE_TTL ngắn
+# (vài giây) nếu cần job mới/đã sửa hiện ra ngay ở mọi worker.
+search_cache = TTLCache("search", maxsize=512, ttl=60)
+
+
+def _cache_key(keyword, location_raw, job_type_raw, work_type_raw, min_salary, max_salary,
+               sort_by, salary_overlap, active_on, category_raw, near, radius_km,
+               page, per_page, after, with_total):
+    locs = tuple(sorted({fold_text(s) for s in (location_raw or "").split(",") if s.strip()}))
+    work_types = tuple(sorted({fold_text(s) for s in (work_type_raw or "").split(",") if s.strip()}))
+    categories = tuple(sorted({s.strip() for s in (category_raw or "").split(",") if s.strip()}))
+    return (
+        " ".join((keyword or "").lower().split()), locs, fold_text(job_type_raw or ""), work_types,
+        min_salary, max_salary, sort_by or "", salary_overlap, active_on, categories,
+        near and (round(near[0], 4), round(near[1], 4)), radius_km,
+        None if after else page, per_page, after, with_total,
+    )
+
+
+def search_jobs(keyword="", location_raw="", job_type_raw="", work_type_raw="",
+                min_salary=None, max_salary=None, sort_by="", salary_overlap=False, active_on=None,
+                category_raw="", near=None, radius_km=None,
+                page=1, per_page=12, after=None, with_total=True):
+    """build_job_query() + paginate_jobs(), có cache theo bộ tham số đã chuẩn hoá."""
+    key = _cache_key(keyword, location_raw, job_type_raw, work_type_raw, min_salary, max_salary,
+                     sort_by, salary_overlap, active_on, category_raw, near, radius_km,
+                     page, per_page, after, with_total)
+    cached = search_cache.get(key)
+    if cached is not None:
+        ids, page_no, pages, total, total_exact, next_cursor = cached
+        jobs = {job.id: job for job in Job.query.filter(Job.id.in_(ids)).all()} if ids else {}
+        items = [jobs[i] for i in ids if i in jobs]
+        return JobPage(items, page_no, pages, total, total_exact, next_cursor)
+
+    q = build_job_query(keyword=keyword, location_raw=location_raw, job_type_raw=job_type_raw,
+                        work_type_raw=work_type_raw, min_salary=min_salary, max_salary=max_salary,
+                        sort_by=sort_by, salary_overlap=salary_overlap, active_on=active_on,
+                        category_raw=category_raw, near=near, radius_km=radius_km)
+    result = paginate_jobs(q, sort_by=sort_by, page=page, per_page=per_page,
+                           after=after, with_total=with_total)
+    search_cache.set(key, (tuple(job.id for job in result.items), result.page, result.pages,
+                           result.total, result.total_exact, result.next_cursor))
+    return result
+
+
+def _invalidate_search_cache(mapper, connection, target):
+    search_cache.clear()
+    # Xoá thêm một lần sau commit: request đọc giữa flush và commit có thể đã cache dữ liệu cũ
+    session = object_session(target)
+    if session is not None:
+        session.info["search_cache_dirty"] = True
+
+
+for _model in (Job, Employer):
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _invalidate_search_cache)
+
+
+@event.listens_for(Session, "after_commit")
+def _clear_search_cache_after_commit(session):
+    if session.info.pop("search_cache_dirty", False):
+        search_cache.clear()
+
+
+def init_app(app):
+    """
+    Cấu hình hoặc biến môi trường cùng tên: SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL (giây, mặc định 60;
+    cache không được xoá chéo giữa các worker, xem ghi chú ở search_cache).
+    """
+    search_cache.configure(
+        maxsize=int(app.config.get("SEARCH_CACHE_SIZE", os.getenv("SEARCH_CACHE_SIZE", 512))),
+        ttl=float(app.config.get("SEARCH_CACHE_TTL", os.getenv("SEARCH_CACHE_TTL", 60))),
+    )
+    with app.app_context():
+        ensure_index()
+
+    @app.cli.command("reindex-jobs")
+    def reindex_jobs_command():
+        """Dựng lại full-text index cho toàn bộ job."""
+        rebuild_index()
+        print(f"Đã dựng lại {INDEX_TABLE} ({get_backend().name})")
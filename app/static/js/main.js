@@ -10,6 +10,39 @@ document.addEventListener('DOMContentLoaded', function () {
   const jobTypeFilters = document.querySelectorAll('#job-type-filter input[name="job_type"]');
   const workTypeFilters = document.querySelectorAll('#work-type-filter input[name="work_type"]');
 
+  // Gợi ý từ khóa cho ô tìm kiếm
+  function setupKeywordSuggest(input, index) {
+    const list = document.createElement('datalist');
+    list.id = 'keyword-suggestions-' + index;
+    document.body.appendChild(list);
+    input.setAttribute('list', list.id);
+    input.setAttribute('autocomplete', 'off');
+    let timer = null;
+    let controller = null;
+    input.addEventListener('input', () => {
+      clearTimeout(timer);
+      const q = input.value.trim();
+      if (!q) { list.innerHTML = ''; return; }
+      timer = setTimeout(async () => {
+        if (controller) controller.abort();
+        controller = new AbortController();
+        try {
+          const res = await fetch('/jobs/suggest?q=' + encodeURIComponent(q), { signal: controller.signal });
+          const data = await res.json();
+          list.innerHTML = '';
+          data.suggestions.forEach(s => {
+            const opt = document.createElement('option');
+            opt.value = s.text;
+            list.appendChild(opt);
+          });
+        } catch (e) {
+          if (e.name !== 'AbortError') console.warn('Could not load suggestions', e);
+        }
+      }, 150);
+    });
+  }
+  document.querySelectorAll('input[name="keyword"]').forEach(setupKeywordSuggest);
+
   // Hàm helper
   function formatNumberStringForDisplay(s) {
     if (!s) return '';
@@ -0,0 +1,220 @@
+import bisect
+import heapq
+import re
+from collections import Counter, defaultdict
+from datetime import date
+
+from app.extensions import db
+from app.indexing import IncrementalIndex, chunked
+from app.models import Job, Employer, Skill
+from utils.helpers import fold_text
+
+# ============================
+# Gợi ý từ khóa (typeahead) cho ô tìm kiếm việc làm
+# ============================
+# Mảng đã sắp xếp các chuỗi (đã bỏ dấu) bắt đầu từ mỗi đầu từ của tên job / công ty / kỹ năng;
+# tìm theo tiền tố bằng bisect. Trọng số = số job còn hạn; kết quả theo tiền tố được nhớ lại
+# tới lần thay đổi dữ liệu tiếp theo. Không truy vấn DB khi trả lời.
+
+SUGGEST_LIMIT = 10
+MAX_SKILL_WORDS = 3       # kỹ năng dài tối đa 3 từ (vd. "machine learning")
+MEMO_SIZE = 20000         # số tiền tố nhớ kết quả tối đa
+
+_WORD = re.compile(r"[\w+#.]+")
+
+
+def _word_starts(key):
+    """'lap trinh vien' -> ['lap trinh vien', 'trinh vien', 'vien']"""
+    return [key[m.start():] for m in re.finditer(r"(?:^|(?<= ))\S", key)]
+
+
+def _ngrams(text, n_max=MAX_SKILL_WORDS):
+    words = _WORD.findall(text)
+    grams = set()
+    for n in range(1, n_max + 1):
+        for i in range(len(words) - n + 1):
+            grams.add(" ".join(words[i:i + n]))
+    return grams
+
+
+class SuggestIndex(IncrementalIndex):
+    """
+    Id theo dõi có dạng ("job", id) hoặc ("employer", id).
+    Job hết hạn được tính lại khi nạp toàn bộ (tối đa max_age giây sau nửa đêm).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._reset()
+
+    def _reset(self):
+        self._entries = []                  # [(chuỗi bỏ dấu từ một đầu từ, kind, key)]
+        self._bulk_loading = False
+        self._entry_set = set()
+        self._weights = Counter()           # (kind, key) -> số job còn hạn
+        self._labels = defaultdict(Counter)  # (kind, key) -> {nhãn gốc: số lần}
+        self._jobs = {}                     # job_id -> (title_key, title, employer_id, skill_keys, active)
+        self._employers = {}                # employer_id -> (company key, company_name)
+        self._employer_jobs = Counter()     # employer_id -> số job còn hạn
+        self._skills = set()
+        self._memo = {}
+
+    # --- Nạp dữ liệu ---
+    def load_all(self):
+        self._reset()
+        # Nạp toàn bộ: nối vào cuối rồi sort một lần (insort từng phần tử là O(n²))
+        self._bulk_loading = True
+        try:
+            self._load_everything()
+        finally:
+            self._bulk_loading = False
+        self._entries.sort()
+
+    def _load_everything(self):
+        for (name,) in db.session.query(Skill.name):
+            key = fold_text(name)
+            if key:
+                self._skills.add(key)
+                self._labels[("skill", key)][name] += 1
+                self._add_entries("skill", key)
+        for employer_id, company_name in db.session.query(Employer.id, Employer.company_name):
+            self._set_employer(employer_id, company_name)
+        self._load_jobs(self._job_query())
+
+    def load_ids(self, ids):
+        job_ids = [i for kind, i in ids if kind == "job"]
+        for kind, employer_id in ids:
+            if kind == "employer":
+                row = db.session.query(Employer.company_name).filter(Employer.id == employer_id).first()
+                self._set_employer(employer_id, row.company_name if row else None)
+        for job_id in job_ids:
+            self._remove_job(job_id)
+        for batch in chunked(job_ids):
+            self._load_jobs(self._job_query().filter(Job.id.in_(batch)))
+        self._memo.clear()
+
+    def _job_query(self):
+        return db.session.query(Job.id, Job.title, Job.requirements, Job.employer_id, Job.deadline)
+
+    def _load_jobs(self, rows):
+        today = date.today()
+        for row in rows:
+            title_key = fold_text(row.title)
+            text = f"{title_key} {fold_text(row.requirements)}"
+            skill_keys = tuple(self._skills & _ngrams(text))
+            active = row.deadline is None or row.deadline >= today
+            title = (row.title or "").strip()
+            self._jobs[row.id] = (title_key, title, row.employer_id, skill_keys, active)
+            if title_key:
+                self._labels[("title", title_key)][title] += 1
+                self._add_entries("title", title_key)
+            if active:
+                self._bump(title_key, row.employer_id, skill_keys, 1)
+
+    def _remove_job(self, job_id):
+        entry = self._jobs.pop(job_id, None)
+        if entry is None:
+            return
+        title_key, title, employer_id, skill_keys, active = entry
+        if title_key:
+            self._unvote(("title", title_key), title)
+        if active:
+            self._bump(title_key, employer_id, skill_keys, -1)
+
+    def _bump(self, title_key, employer_id, skill_keys, delta):
+        if title_key:
+            self._weights[("title", title_key)] += delta
+        self._employer_jobs[employer_id] += delta
+        company = self._employers.get(employer_id)
+        if company:
+            self._weights[("company", company[0])] += delta
+        for key in skill_keys:
+            self._weights[("skill", key)] += delta
+
+    def _set_employer(self, employer_id, company_name):
+        old = self._employers.pop(employer_id, None)
+        count = self._employer_jobs[employer_id]
+        if old:
+            self._weights[("company", old[0])] -= count
+            self._unvote(("company", old[0]), old[1])
+        key = fold_text(company_name)
+        if not key:
+            return
+        label = company_name.strip()
+        self._employers[employer_id] = (key, label)
+        self._weights[("company", key)] += count
+        self._labels[("company", key)][label] += 1
+        self._add_entries("company", key)
+
+    def _unvote(self, term, label):
+        labels = self._labels.get(term)
+        if labels and label in labels:
+            labels[label] -= 1
+            if labels[label] <= 0:
+                del labels[label]
+
+    def _add_entries(self, kind, key):
+        for text in _word_starts(key):
+            entry = (text, kind, key)
+            if entry not in self._entry_set:
+                self._entry_set.add(entry)
+                if self._bulk_loading:
+                    self._entries.append(entry)
+                else:
+                    bisect.insort(self._entries, entry)
+
+    # --- Truy vấn ---
+    def _label(self, kind, key):
+        labels = self._labels.get((kind, key))
+        return labels.most_common(1)[0][0] if labels else None
+
+    def suggest(self, q, limit=SUGGEST_LIMIT):
+        """[(nhãn, kind, số job còn hạn)] cho tiền tố q, tối đa limit phần tử."""
+        prefix = fold_text(q)
+        if not prefix:
+            return []
+        self.ensure_fresh()
+        with self._lock:
+            memo_key = (prefix, limit)
+            cached = self._memo.get(memo_key)
+            if cached is not None:
+                return cached
+
+            scores = {}
+            i = bisect.bisect_left(self._entries, (prefix,))
+            while i < len(self._entries) and self._entries[i][0].startswith(prefix):
+                text, kind, key = self._entries[i]
+                weight = self._weights[(kind, key)]
+                # Job hết hạn hết thì không gợi ý tên job đó nữa; công ty/kỹ năng vẫn gợi ý
+                if weight > 0 or kind != "title":
+                    # Khớp từ đầu chuỗi xếp trước khớp giữa chuỗi
+                    score = (key.startswith(prefix), weight, -len(key))
+                    if scores.get((kind, key), (False,)) < score:
+                        scores[(kind, key)] = score
+                i += 1
+
+            result = []
+            seen = set()
+            for (kind, key), score in heapq.nlargest(limit * 2, scores.items(), key=lambda kv: kv[1]):
+                label = self._label(kind, key)
+                if label is None or (label.lower(), kind) in seen:
+                    continue
+                seen.add((label.lower(), kind))
+                result.append((label, kind, max(score[1], 0)))
+                if len(result) == limit:
+                    break
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            self._memo[memo_key] = result
+            return result
+
+
+suggest_index = SuggestIndex()
+suggest_index.watch(Job, get_ids=lambda target: [("job", target.id)])
+suggest_index.watch(Employer, get_ids=lambda target: [("employer", target.id)])
+# Thêm/sửa kỹ năng: nạp lại toàn bộ vì phải dò lại kỹ năng trong mọi job
+suggest_index.watch(Skill, get_ids=lambda target: None)
+
+
+def suggest(q, limit=SUGGEST_LIMIT):
+    return suggest_index.suggest(q, limit=limit)
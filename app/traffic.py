@@ -0,0 +1,150 @@
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode
+
+from flask import request
+from flask_login import current_user
+from werkzeug.wsgi import ClosingIterator
+
+# ============================
+# Ghi lại traffic thật (JSON lines) để phát lại bằng benchmarks.replay
+# ============================
+# Middleware WSGI chỉ đưa bản ghi vào hàng đợi; một thread nền ghi ra file theo lô,
+# nên request không bao giờ chờ I/O đĩa. Hàng đợi đầy thì bỏ bản ghi (đếm ở dropped).
+# Mỗi dòng: {"ts", "method", "path", "query", "endpoint", "role", "status", "duration_ms"}
+
+DEFAULT_PATH = "traffic.jsonl"
+QUEUE_SIZE = 10000
+FLUSH_INTERVAL = 1.0    # giây
+
+# Tham số query không được ghi giá trị (thay bằng "***")
+SENSITIVE_PARAMS = {"token", "password", "email", "phone", "code", "secret", "api_key", "signature", "session"}
+SKIP_PREFIXES = ("/static/", "/favicon.ico", "/metrics")
+# Request giữ kết nối lâu (SSE, long-poll): phát lại bằng request thường sẽ treo tới timeout
+_STREAM_PATH = re.compile(r"^/messages/conversation/\d+/stream$")
+
+ENDPOINT_KEY = "jobnest.traffic.endpoint"
+ROLE_KEY = "jobnest.traffic.role"
+
+logger = logging.getLogger(__name__)
+
+
+def is_long_lived(path, query_string=""):
+    if _STREAM_PATH.match(path):
+        return True
+    return path == "/badges" and any(k == "wait" for k, _ in parse_qsl(query_string))
+
+
+def sanitize_query(query_string):
+    pairs = parse_qsl(query_string, keep_blank_values=True)
+    return urlencode([(k, "***" if k.lower() in SENSITIVE_PARAMS else v) for k, v in pairs], safe="*")
+
+
+class _Writer(threading.Thread):
+
+    def __init__(self, path, queue_size=QUEUE_SIZE):
+        super().__init__(name="traffic-writer", daemon=True)
+        self.path = path
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def put(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < 1000:
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in batch)
+            except OSError:
+                logger.exception("Không ghi được traffic vào %s", self.path)
+            for _ in batch:
+                self.queue.task_done()
+
+    def flush(self, timeout=5.0):
+        """Chờ tới khi mọi bản ghi đã vào file (dùng khi tắt app / trong script)."""
+        end = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < end:
+            time.sleep(0.01)
+
+
+class TrafficRecorder:
+    """Middleware WSGI bọc app.wsgi_app."""
+
+    def __init__(self, wsgi_app, path=DEFAULT_PATH, sample_rate=1.0):
+        self.wsgi_app = wsgi_app
+        self.sample_rate = sample_rate
+        self.writer = _Writer(path)
+        self.writer.start()
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        if (path.startswith(SKIP_PREFIXES) or is_long_lived(path, environ.get("QUERY_STRING", ""))
+                or (self.sample_rate < 1 and random.random() >= self.sample_rate)):
+            return self.wsgi_app(environ, start_response)
+
+        started = time.perf_counter()
+        status = []
+
+        def _start_response(status_line, headers, exc_info=None):
+            status.append(int(status_line.split(" ", 1)[0]))
+            return start_response(status_line, headers, exc_info)
+
+        def _record():
+            self.writer.put({
+                "ts": round(time.time(), 3),
+                "method": environ.get("REQUEST_METHOD", "GET"),
+                "path": path,
+                "query": sanitize_query(environ.get("QUERY_STRING", "")),
+                "endpoint": environ.get(ENDPOINT_KEY),
+                "role": environ.get(ROLE_KEY, "anonymous"),
+                "status": status[0] if status else 500,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            })
+
+        # Ghi khi server đóng body -> thời gian gồm cả phần stream response
+        return ClosingIterator(self.wsgi_app(environ, _start_response), [_record])
+
+
+def init_app(app):
+    """
+    Bật bằng cấu hình hoặc biến môi trường cùng tên (mặc định tắt):
+    - TRAFFIC_RECORD = True
+    - TRAFFIC_RECORD_PATH: file JSON lines (mặc định traffic.jsonl)
+    - TRAFFIC_SAMPLE_RATE: tỉ lệ request được ghi (0..1)
+    """
+    enabled = app.config.get("TRAFFIC_RECORD", os.getenv("TRAFFIC_RECORD", "false").lower() == "true")
+    if not enabled:
+        return None
+
+    @app.after_request
+    def _tag_traffic(response):
+        # Endpoint và vai trò chỉ biết bên trong Flask -> để lại trong environ cho middleware
+        request.environ[ENDPOINT_KEY] = request.endpoint
+        request.environ[ROLE_KEY] = current_user.role if current_user.is_authenticated else "anonymous"
+        return response
+
+    recorder = TrafficRecorder(app.wsgi_app,
+                               path=app.config.get("TRAFFIC_RECORD_PATH",
+                                                   os.getenv("TRAFFIC_RECORD_PATH", DEFAULT_PATH)),
+                               sample_rate=float(app.config.get("TRAFFIC_SAMPLE_RATE",
+                                                                os.getenv("TRAFFIC_SAMPLE_RATE", 1.0))))
+    app.wsgi_app = recorder
+    app.extensions["traffic_recorder"] = recorder
+    return recorder
@@ -0,0 +1,139 @@
+"""
+Benchmark tìm ứng viên: ILIKE trên bảng candidates (cách ngây thơ)
+so với inverted index BM25 in-memory (app.candidate_search).
+
+Chạy:
+    python -m benchmarks.bench_candidates --candidates 200000 --repeat 20
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import insert, or_
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Candidate
+from app.candidate_search import candidate_index, FIELDS
+
+SKILLS = ("Python Java JavaScript React Angular SQL Excel Photoshop AutoCAD Docker Kubernetes "
+          "Marketing SEO Kế_toán Tiếng_Anh Tiếng_Nhật Bán_hàng Giao_tiếp Thuyết_trình Figma").split()
+POSITIONS = ("Lập trình viên", "Kế toán", "Nhân viên kinh doanh", "Chuyên viên marketing",
+             "Kỹ sư xây dựng", "Thiết kế đồ họa", "Nhân viên nhân sự", "Giáo viên tiếng Anh")
+MAJORS = ("Công nghệ thông tin", "Kế toán", "Quản trị kinh doanh", "Marketing", "Xây dựng", "Ngôn ngữ Anh")
+CITIES = ("Hà Nội", "TP Hồ Chí Minh", "Đà Nẵng", "Hải Phòng", "Cần Thơ")
+
+QUERIES = [
+    {"keyword": "python"},
+    {"keyword": "lập trình viên react", "city": "Hà Nội"},
+    {"keyword": "kế toán excel", "min_experience_months": 24},
+    {"keyword": "marketing seo", "max_salary": 15_000_000},
+    {"keyword": "", "city": "Đà Nẵng"},
+    {"keyword": "không tồn tại"},
+]
+
+
+def seed(n, seed_value=42):
+    rng = random.Random(seed_value)
+    users, candidates = [], []
+    for i in range(1, n + 1):
+        users.append({"id": i, "email": f"c{i}@bench.local", "password_hash": "x", "role": "candidate",
+                      "isPremiumActive": False, "active": True})
+        candidates.append({
+            "id": i, "user_id": i, "full_name": f"Ứng viên {i}",
+            "expected_position": rng.choice(POSITIONS),
+            "current_position": rng.choice(POSITIONS),
+            "skills": ", ".join(s.replace("_", " ") for s in rng.sample(SKILLS, 4)),
+            "major": rng.choice(MAJORS),
+            "education": "Đại học",
+            "city": rng.choice(CITIES),
+            "experience_years": rng.randint(0, 10),
+            "experience_months": rng.randint(0, 11),
+            "expected_salary": rng.choice([None, 8, 12, 15, 20, 30]) and rng.choice([8, 12, 15, 20, 30]) * 1_000_000,
+        })
+        if len(users) == 10000:
+            db.session.execute(insert(User), users)
+            db.session.execute(insert(Candidate), candidates)
+            users, candidates = [], []
+    if users:
+        db.session.execute(insert(User), users)
+        db.session.execute(insert(Candidate), candidates)
+    db.session.commit()
+
+
+def ilike_search(keyword="", city="", min_experience_months=None, max_salary=None, per_page=20):
+    q = Candidate.query
+    for word in keyword.split():
+        q = q.filter(or_(*[getattr(Candidate, name).ilike(f"%{word}%") for name, _ in FIELDS]))
+    if city:
+        q = q.filter(Candidate.city == city)
+    if min_experience_months:
+        q = q.filter(Candidate.experience_years * 12 + Candidate.experience_months >= min_experience_months)
+    if max_salary is not None:
+        q = q.filter(or_(Candidate.expected_salary.is_(None), Candidate.expected_salary <= max_salary))
+    q.order_by(Candidate.id.desc()).limit(per_page).all()
+    return q.order_by(None).count()
+
+
+def index_search(**kwargs):
+    return candidate_index.search(**kwargs).total
+
+
+def _samples(fn, kwargs, repeat):
+    fn(**kwargs)  # warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(**kwargs)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[max(0, int(len(samples) * 0.95) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--candidates", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+        with app.app_context():
+            t0 = time.perf_counter()
+            seed(args.candidates)
+            print(f"Seed {args.candidates} ứng viên: {time.perf_counter() - t0:.1f}s")
+            t0 = time.perf_counter()
+            candidate_index.invalidate()
+            candidate_index.ensure_fresh()
+            print(f"Dựng index: {time.perf_counter() - t0:.1f}s")
+
+            t0 = time.perf_counter()
+            profile = db.session.get(Candidate, 1)
+            profile.skills = "Rust, Elixir"
+            db.session.commit()
+            candidate_index.ensure_fresh()
+            print(f"Cập nhật 1 hồ sơ: {(time.perf_counter() - t0) * 1000:.1f}ms")
+
+            t0 = time.perf_counter()
+            candidate_index.invalidate()
+            candidate_index.ensure_fresh()
+            print(f"Nạp lại định kỳ (chỉ so updated_at): {time.perf_counter() - t0:.2f}s")
+
+            print(f"{'query':<50}{'kết quả':>9}{'ilike median':>15}{'index median':>15}{'index p95':>12}{'speedup':>10}")
+            for kwargs in QUERIES:
+                ilike_median, _ = _samples(ilike_search, kwargs, args.repeat)
+                index_median, index_p95 = _samples(index_search, kwargs, args.repeat)
+                label = ", ".join(f"{k}={v}" for k, v in kwargs.items() if v)
+                print(f"{label[:48]:<50}{index_search(**kwargs):>9}{ilike_median:>13.1f}ms{index_median:>13.2f}ms"
+                      f"{index_p95:>10.2f}ms{ilike_median / index_median:>9.1f}x")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark tìm job theo bán kính: quét toàn bảng + haversine (cách ngây thơ)
+so với lọc thô bằng geohash/bounding box rồi mới tính haversine (app.search.nearby_job_ids).
+
+Chạy:
+    python -m benchmarks.bench_geo --points 1000000 --repeat 10
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import insert
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Employer, Job
+from app.search import nearby_job_ids
+from utils.geo import geohash_encode, haversine_km
+
+# Tâm các thành phố lớn: phần lớn job tập trung quanh đây, phần còn lại rải khắp lãnh thổ
+CITIES = {
+    "Hà Nội": (21.0278, 105.8342),
+    "TP HCM": (10.8231, 106.6297),
+    "Đà Nẵng": (16.0544, 108.2022),
+    "Hải Phòng": (20.8449, 106.6881),
+    "Cần Thơ": (10.0452, 105.7469),
+}
+QUERIES = [(center, radius) for center in CITIES.values() for radius in (2, 10, 50)]
+
+
+def seed(n_points, seed_value=42):
+    rng = random.Random(seed_value)
+    db.session.execute(insert(User), [{"id": 1, "email": "geo@bench.local", "password_hash": "x",
+                                       "role": "employer", "isPremiumActive": False, "active": True}])
+    db.session.execute(insert(Employer), [{"id": 1, "user_id": 1, "company_name": "Bench"}])
+    centers = list(CITIES.values())
+    batch = []
+    for i in range(1, n_points + 1):
+        if rng.random() < 0.8:
+            lat0, lng0 = rng.choice(centers)
+            lat, lng = rng.gauss(lat0, 0.15), rng.gauss(lng0, 0.15)
+        else:
+            lat, lng = rng.uniform(8.5, 23.4), rng.uniform(102.1, 109.5)
+        # Bulk insert không đi qua mapper event nên tự tính geohash
+        batch.append({"id": i, "employer_id": 1, "title": f"Job {i}", "description": "",
+                      "latitude": lat, "longitude": lng, "geohash": geohash_encode(lat, lng)})
+        if len(batch) == 20000:
+            db.session.execute(insert(Job), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Job), batch)
+    db.session.commit()
+
+
+def linear_scan(lat, lng, radius_km):
+    rows = db.session.query(Job.id, Job.latitude, Job.longitude).filter(Job.latitude.isnot(None))
+    result = [(job_id, d) for job_id, la, ln in rows if (d := haversine_km(lat, lng, la, ln)) <= radius_km]
+    result.sort(key=lambda r: r[1])
+    return result
+
+
+def _time(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--linear-repeat", type=int, default=2, help="quét toàn bảng rất chậm nên chạy ít lần")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+        with app.app_context():
+            t0 = time.perf_counter()
+            seed(args.points)
+            print(f"Seed {args.points} điểm: {time.perf_counter() - t0:.1f}s")
+
+            print(f"{'query':<22}{'kết quả':>9}{'linear median':>16}{'grid median':>14}{'grid p95':>12}{'speedup':>10}")
+            for (lat, lng), radius in QUERIES:
+                grid_samples = []
+                for _ in range(args.repeat):
+                    ms, grid = _time(nearby_job_ids, lat, lng, radius)
+                    grid_samples.append(ms)
+                linear_samples = []
+                for _ in range(args.linear_repeat):
+                    ms, linear = _time(linear_scan, lat, lng, radius)
+                    linear_samples.append(ms)
+                assert [r[0] for r in grid] == [r[0] for r in linear], "kết quả grid khác quét toàn bảng"
+
+                grid_samples.sort()
+                grid_median = statistics.median(grid_samples)
+                linear_median = statistics.median(linear_samples)
+                p95 = grid_samples[max(0, int(len(grid_samples) * 0.95) - 1)]
+                label = f"{lat:.2f},{lng:.2f} r={radius}km"
+                print(f"{label:<22}{len(grid):>9}{linear_median:>14.1f}ms{grid_median:>12.1f}ms"
+                      f"{p95:>10.1f}ms{linear_median / grid_median:>9.1f}x")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
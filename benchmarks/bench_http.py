@@ -0,0 +1,189 @@
+"""
+Benchmark các endpoint HTTP nóng qua Flask test client trên SQLite với dữ liệu sinh tất định
+(benchmarks.datagen). Đo p50/p95/p99 độ trễ, số query mỗi request và bộ nhớ đỉnh;
+kết quả ghi ra JSON để so sánh giữa các commit.
+
+Chạy:
+    python -m benchmarks.bench_http --jobs 20000 --repeat 50 --output before.json
+    python -m benchmarks.bench_http --jobs 20000 --repeat 50 --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from sqlalchemy import event, func
+
+from app import create_app
+from app.extensions import db
+from app.models import Conversation, Employer, Job, Message
+from benchmarks.datagen import DEFAULT_COUNTS, generate
+
+# (tên, url, vai trò đăng nhập)
+ENDPOINTS = (
+    ("home", "/", None),
+    ("jobs", "/jobs/", None),
+    ("job_detail", "/jobs/{job_id}", None),
+    ("employer_dashboard", "/employer/dashboard", "employer"),
+    ("admin_dashboard", "/admin/dashboard", "admin"),
+    ("messages", "/messages/", "messages"),
+    ("unread_count", "/messages/unread_count", "messages"),
+)
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _pick_users(ids):
+    """User đại diện cho từng vai trò: nhà tuyển dụng nhiều job nhất, người có nhiều tin nhắn nhất."""
+    employer_user_id = db.session.query(Employer.user_id).join(Job) \
+        .group_by(Employer.id).order_by(func.count(Job.id).desc()).limit(1).scalar()
+    busiest = db.session.query(Conversation.user1_id).join(Message) \
+        .group_by(Conversation.user1_id).order_by(func.count(Message.id).desc()).limit(1).scalar()
+    return {
+        "admin": ids["admin_user_id"],
+        "employer": employer_user_id or ids["employer_user_ids"][0],
+        "messages": busiest or ids["candidate_user_ids"][0],
+    }
+
+
+class _QueryCounter:
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "after_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def _client_for(app, user_id):
+    client = app.test_client()
+    if user_id is not None:
+        with client.session_transaction() as sess:
+            sess["_user_id"] = str(user_id)
+            sess["_fresh"] = True
+    return client
+
+
+def run(app, users, job_id, repeat, warmup=3):
+    with app.app_context():
+        counter = _QueryCounter(db.engine)
+    results = {}
+    for name, url, role in ENDPOINTS:
+        url = url.format(job_id=job_id)
+        client = _client_for(app, users.get(role))
+        for _ in range(warmup):
+            response = client.get(url)
+        if response.status_code != 200:
+            print(f"! {name}: {url} trả về {response.status_code}, bỏ qua", file=sys.stderr)
+            continue
+
+        samples, queries = [], []
+        for _ in range(repeat):
+            before = counter.count
+            start = time.perf_counter()
+            client.get(url)
+            samples.append((time.perf_counter() - start) * 1000)
+            queries.append(counter.count - before)
+
+        # Đo bộ nhớ ở lượt riêng vì tracemalloc làm chậm request
+        tracemalloc.start()
+        client.get(url)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[name] = {
+            "url": url,
+            "p50_ms": round(_percentile(samples, 50), 3),
+            "p95_ms": round(_percentile(samples, 95), 3),
+            "p99_ms": round(_percentile(samples, 99), 3),
+            "mean_ms": round(sum(samples) / len(samples), 3),
+            "queries": max(queries),
+            "peak_kb": round(peak / 1024, 1),
+        }
+    return results
+
+
+def _print_results(results, baseline=None):
+    header = f"{'endpoint':<20}{'p50':>10}{'p95':>10}{'p99':>10}{'queries':>9}{'peak KB':>10}"
+    print(header + ("   p50 so với baseline" if baseline else ""))
+    for name, row in results.items():
+        line = (f"{name:<20}{row['p50_ms']:>8.2f}ms{row['p95_ms']:>8.2f}ms{row['p99_ms']:>8.2f}ms"
+                f"{row['queries']:>9}{row['peak_kb']:>10.0f}")
+        old = (baseline or {}).get(name)
+        if old:
+            change = (row["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100 if old["p50_ms"] else 0
+            line += f"   {change:+6.1f}% ({old['queries']} -> {row['queries']} queries)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for name, default in DEFAULT_COUNTS.items():
+        parser.add_argument(f"--{name}", type=int, default=default)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--output", help="file JSON ghi kết quả (mặc định bench_http-<commit>.json)")
+    parser.add_argument("--compare", help="file JSON của lần chạy trước để so sánh")
+    args = parser.parse_args()
+    counts = {name: getattr(args, name) for name in DEFAULT_COUNTS}
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}", "WTF_CSRF_ENABLED": False})
+        app.logger.disabled = True
+        with app.app_context():
+            t0 = time.perf_counter()
+            ids = generate(seed=args.seed, **counts)
+            print(f"Seed {counts}: {time.perf_counter() - t0:.1f}s")
+            users = _pick_users(ids)
+            job_id = db.session.query(func.max(Job.id)).scalar()
+        results = run(app, users, job_id, args.repeat)
+    finally:
+        os.remove(path)
+
+    report = {
+        "commit": _git_commit(),
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "database": "sqlite",
+        "counts": counts,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "endpoints": results,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["endpoints"]
+    _print_results(results, baseline)
+
+    output = args.output or f"bench_http-{report['commit'] or 'local'}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Đã ghi {output}")
+
+
+if __name__ == "__main__":
+    main()
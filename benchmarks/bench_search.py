@@ -0,0 +1,119 @@
+"""
+Benchmark tìm kiếm keyword: ILIKE (cách cũ) so với full-text index (SQLite FTS5).
+
+Chạy:
+    python -m benchmarks.bench_search --jobs 100000 --repeat 20
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Employer, Job
+from app import search
+
+WORDS = (
+    "python java javascript react angular devops kế toán kiểm toán marketing bán hàng "
+    "nhân sự tuyển dụng thiết kế đồ họa kỹ sư xây dựng điện nước ngân hàng tài chính "
+    "giáo viên tiếng anh chăm sóc khách hàng lập trình viên backend frontend fullstack "
+    "dữ liệu phân tích quản lý dự án logistics kho vận lái xe điều dưỡng dược sĩ"
+).split()
+
+KEYWORDS = ["python", "kế toán", "lập trình viên", "marketing", "quản lý dự án", "điều dưỡng", "không tồn tại"]
+
+
+def _text(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def seed(n_jobs, n_employers=200, seed_value=42):
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    db.session.execute(insert(User), [
+        {"id": i, "email": f"employer{i}@bench.local", "password_hash": "x", "role": "employer",
+         "isPremiumActive": False, "active": True}
+        for i in range(1, n_employers + 1)
+    ])
+    db.session.execute(insert(Employer), [
+        {"id": i, "user_id": i, "company_name": f"Công ty {_text(rng, 2).title()} {i}"}
+        for i in range(1, n_employers + 1)
+    ])
+    batch = []
+    for i in range(1, n_jobs + 1):
+        batch.append({
+            "id": i,
+            "employer_id": rng.randint(1, n_employers),
+            "title": _text(rng, 4),
+            "description": _text(rng, 80),
+            "requirements": _text(rng, 30),
+            "created_at": now - timedelta(minutes=i),
+        })
+        if len(batch) == 5000:
+            db.session.execute(insert(Job), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Job), batch)
+    db.session.commit()
+    # Bulk insert không đi qua mapper event nên dựng lại index một lần
+    search.rebuild_index()
+
+
+def _time_query(backend, keyword, per_page=12):
+    start = time.perf_counter()
+    q = backend.apply(Job.query.outerjoin(Employer).order_by(Job.created_at.desc()), keyword)
+    q.limit(per_page).all()
+    q.order_by(None).count()
+    return (time.perf_counter() - start) * 1000
+
+
+def run(n_jobs, repeat):
+    backends = {"ilike": search.IlikeBackend(), "fts5": search.SQLiteFTSBackend()}
+    results = {}
+    for keyword in KEYWORDS:
+        row = {}
+        for name, backend in backends.items():
+            _time_query(backend, keyword)  # warm-up
+            samples = sorted(_time_query(backend, keyword) for _ in range(repeat))
+            row[name] = {
+                "median_ms": statistics.median(samples),
+                "p95_ms": samples[max(0, int(len(samples) * 0.95) - 1)],
+            }
+        results[keyword] = row
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+        with app.app_context():
+            t0 = time.perf_counter()
+            seed(args.jobs)
+            print(f"Seed {args.jobs} jobs: {time.perf_counter() - t0:.1f}s")
+            results = run(args.jobs, args.repeat)
+
+        print(f"{'keyword':<18}{'ilike median':>14}{'fts5 median':>14}{'ilike p95':>12}{'fts5 p95':>12}{'speedup':>10}")
+        for keyword, row in results.items():
+            ilike, fts = row["ilike"], row["fts5"]
+            speedup = ilike["median_ms"] / fts["median_ms"] if fts["median_ms"] else float("inf")
+            print(f"{keyword:<18}{ilike['median_ms']:>12.2f}ms{fts['median_ms']:>12.2f}ms"
+                  f"{ilike['p95_ms']:>10.2f}ms{fts['p95_ms']:>10.2f}ms{speedup:>9.1f}x")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
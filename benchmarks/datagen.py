@@ -0,0 +1,204 @@
+"""
+Sinh dữ liệu giả lập có tính tất định (cùng seed -> cùng dữ liệu) cho benchmark.
+
+Dùng trực tiếp các model trong app.models nhưng insert theo lô (Core insert),
+nên các cột chuẩn hoá (city_norm, geohash...) được tính sẵn ở đây thay cho mapper event.
+
+    from benchmarks.datagen import generate
+    with app.app_context():
+        ids = generate(employers=200, jobs=5000, candidates=2000)
+"""
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app import counters, inbox, message_search, search
+from app.extensions import db
+from app.models import User, Employer, Job, Candidate, Application, Conversation, Message, ConversationRead
+from utils.geo import geohash_encode
+from utils.helpers import fold_text
+
+DEFAULT_COUNTS = {
+    "employers": 200,
+    "jobs": 5000,
+    "candidates": 2000,
+    "applications": 20000,
+    "conversations": 2000,
+    "messages": 40000,
+}
+BATCH_SIZE = 5000
+
+WORDS = (
+    "python java javascript react angular devops kế toán kiểm toán marketing bán hàng "
+    "nhân sự tuyển dụng thiết kế đồ họa kỹ sư xây dựng điện nước ngân hàng tài chính "
+    "giáo viên tiếng anh chăm sóc khách hàng lập trình viên backend frontend fullstack "
+    "dữ liệu phân tích quản lý dự án logistics kho vận lái xe điều dưỡng dược sĩ"
+).split()
+# (thành phố, quận, vĩ độ, kinh độ)
+LOCATIONS = (
+    ("Hà Nội", "Cầu Giấy", 21.0362, 105.7906),
+    ("Hà Nội", "Hoàn Kiếm", 21.0285, 105.8542),
+    ("TP Hồ Chí Minh", "Quận 1", 10.7769, 106.7009),
+    ("TP Hồ Chí Minh", "Thủ Đức", 10.8494, 106.7537),
+    ("Đà Nẵng", "Hải Châu", 16.0471, 108.2068),
+    ("Hải Phòng", "Lê Chân", 20.8449, 106.6881),
+    ("Cần Thơ", "Ninh Kiều", 10.0341, 105.7880),
+)
+JOB_TYPES = ("Full-time", "Part-time", "Internship", "Freelance")
+REMOTE_OPTIONS = ("Onsite", "Remote", "Hybrid")
+STATUSES = ("pending", "pending", "reviewed", "accepted", "rejected")
+
+ADMIN_EMAIL = "admin@bench.local"
+
+
+def _text(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(insert(model), rows[start:start + BATCH_SIZE])
+
+
+def generate(seed=42, **counts):
+    """
+    Tạo admin, nhà tuyển dụng, job, ứng viên, đơn ứng tuyển, hội thoại và tin nhắn.
+    Số lượng mặc định theo DEFAULT_COUNTS, ghi đè bằng keyword (vd. jobs=100000).
+    Trả về dict id mẫu để benchmark đăng nhập: admin_user_id, employer_user_ids, candidate_user_ids.
+    """
+    n = dict(DEFAULT_COUNTS)
+    unknown = set(counts) - set(n)
+    if unknown:
+        raise ValueError(f"Không hỗ trợ: {', '.join(sorted(unknown))}")
+    n.update(counts)
+
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    today = now.date()
+
+    # --- Người dùng: 1 admin, rồi nhà tuyển dụng, rồi ứng viên ---
+    admin_user_id = 1
+    employer_user_ids = list(range(2, 2 + n["employers"]))
+    candidate_user_ids = list(range(2 + n["employers"], 2 + n["employers"] + n["candidates"]))
+    users = [{"id": admin_user_id, "email": ADMIN_EMAIL, "password_hash": "x", "role": "admin",
+              "isPremiumActive": False, "active": True, "created_at": now}]
+    for i, user_id in enumerate(employer_user_ids):
+        users.append({"id": user_id, "email": f"employer{i + 1}@bench.local", "password_hash": "x",
+                      "role": "employer", "isPremiumActive": i % 5 == 0, "active": True,
+                      "created_at": now - timedelta(days=rng.randint(0, 365))})
+    for i, user_id in enumerate(candidate_user_ids):
+        users.append({"id": user_id, "email": f"candidate{i + 1}@bench.local", "password_hash": "x",
+                      "role": "candidate", "isPremiumActive": False, "active": True,
+                      "created_at": now - timedelta(days=rng.randint(0, 365))})
+    _insert(User, users)
+
+    employers = []
+    for i, user_id in enumerate(employer_user_ids):
+        city = rng.choice(LOCATIONS)[0]
+        employers.append({
+            "id": i + 1, "user_id": user_id,
+            "company_name": f"Công ty {_text(rng, 2).title()} {i + 1}",
+            "industry": rng.choice(WORDS).title(), "city": city, "city_norm": fold_text(city),
+            "description": _text(rng, 40), "created_at": now - timedelta(days=rng.randint(0, 365)),
+            "updated_at": now,
+        })
+    _insert(Employer, employers)
+
+    candidates = []
+    for i, user_id in enumerate(candidate_user_ids):
+        candidates.append({
+            "id": i + 1, "user_id": user_id, "full_name": f"Ứng viên {i + 1}",
+            "city": rng.choice(LOCATIONS)[0],
+            "expected_position": _text(rng, 3), "current_position": _text(rng, 3),
+            "skills": ", ".join(rng.sample(WORDS, 4)), "major": _text(rng, 2),
+            "experience_years": rng.randint(0, 10), "experience_months": rng.randint(0, 11),
+            "expected_salary": rng.choice([8, 12, 15, 20, 30]) * 1_000_000,
+            "created_at": now - timedelta(days=rng.randint(0, 365)), "updated_at": now,
+        })
+    _insert(Candidate, candidates)
+
+    jobs = []
+    for i in range(1, n["jobs"] + 1):
+        city, district, lat, lng = rng.choice(LOCATIONS)
+        lat += rng.uniform(-0.05, 0.05)
+        lng += rng.uniform(-0.05, 0.05)
+        job_type, remote = rng.choice(JOB_TYPES), rng.choice(REMOTE_OPTIONS)
+        salary_min = rng.randint(5, 40) * 1_000_000
+        created_at = now - timedelta(minutes=i * 7)
+        jobs.append({
+            "id": i, "employer_id": rng.randint(1, n["employers"]),
+            "title": _text(rng, 4), "description": _text(rng, 80), "requirements": _text(rng, 30),
+            "job_type": job_type, "remote_option": remote,
+            "salary_min": salary_min, "salary_max": salary_min + rng.randint(0, 20) * 1_000_000,
+            "city": city, "district": district, "latitude": lat, "longitude": lng,
+            "deadline": today + timedelta(days=rng.randint(-30, 60)),
+            "created_at": created_at, "updated_at": created_at,
+            "city_norm": fold_text(city), "district_norm": fold_text(district),
+            "job_type_norm": fold_text(job_type), "remote_option_norm": fold_text(remote),
+            "geohash": geohash_encode(lat, lng),
+        })
+    _insert(Job, jobs)
+
+    # Mỗi cặp (ứng viên, job) chỉ một đơn
+    applications, seen = [], set()
+    limit = min(n["applications"], n["candidates"] * n["jobs"])
+    while len(applications) < limit:
+        pair = (rng.randint(1, n["candidates"]), rng.randint(1, n["jobs"]))
+        if pair in seen:
+            continue
+        seen.add(pair)
+        applications.append({
+            "id": len(applications) + 1, "candidate_id": pair[0], "job_id": pair[1],
+            "status": rng.choice(STATUSES), "cover_letter": _text(rng, 20),
+            "applied_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 60)),
+        })
+    _insert(Application, applications)
+
+    # Hội thoại giữa ứng viên và nhà tuyển dụng; tin nhắn cũ đã đọc, 10% mới nhất chưa đọc
+    conversations, pairs = [], set()
+    limit = min(n["conversations"], n["candidates"] * n["employers"])
+    while len(conversations) < limit:
+        pair = (rng.choice(candidate_user_ids), rng.choice(employer_user_ids))
+        if pair in pairs:
+            continue
+        pairs.add(pair)
+        conversations.append({"id": len(conversations) + 1, "user1_id": pair[0], "user2_id": pair[1],
+                              "low_user_id": min(pair), "high_user_id": max(pair),
+                              "created_at": now - timedelta(days=60)})
+    _insert(Conversation, conversations)
+
+    messages = []
+    for i in range(1, n["messages"] + 1 if conversations else 1):
+        convo = rng.choice(conversations)
+        sender, receiver = (convo["user1_id"], convo["user2_id"]) if rng.random() < 0.5 \
+            else (convo["user2_id"], convo["user1_id"])
+        messages.append({
+            "id": i, "conversation_id": convo["id"], "sender_id": sender, "receiver_id": receiver,
+            "content": _text(rng, rng.randint(3, 25)),
+            "created_at": now - timedelta(seconds=(n["messages"] - i) * 60),
+            "is_read": i <= n["messages"] * 0.9,
+        })
+    _insert(Message, messages)
+
+    # Mốc đã đọc: tin đã đọc là các tin cũ nhất nên mốc = id lớn nhất đã đọc của người nhận
+    watermarks = {}
+    for m in messages:
+        if m["is_read"]:
+            key = (m["conversation_id"], m["receiver_id"])
+            watermarks[key] = max(watermarks.get(key, 0), m["id"])
+    _insert(ConversationRead, [{"conversation_id": c, "user_id": u, "last_read_message_id": last_id}
+                               for (c, u), last_id in sorted(watermarks.items())])
+
+    db.session.commit()
+    # Bulk insert không đi qua mapper event nên dựng lại full-text index, bộ đếm chưa đọc
+    # và tóm tắt hội thoại
+    search.rebuild_index()
+    message_search.rebuild_index()
+    counters.reconcile()
+    inbox.rebuild_summaries()
+    return {
+        "admin_user_id": admin_user_id,
+        "employer_user_ids": employer_user_ids,
+        "candidate_user_ids": candidate_user_ids,
+    }
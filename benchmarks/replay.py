@@ -0,0 +1,201 @@
+"""
+Phát lại traffic đã ghi (app.traffic, TRAFFIC_RECORD=true) vào một instance đang chạy
+để tái hiện hình dạng tải production trên máy local.
+
+Chạy:
+    python -m benchmarks.replay traffic.jsonl --base-url http://127.0.0.1:5000 \\
+        --concurrency 16 --speedup 10 --login employer=hr@acme.vn:secret --output replay.json
+
+--speedup 10 nén 10 phút traffic thành 1 phút; --speedup 0 bắn nhanh nhất có thể.
+Mặc định chỉ phát lại GET/HEAD (bản ghi không có body nên POST không tái hiện được).
+Request của vai trò không có --login được gửi như khách vãng lai.
+SSE (/messages/conversation/<id>/stream) và long-poll (/badges?wait=) bị bỏ qua.
+"""
+import argparse
+import json
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+SAFE_METHODS = ("GET", "HEAD")
+# SSE / long-poll không trả về trong thời gian hợp lý; file ghi từ bản cũ vẫn có thể chứa chúng
+LONG_LIVED_ENDPOINTS = ("messages.conversation_stream",)
+_CSRF_RE = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+
+
+def load_records(path, all_methods=False, limit=None):
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if _is_long_lived(record):
+                continue
+            if all_methods or record.get("method", "GET") in SAFE_METHODS:
+                records.append(record)
+    records.sort(key=lambda r: r["ts"])
+    return records[:limit] if limit else records
+
+
+def _is_long_lived(record):
+    if record.get("endpoint") in LONG_LIVED_ENDPOINTS:
+        return True
+    return record.get("endpoint") == "main.badge_counts" and "wait=" in (record.get("query") or "")
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class _Sessions(threading.local):
+    """Mỗi thread giữ một requests.Session cho từng vai trò (cookie đăng nhập riêng)."""
+
+    def __init__(self, base_url, logins):
+        self.base_url = base_url
+        self.logins = logins
+        self.by_role = {}
+
+    def get(self, role):
+        session = self.by_role.get(role)
+        if session is None:
+            session = self.by_role[role] = requests.Session()
+            if role in self.logins:
+                self._login(session, *self.logins[role])
+        return session
+
+    def _login(self, session, email, password):
+        page = session.get(f"{self.base_url}/auth/login")
+        match = _CSRF_RE.search(page.text)
+        data = {"email": email, "password": password}
+        if match:
+            data["csrf_token"] = match.group(1)
+        response = session.post(f"{self.base_url}/auth/login", data=data, allow_redirects=False)
+        if response.status_code != 302:
+            print(f"! Đăng nhập {email} thất bại ({response.status_code})", file=sys.stderr)
+
+
+def replay(records, base_url, concurrency=8, speedup=1.0, logins=None, timeout=30):
+    """
+    Gửi lại records theo đúng khoảng cách thời gian gốc (chia cho speedup).
+    Trả về (stats theo endpoint, thời gian chạy, độ trễ lịch gửi).
+    """
+    sessions = _Sessions(base_url.rstrip("/"), logins or {})
+    results = defaultdict(lambda: {"latencies": [], "errors": 0, "statuses": defaultdict(int)})
+    lags = []
+    lock = threading.Lock()
+
+    def _send(record, scheduled):
+        key = record.get("endpoint") or f"{record['method']} {record['path']}"
+        url = sessions.base_url + record["path"] + (f"?{record['query']}" if record.get("query") else "")
+        sent = time.perf_counter()
+        try:
+            response = sessions.get(record.get("role", "anonymous")).request(
+                record["method"], url, allow_redirects=False, timeout=timeout)
+            status = response.status_code
+        except requests.RequestException:
+            status = None
+        elapsed = (time.perf_counter() - sent) * 1000
+        with lock:
+            row = results[key]
+            row["latencies"].append(elapsed)
+            row["statuses"][str(status)] += 1
+            if status is None or status >= 500:
+                row["errors"] += 1
+            lags.append((sent - scheduled) * 1000)
+
+    started = time.perf_counter()
+    first_ts = records[0]["ts"] if records else 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for record in records:
+            scheduled = started + ((record["ts"] - first_ts) / speedup if speedup > 0 else 0)
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(_send, record, scheduled)
+    duration = time.perf_counter() - started
+    return results, duration, lags
+
+
+def summarize(results, duration, lags):
+    endpoints = {}
+    for key, row in sorted(results.items(), key=lambda item: -len(item[1]["latencies"])):
+        latencies = row["latencies"]
+        endpoints[key] = {
+            "count": len(latencies),
+            "errors": row["errors"],
+            "rps": round(len(latencies) / duration, 2) if duration else None,
+            "p50_ms": round(_percentile(latencies, 50), 2),
+            "p95_ms": round(_percentile(latencies, 95), 2),
+            "p99_ms": round(_percentile(latencies, 99), 2),
+            "statuses": dict(row["statuses"]),
+        }
+    total = sum(row["count"] for row in endpoints.values())
+    return {
+        "requests": total,
+        "duration_s": round(duration, 2),
+        "rps": round(total / duration, 2) if duration else None,
+        # Lịch gửi bị trễ nhiều nghĩa là concurrency không đủ để giữ nhịp traffic gốc
+        "schedule_lag_p95_ms": round(_percentile(lags, 95), 2) if lags else 0,
+        "schedule_lag_mean_ms": round(statistics.fmean(lags), 2) if lags else 0,
+        "endpoints": endpoints,
+    }
+
+
+def _print_summary(summary):
+    print(f"{summary['requests']} request trong {summary['duration_s']}s "
+          f"({summary['rps']} req/s, lịch gửi trễ p95 {summary['schedule_lag_p95_ms']}ms)")
+    print(f"{'endpoint':<36}{'count':>7}{'err':>5}{'req/s':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for key, row in summary["endpoints"].items():
+        print(f"{key[:35]:<36}{row['count']:>7}{row['errors']:>5}{row['rps']:>8.1f}"
+              f"{row['p50_ms']:>8.1f}ms{row['p95_ms']:>8.1f}ms{row['p99_ms']:>8.1f}ms")
+
+
+def _parse_login(value):
+    role, _, credentials = value.partition("=")
+    email, _, password = credentials.partition(":")
+    if not role or not email:
+        raise argparse.ArgumentTypeError("dạng đúng: role=email:password")
+    return role, (email, password)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traffic", help="file JSON lines do app.traffic ghi")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--speedup", type=float, default=1.0)
+    parser.add_argument("--login", type=_parse_login, action="append", default=[],
+                        help="role=email:password, lặp lại cho từng vai trò")
+    parser.add_argument("--all-methods", action="store_true", help="phát lại cả POST/PUT/DELETE (không có body)")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--output", help="ghi kết quả ra file JSON")
+    args = parser.parse_args()
+
+    records = load_records(args.traffic, args.all_methods, args.limit)
+    if not records:
+        parser.error(f"{args.traffic} không có bản ghi nào để phát lại")
+    span = records[-1]["ts"] - records[0]["ts"]
+    print(f"Phát lại {len(records)} request (traffic gốc {span:.0f}s, speedup {args.speedup}x, "
+          f"concurrency {args.concurrency})")
+
+    results, duration, lags = replay(records, args.base_url, args.concurrency, args.speedup, dict(args.login))
+    summary = summarize(results, duration, lags)
+    _print_summary(summary)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"Đã ghi {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""add full-text job_search_index
+
+Revision ID: a3f1c2d4e5b6
+Revises: 1cd6979af7ec, 6e9ef96cb7e4
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f1c2d4e5b6'
+down_revision = ('1cd6979af7ec', '6e9ef96cb7e4')
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bảng index phụ thuộc dialect (FTS5 / FULLTEXT) nên dùng chung code với app.search
+    from app.search import get_backend
+
+    bind = op.get_bind()
+    backend = get_backend(bind.dialect.name)
+    backend.ensure_index(bind)
+    backend.rebuild(bind)
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS job_search_index")
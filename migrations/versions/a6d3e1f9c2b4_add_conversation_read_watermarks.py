@@ -0,0 +1,75 @@
+"""add conversation_reads (per-participant read watermark)
+
+Revision ID: a6d3e1f9c2b4
+Revises: f4c1a8e3b5d7
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d3e1f9c2b4'
+down_revision = 'f4c1a8e3b5d7'
+branch_labels = None
+depends_on = None
+
+
+def _backfill(bind):
+    reads = sa.table('conversation_reads', sa.column('conversation_id', sa.Integer), sa.column('user_id', sa.Integer),
+                     sa.column('last_read_message_id', sa.Integer), sa.column('updated_at', sa.DateTime))
+    messages = sa.table('messages', sa.column('id', sa.Integer), sa.column('conversation_id', sa.Integer),
+                        sa.column('receiver_id', sa.Integer), sa.column('is_read', sa.Boolean))
+    conversations = sa.table('conversations', sa.column('id', sa.Integer),
+                             sa.column('user1_id', sa.Integer), sa.column('user2_id', sa.Integer),
+                             sa.column('user1_unread_count', sa.Integer), sa.column('user2_unread_count', sa.Integer))
+    users = sa.table('users', sa.column('id', sa.Integer), sa.column('unread_messages_count', sa.Integer))
+
+    # Mốc = ngay trước tin chưa đọc đầu tiên (không giấu tin chưa đọc nào), hoặc tin cuối nếu đã đọc hết
+    first_unread = sa.func.min(sa.case((messages.c.is_read.isnot(True), messages.c.id)))
+    watermark = sa.case((first_unread.is_(None), sa.func.max(messages.c.id)), else_=first_unread - 1)
+    bind.execute(reads.insert().from_select(
+        ['conversation_id', 'user_id', 'last_read_message_id', 'updated_at'],
+        sa.select(messages.c.conversation_id, messages.c.receiver_id, watermark,
+                  sa.literal(datetime.utcnow(), sa.DateTime))
+        .group_by(messages.c.conversation_id, messages.c.receiver_id)
+    ))
+
+    # Tính lại các bộ đếm chưa đọc theo mốc vừa tạo
+    def unread(conversation_id, user_id):
+        mark = sa.select(reads.c.last_read_message_id).where(
+            reads.c.conversation_id == conversation_id, reads.c.user_id == user_id).scalar_subquery()
+        return sa.select(sa.func.count(messages.c.id)).where(
+            messages.c.conversation_id == conversation_id, messages.c.receiver_id == user_id,
+            messages.c.id > sa.func.coalesce(mark, 0)).scalar_subquery()
+
+    bind.execute(conversations.update().values(
+        user1_unread_count=unread(conversations.c.id, conversations.c.user1_id),
+        user2_unread_count=unread(conversations.c.id, conversations.c.user2_id),
+    ))
+    per_user = sa.select(sa.func.coalesce(sa.func.sum(conversations.c.user1_unread_count), 0)).where(
+        conversations.c.user1_id == users.c.id).scalar_subquery() + \
+        sa.select(sa.func.coalesce(sa.func.sum(conversations.c.user2_unread_count), 0)).where(
+        conversations.c.user2_id == users.c.id).scalar_subquery()
+    bind.execute(users.update().values(unread_messages_count=per_user))
+
+
+def upgrade():
+    op.create_table('conversation_reads',
+    sa.Column('conversation_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('last_read_message_id', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['conversation_id'], ['conversations.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('conversation_id', 'user_id')
+    )
+
+    _backfill(op.get_bind())
+
+
+def downgrade():
+    op.drop_table('conversation_reads')
@@ -0,0 +1,86 @@
+"""add normalized (accent-folded) search columns to jobs and employers
+
+Revision ID: b7d2e8f1a9c3
+Revises: a3f1c2d4e5b6
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from utils.helpers import fold_text
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e8f1a9c3'
+down_revision = 'a3f1c2d4e5b6'
+branch_labels = None
+depends_on = None
+
+JOB_COLUMNS = {
+    'city': 'city_norm',
+    'district': 'district_norm',
+    'job_type': 'job_type_norm',
+    'remote_option': 'remote_option_norm',
+}
+
+
+def _backfill(bind, table, columns, batch_size=1000):
+    # Bỏ dấu tiếng Việt không làm được bằng SQL thuần nên backfill bằng Python theo lô
+    tbl = sa.table(table, sa.column('id', sa.Integer),
+                   *[sa.column(c, sa.String) for c in columns],
+                   *[sa.column(n, sa.String) for n in columns.values()])
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(tbl.c.id, *[tbl.c[c] for c in columns])
+            .where(tbl.c.id > last_id).order_by(tbl.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            tbl.update().where(tbl.c.id == sa.bindparam('_id')),
+            [{'_id': row.id, **{norm: fold_text(getattr(row, src)) for src, norm in columns.items()}}
+             for row in rows]
+        )
+        last_id = rows[-1].id
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('city_norm', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('district_norm', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('job_type_norm', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('remote_option_norm', sa.String(length=20), nullable=True))
+
+    with op.batch_alter_table('employers', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('city_norm', sa.String(length=100), nullable=True))
+
+    bind = op.get_bind()
+    _backfill(bind, 'jobs', JOB_COLUMNS)
+    _backfill(bind, 'employers', {'city': 'city_norm'})
+
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_jobs_city_norm_created_at', ['city_norm', 'created_at'], unique=False)
+        batch_op.create_index('ix_jobs_city_norm_district_norm', ['city_norm', 'district_norm'], unique=False)
+        batch_op.create_index('ix_jobs_job_type_norm_created_at', ['job_type_norm', 'created_at'], unique=False)
+        batch_op.create_index('ix_jobs_remote_option_norm_created_at', ['remote_option_norm', 'created_at'], unique=False)
+
+    with op.batch_alter_table('employers', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_employers_city_norm'), ['city_norm'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('employers', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_employers_city_norm'))
+        batch_op.drop_column('city_norm')
+
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_jobs_remote_option_norm_created_at')
+        batch_op.drop_index('ix_jobs_job_type_norm_created_at')
+        batch_op.drop_index('ix_jobs_city_norm_district_norm')
+        batch_op.drop_index('ix_jobs_city_norm_created_at')
+        batch_op.drop_column('remote_option_norm')
+        batch_op.drop_column('job_type_norm')
+        batch_op.drop_column('district_norm')
+        batch_op.drop_column('city_norm')
@@ -0,0 +1,117 @@
+"""add canonical (low_user_id, high_user_id) pair to conversations and merge duplicates
+
+Revision ID: b8e4f2a7d9c1
+Revises: a6d3e1f9c2b4
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e4f2a7d9c1'
+down_revision = 'a6d3e1f9c2b4'
+branch_labels = None
+depends_on = None
+
+
+conversations = sa.table('conversations', sa.column('id', sa.Integer), sa.column('created_at', sa.DateTime),
+                         sa.column('user1_id', sa.Integer), sa.column('user2_id', sa.Integer),
+                         sa.column('low_user_id', sa.Integer), sa.column('high_user_id', sa.Integer),
+                         sa.column('last_message_id', sa.Integer), sa.column('last_message_at', sa.DateTime),
+                         sa.column('user1_unread_count', sa.Integer), sa.column('user2_unread_count', sa.Integer))
+messages = sa.table('messages', sa.column('id', sa.Integer), sa.column('conversation_id', sa.Integer),
+                    sa.column('receiver_id', sa.Integer), sa.column('created_at', sa.DateTime))
+users = sa.table('users', sa.column('id', sa.Integer), sa.column('unread_messages_count', sa.Integer))
+reads = sa.table('conversation_reads', sa.column('conversation_id', sa.Integer), sa.column('user_id', sa.Integer),
+                 sa.column('last_read_message_id', sa.Integer))
+
+
+def _merge_duplicates(bind):
+    """Gộp các hội thoại trùng cặp user vào hội thoại cũ nhất (id nhỏ nhất)."""
+    duplicated = bind.execute(
+        sa.select(conversations.c.low_user_id, conversations.c.high_user_id, sa.func.min(conversations.c.id))
+        .group_by(conversations.c.low_user_id, conversations.c.high_user_id)
+        .having(sa.func.count(conversations.c.id) > 1)
+    ).all()
+    for low, high, keep_id in duplicated:
+        merged_ids = bind.execute(sa.select(conversations.c.id).where(
+            conversations.c.low_user_id == low, conversations.c.high_user_id == high,
+            conversations.c.id != keep_id)).scalars().all()
+        all_ids = [keep_id] + merged_ids
+
+        bind.execute(messages.update().where(messages.c.conversation_id.in_(merged_ids))
+                     .values(conversation_id=keep_id))
+
+        # Mốc đã đọc: lấy mốc nhỏ nhất của mỗi user để không giấu tin chưa đọc nào.
+        # Hội thoại không có dòng mốc của user nghĩa là mốc 0, nên khi thiếu dòng nào thì mốc gộp là 0
+        watermarks = bind.execute(
+            sa.select(reads.c.user_id, sa.func.min(reads.c.last_read_message_id), sa.func.count())
+            .where(reads.c.conversation_id.in_(all_ids)).group_by(reads.c.user_id)
+        ).all()
+        bind.execute(reads.delete().where(reads.c.conversation_id.in_(all_ids)))
+        if watermarks:
+            bind.execute(reads.insert(), [{"conversation_id": keep_id, "user_id": user_id,
+                                           "last_read_message_id": mark if rows == len(all_ids) else 0}
+                                          for user_id, mark, rows in watermarks])
+
+        bind.execute(conversations.delete().where(conversations.c.id.in_(merged_ids)))
+        _refresh_summary(bind, keep_id)
+        _refresh_user_unread(bind, (low, high))
+
+
+def _refresh_user_unread(bind, user_ids):
+    per_user = sa.select(sa.func.coalesce(sa.func.sum(conversations.c.user1_unread_count), 0)).where(
+        conversations.c.user1_id == users.c.id).scalar_subquery() + \
+        sa.select(sa.func.coalesce(sa.func.sum(conversations.c.user2_unread_count), 0)).where(
+        conversations.c.user2_id == users.c.id).scalar_subquery()
+    bind.execute(users.update().where(users.c.id.in_(user_ids)).values(unread_messages_count=per_user))
+
+
+def _refresh_summary(bind, conversation_id):
+    last = bind.execute(sa.select(messages.c.id, messages.c.created_at)
+                        .where(messages.c.conversation_id == conversation_id)
+                        .order_by(messages.c.id.desc()).limit(1)).first()
+
+    def unread(user_column):
+        mark = sa.select(reads.c.last_read_message_id).where(
+            reads.c.conversation_id == conversation_id, reads.c.user_id == user_column).scalar_subquery()
+        return sa.select(sa.func.count(messages.c.id)).where(
+            messages.c.conversation_id == conversation_id, messages.c.receiver_id == user_column,
+            messages.c.id > sa.func.coalesce(mark, 0)).scalar_subquery()
+
+    bind.execute(conversations.update().where(conversations.c.id == conversation_id).values(
+        last_message_id=last[0] if last else None,
+        last_message_at=last[1] if last else conversations.c.created_at,
+        user1_unread_count=unread(conversations.c.user1_id),
+        user2_unread_count=unread(conversations.c.user2_id),
+    ))
+
+
+def upgrade():
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('low_user_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('high_user_id', sa.Integer(), nullable=True))
+
+    bind = op.get_bind()
+    bind.execute(conversations.update().values(
+        low_user_id=sa.case((conversations.c.user1_id <= conversations.c.user2_id, conversations.c.user1_id),
+                            else_=conversations.c.user2_id),
+        high_user_id=sa.case((conversations.c.user1_id <= conversations.c.user2_id, conversations.c.user2_id),
+                             else_=conversations.c.user1_id),
+    ))
+    _merge_duplicates(bind)
+
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.alter_column('low_user_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('high_user_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_unique_constraint('uq_conversations_user_pair', ['low_user_id', 'high_user_id'])
+
+
+def downgrade():
+    # Các hội thoại đã gộp không tách lại được
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_conversations_user_pair', type_='unique')
+        batch_op.drop_column('high_user_id')
+        batch_op.drop_column('low_user_id')
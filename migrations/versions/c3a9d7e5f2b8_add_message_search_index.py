@@ -0,0 +1,29 @@
+"""add full-text message_search_index
+
+Revision ID: c3a9d7e5f2b8
+Revises: b8e4f2a7d9c1
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3a9d7e5f2b8'
+down_revision = 'b8e4f2a7d9c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bảng index phụ thuộc dialect (FTS5 / FULLTEXT) nên dùng chung code với app.message_search
+    from app.message_search import get_backend
+
+    bind = op.get_bind()
+    backend = get_backend(bind.dialect.name)
+    backend.ensure_index(bind)
+    backend.rebuild(bind)
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS message_search_index")
@@ -0,0 +1,53 @@
+"""add geohash column to jobs for radius search
+
+Revision ID: c4e9a7b2d1f0
+Revises: b7d2e8f1a9c3
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from utils.geo import geohash_encode
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e9a7b2d1f0'
+down_revision = 'b7d2e8f1a9c3'
+branch_labels = None
+depends_on = None
+
+
+def _backfill(bind, batch_size=1000):
+    jobs = sa.table('jobs', sa.column('id', sa.Integer), sa.column('latitude', sa.Float),
+                    sa.column('longitude', sa.Float), sa.column('geohash', sa.String))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(jobs.c.id, jobs.c.latitude, jobs.c.longitude)
+            .where(jobs.c.id > last_id, jobs.c.latitude.isnot(None), jobs.c.longitude.isnot(None))
+            .order_by(jobs.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            jobs.update().where(jobs.c.id == sa.bindparam('_id')),
+            [{'_id': row.id, 'geohash': geohash_encode(row.latitude, row.longitude)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('geohash', sa.String(length=12), nullable=True))
+
+    _backfill(op.get_bind())
+
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_jobs_geohash'), ['geohash'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_jobs_geohash'))
+        batch_op.drop_column('geohash')
@@ -0,0 +1,27 @@
+"""add (candidate_id|employer_id, created_at, id) indexes to notifications for the paginated feed
+
+Revision ID: d5f2b9c7e4a3
+Revises: c3a9d7e5f2b8
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f2b9c7e4a3'
+down_revision = 'c3a9d7e5f2b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('ix_notifications_candidate_id_created_at', ['candidate_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_notifications_employer_id_created_at', ['employer_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notifications_employer_id_created_at')
+        batch_op.drop_index('ix_notifications_candidate_id_created_at')
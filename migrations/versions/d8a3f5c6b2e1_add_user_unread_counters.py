@@ -0,0 +1,56 @@
+"""add denormalized unread counters to users
+
+Revision ID: d8a3f5c6b2e1
+Revises: c4e9a7b2d1f0
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8a3f5c6b2e1'
+down_revision = 'c4e9a7b2d1f0'
+branch_labels = None
+depends_on = None
+
+
+def _backfill(bind):
+    users = sa.table('users', sa.column('id', sa.Integer),
+                     sa.column('unread_messages_count', sa.Integer),
+                     sa.column('unread_notifications_count', sa.Integer))
+    messages = sa.table('messages', sa.column('id', sa.Integer), sa.column('receiver_id', sa.Integer),
+                        sa.column('is_read', sa.Boolean))
+    notifications = sa.table('notifications', sa.column('id', sa.Integer), sa.column('is_read', sa.Boolean),
+                             sa.column('candidate_id', sa.Integer), sa.column('employer_id', sa.Integer))
+    candidates = sa.table('candidates', sa.column('id', sa.Integer), sa.column('user_id', sa.Integer))
+    employers = sa.table('employers', sa.column('id', sa.Integer), sa.column('user_id', sa.Integer))
+
+    unread_messages = sa.select(sa.func.count(messages.c.id)).where(
+        messages.c.receiver_id == users.c.id, messages.c.is_read.isnot(True)).scalar_subquery()
+    candidate_notifications = sa.select(sa.func.count(notifications.c.id)).select_from(
+        notifications.join(candidates, notifications.c.candidate_id == candidates.c.id)).where(
+        candidates.c.user_id == users.c.id, notifications.c.is_read.isnot(True)).scalar_subquery()
+    employer_notifications = sa.select(sa.func.count(notifications.c.id)).select_from(
+        notifications.join(employers, notifications.c.employer_id == employers.c.id)).where(
+        employers.c.user_id == users.c.id, notifications.c.is_read.isnot(True)).scalar_subquery()
+
+    bind.execute(users.update().values(
+        unread_messages_count=unread_messages,
+        unread_notifications_count=candidate_notifications + employer_notifications,
+    ))
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unread_messages_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('unread_notifications_count', sa.Integer(), nullable=False, server_default='0'))
+
+    _backfill(op.get_bind())
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('unread_notifications_count')
+        batch_op.drop_column('unread_messages_count')
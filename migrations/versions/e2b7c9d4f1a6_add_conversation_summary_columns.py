@@ -0,0 +1,68 @@
+"""add denormalized inbox summary columns to conversations
+
+Revision ID: e2b7c9d4f1a6
+Revises: d8a3f5c6b2e1
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7c9d4f1a6'
+down_revision = 'd8a3f5c6b2e1'
+branch_labels = None
+depends_on = None
+
+
+def _backfill(bind):
+    conversations = sa.table('conversations', sa.column('id', sa.Integer), sa.column('created_at', sa.DateTime),
+                             sa.column('user1_id', sa.Integer), sa.column('user2_id', sa.Integer),
+                             sa.column('last_message_id', sa.Integer), sa.column('last_message_at', sa.DateTime),
+                             sa.column('user1_unread_count', sa.Integer), sa.column('user2_unread_count', sa.Integer))
+    messages = sa.table('messages', sa.column('id', sa.Integer), sa.column('conversation_id', sa.Integer),
+                        sa.column('receiver_id', sa.Integer), sa.column('is_read', sa.Boolean),
+                        sa.column('created_at', sa.DateTime))
+
+    def unread(user_column):
+        return sa.select(sa.func.count(messages.c.id)).where(
+            messages.c.conversation_id == conversations.c.id,
+            messages.c.receiver_id == user_column,
+            messages.c.is_read.isnot(True)).scalar_subquery()
+
+    bind.execute(conversations.update().values(
+        last_message_id=sa.select(sa.func.max(messages.c.id)).where(
+            messages.c.conversation_id == conversations.c.id).scalar_subquery()))
+    bind.execute(conversations.update().values(
+        last_message_at=sa.func.coalesce(
+            sa.select(messages.c.created_at).where(messages.c.id == conversations.c.last_message_id)
+            .scalar_subquery(),
+            conversations.c.created_at),
+        user1_unread_count=unread(conversations.c.user1_id),
+        user2_unread_count=unread(conversations.c.user2_id),
+    ))
+
+
+def upgrade():
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_message_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('last_message_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('user1_unread_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('user2_unread_count', sa.Integer(), nullable=False, server_default='0'))
+
+    _backfill(op.get_bind())
+
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.create_index('ix_conversations_user1_id_last_message_at', ['user1_id', 'last_message_at'], unique=False)
+        batch_op.create_index('ix_conversations_user2_id_last_message_at', ['user2_id', 'last_message_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.drop_index('ix_conversations_user2_id_last_message_at')
+        batch_op.drop_index('ix_conversations_user1_id_last_message_at')
+        batch_op.drop_column('user2_unread_count')
+        batch_op.drop_column('user1_unread_count')
+        batch_op.drop_column('last_message_at')
+        batch_op.drop_column('last_message_id')
@@ -0,0 +1,25 @@
+"""add (conversation_id, id) index to messages for paginated chat history
+
+Revision ID: f4c1a8e3b5d7
+Revises: e2b7c9d4f1a6
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4c1a8e3b5d7'
+down_revision = 'e2b7c9d4f1a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.create_index('ix_messages_conversation_id_id', ['conversation_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.drop_index('ix_messages_conversation_id_id')
@@ -0,0 +1,104 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Độ chính xác geohash lưu trong DB (9 ký tự ~ 5m x 5m)
+GEOHASH_PRECISION = 9
+
+# Số ô tối đa khi phủ bounding box; nhiều hơn thì giảm độ chính xác (ô to hơn)
+MAX_COVER_CELLS = 24
+
+
+def geohash_encode(lat, lng, precision=GEOHASH_PRECISION):
+    if lat is None or lng is None:
+        return None
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bit, ch, even = 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            ch = (ch << 1) | 1
+            rng[0] = mid
+        else:
+            ch = ch << 1
+            rng[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(_BASE32[ch])
+            bit, ch = 0, 0
+    return "".join(chars)
+
+
+def cell_size_deg(precision):
+    """(chiều cao theo vĩ độ, chiều rộng theo kinh độ) của một ô geohash, tính bằng độ."""
+    bits = 5 * precision
+    lng_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lng, radius_km):
+    """(min_lat, max_lat, min_lng, max_lng) bao quanh hình tròn bán kính radius_km."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(lat))
+    dlng = 180.0 if cos_lat < 1e-9 else min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+    return (max(-90.0, lat - dlat), min(90.0, lat + dlat),
+            max(-180.0, lng - dlng), min(180.0, lng + dlng))
+
+
+def _frange(start, stop, step):
+    values = []
+    v = start
+    while v < stop:
+        values.append(v)
+        v += step
+    values.append(stop)
+    return values
+
+
+def covering_cells(lat, lng, radius_km, max_cells=MAX_COVER_CELLS):
+    """
+    Các tiền tố geohash phủ kín bounding box của vòng tròn, chọn độ chính xác cao nhất
+    mà số ô không vượt quá max_cells. Mỗi tiền tố là một range scan trên index geohash.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size_deg(precision)
+        rows = (max_lat - min_lat) / height + 2
+        cols = (max_lng - min_lng) / width + 2
+        if rows * cols > max_cells * 4:
+            continue
+        cells = {
+            geohash_encode(la, ln, precision)
+            for la in _frange(min_lat, max_lat, height)
+            for ln in _frange(min_lng, max_lng, width)
+        }
+        if len(cells) <= max_cells:
+            return sorted(cells)
+    return [""]
+
+
+def parse_latlng(value):
+    """'21.02,105.85' -> (21.02, 105.85); sai định dạng thì trả về None."""
+    try:
+        lat_s, lng_s = (value or "").split(",")
+        lat, lng = float(lat_s), float(lng_s)
+    except ValueError:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
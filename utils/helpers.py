@@ -0,0 +1,16 @@
+import re
+import unicodedata
+
+_SEPARATORS_RE = re.compile(r"[\s\-_]+")
+
+
+def fold_text(value):
+    """
+    Chuẩn hoá chuỗi để so khớp/tìm kiếm: chữ thường, bỏ dấu tiếng Việt,
+    gộp khoảng trắng và gạch nối. Ví dụ: "Hà Nội" -> "ha noi", "ha-noi" -> "ha noi".
+    """
+    if value is None:
+        return None
+    s = unicodedata.normalize("NFD", str(value).lower()).replace("đ", "d")
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return _SEPARATORS_RE.sub(" ", s).strip()